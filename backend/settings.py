@@ -26,8 +26,10 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 # - configure `TEMPLATES` to have a project-level templates directory
 # - set the redirect links for login and logout
 
+import importlib.util
 import logging
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -43,17 +45,63 @@ SECRET_KEY = 'k7h3$^5%8dpn2!h0pwl-vwe3qza!htdr$wjsso#4lm#&%8tl@z'
 DEBUG = True
 
 # LOGGING
+# Modules log through `logging.getLogger(__name__)`.
+# While debugging, everything goes to the console. Otherwise records are
+# written to pugorugh.log as JSON lines from a background thread (see
+# pugorugh.log_handlers), so file I/O never blocks a request.
 LOGFORMAT = '%(asctime)s | %(levelname)s | %(message)s'
 if DEBUG:
     LOGLEVEL = logging.DEBUG
-    LOGTARGET = {}  # Direct logging to console while debugging
+    LOGHANDLERS = ['console']  # Direct logging to console while debugging
 else:
     LOGLEVEL = logging.INFO
-    LOGTARGET = {
-        'filename': 'pugorugh.log',
-        'filemode': 'w'
-    }
-logging.basicConfig(level=LOGLEVEL, **LOGTARGET, format=LOGFORMAT)
+    LOGHANDLERS = ['queue']
+
+# Fraction of the records kept for high-volume events (records logged with
+# `extra={'event': ...}`)
+LOG_SAMPLE_RATES = {
+    'swipe': 0.01,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'console': {'format': LOGFORMAT},
+        'json': {'()': 'pugorugh.log_handlers.JSONFormatter'},
+    },
+    'filters': {
+        'sampling': {
+            '()': 'pugorugh.log_handlers.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'console',
+            'filters': ['sampling'],
+        },
+        'file': {
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(BASE_DIR, 'pugorugh.log'),
+            # (append: every worker process opens the file)
+            'mode': 'a',
+            'delay': True,  # (don't create the file until it's needed)
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'pugorugh.log_handlers.QueueListenerHandler',
+            'handlers': ['cfg://handlers.file'],
+            'queue_size': 10000,  # records; more are dropped
+            'filters': ['sampling'],
+        },
+    },
+    'root': {
+        'level': LOGLEVEL,
+        'handlers': LOGHANDLERS,
+    },
+}
 
 ALLOWED_HOSTS = []
 
@@ -70,10 +118,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'rest_framework',
     'rest_framework.authtoken',
-    'pugorugh',
+    'pugorugh.apps.PugorughConfig',
 ]
 
 MIDDLEWARE = [
+    'pugorugh.middleware.MetricsMiddleware',
+    'pugorugh.middleware.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,10 +131,45 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'pugorugh.middleware.ProfilingMiddleware',
+    'pugorugh.middleware.TrafficCaptureMiddleware',
+    'pugorugh.middleware.ReplicaRoutingMiddleware',
+]
+
+# API Middleware
+# The WSGI application (see pugorugh.handlers) runs requests whose path
+# starts with one of API_PATH_PREFIXES through API_MIDDLEWARE instead of
+# MIDDLEWARE. The API authenticates with tokens only, so it does without
+# sessions, CSRF, messages and clickjacking protection. (Profiling an API
+# request therefore needs a profiling token: there is no session user.)
+API_PATH_PREFIXES = ['/api/']
+API_MIDDLEWARE = [
+    'pugorugh.middleware.MetricsMiddleware',
+    'pugorugh.middleware.QueryInstrumentationMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'pugorugh.middleware.ProfilingMiddleware',
+    'pugorugh.middleware.TrafficCaptureMiddleware',
+    'pugorugh.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
 
+# Query Budgets
+# Maximum number of SQL queries a request to each route (by URL name) should
+# issue. Requests that go over budget are logged as warnings by
+# `pugorugh.middleware.QueryInstrumentationMiddleware`. (The test suite holds
+# the routes to the tighter budgets in `pugorugh/tests/query_budgets.json`.)
+QUERY_BUDGETS = {
+    'next-dog': 8,
+    'set-status': 8,
+    'random-dog': 4,
+    'needs-love-dog': 4,
+    'set-preferences': 6,
+    'dog-list': 4,
+    'dog-batch': 4,
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -111,11 +196,90 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # keep connections open between requests (seconds), rather than
+        # reconnecting (and re-applying the pragmas) every request
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Auth Database
+# Set PUGORUGH_SPLIT_AUTH_DB=1 to keep users, tokens and sessions (the
+# AUTH_DB_APPS) in their own SQLite file, so that logins don't wait for the
+# swipe writes' lock (see pugorugh.routers.AuthRouter). To split an existing
+# database: set the variable, `manage.py migrate --database auth`, then
+# `manage.py copy_auth_data`.
+AUTH_DB_APPS = [
+    'admin', 'auth', 'contenttypes', 'sessions', 'users', 'authtoken',
+]
+if os.environ.get('PUGORUGH_SPLIT_AUTH_DB'):
+    DATABASES['auth'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db-auth.sqlite3'),
+        'CONN_MAX_AGE': 60,
+    }
+
+# Read Replicas
+# Aliases in DATABASES that hold (possibly lagging) copies of 'default'.
+# GET requests to the REPLICA_ROUTES (URL names) read from one of them,
+# unless the client has made any other request (or logged in) in the last
+# REPLICA_PIN_SECONDS (so users always read their own writes; see
+# pugorugh.routers). The pin must outlast the replicas' worst lag: for
+# snapshot_replica, its --interval plus the time a copy takes.
+# Set PUGORUGH_LOCAL_REPLICA=1 to use a local copy of db.sqlite3 as a
+# replica (refresh it with `manage.py snapshot_replica --interval 5`).
+DATABASE_REPLICAS = []
+if os.environ.get('PUGORUGH_LOCAL_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = [
+    'pugorugh.routers.AuthRouter',
+    'pugorugh.routers.ReplicaRouter',
+]
+REPLICA_ROUTES = [
+    'next-dog', 'random-dog', 'needs-love-dog', 'set-preferences',
+]
+REPLICA_PIN_SECONDS = 15
+
+# SQLite Tuning
+# Applied to every new SQLite connection (see pugorugh.db). Set to {} to use
+# SQLite's defaults (note that journal_mode persists in the database file:
+# use {'journal_mode': 'delete'} to switch WAL off again).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -20000,  # (negative: KiB, i.e., ~20MB)
+    'temp_store': 'memory',
+}
+# How transactions start: IMMEDIATE takes the write lock at BEGIN (waiting
+# up to busy_timeout), so a transaction that reads before it writes can't
+# fail with "database is locked" when it writes. None: SQLite's default
+# (DEFERRED).
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+
 AUTH_USER_MODEL = 'users.PugUghUser'
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+#
+# Holds the dogs' rendered JSON (see pugorugh.dog_json). The local-memory
+# cache is per-process; use a shared backend (e.g., memcached) to share it
+# between worker processes. (The candidate lists shared between users with
+# the same preferences are kept in each process's memory, keyed by a
+# catalog version stored in the database; see pugorugh.candidates.)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pugorugh',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -159,12 +323,149 @@ STATICFILES_DIRS = [
 
 DOG_UPLOAD_DIR = os.path.join(STATICFILES_DIR, 'images', 'dogs')
 
+# Dog Images
+# The API refers to the dog images by versioned URLs under DOG_IMAGE_URL,
+# which can be cached for good (see pugorugh.images). Set DOG_IMAGE_SENDFILE
+# to 'x-sendfile' (Apache, lighttpd) or 'x-accel-redirect' (nginx, with an
+# internal location at DOG_IMAGE_ACCEL_PREFIX aliased to DOG_UPLOAD_DIR) to
+# have the front proxy send the files; with None they are sent by Django.
+DOG_IMAGE_URL = '/images/dogs/'
+DOG_IMAGE_SENDFILE = None
+DOG_IMAGE_ACCEL_PREFIX = '/protected/dogs/'
+
+# Dog Lists
+# The list endpoint (/api/dog/) sends DOG_LIST_LIMIT dogs per page by
+# default, and at most DOG_LIST_MAX_LIMIT; the batch endpoint takes at most
+# DOG_BATCH_MAX_IDS ids.
+DOG_LIST_LIMIT = 100
+DOG_LIST_MAX_LIMIT = 10000
+DOG_BATCH_MAX_IDS = 1000
+
+# Assets
+# `manage.py build_assets` concatenates each of ASSET_BUNDLES into one file,
+# copies ASSET_FILES, and writes them (fingerprinted, with gzip and Brotli
+# variants) to ASSETS_DIR, which is served under ASSETS_URL with far-future
+# caching (see pugorugh.assets). Names are relative to the static files.
+ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
+ASSETS_URL = '/assets/'
+ASSET_BUNDLES = {
+    'js/pugorugh.js': [
+        'js/registration.js',
+        'js/login.js',
+        'js/checkboxGroup.js',
+        'js/preferences.js',
+        'js/dog.js',
+        'js/app.js',
+    ],
+}
+ASSET_FILES = [
+    'css/global.css',
+    'css/custom.css',
+    'js/vendor/jquery/jquery.min.js',
+    'js/vendor/react/react-with-addons-0.14.7.min.js',
+    'js/vendor/react/react-dom-0.14.7.min.js',
+    'js/vendor/token-auth.js',
+]
+
+# Metrics
+# Each process writes its metrics to its own file in METRICS_DIR (at most
+# every METRICS_FLUSH_INTERVAL seconds); `/metrics` sums the files of every
+# process. Set METRICS_DIR to None to only report the serving process.
+# `/metrics` is served to staff users, and to scrapers that send
+# METRICS_TOKEN (if set) as `Authorization: Bearer <token>`.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'pugorugh-metrics')
+METRICS_FLUSH_INTERVAL = 5  # seconds
+METRICS_TOKEN = os.environ.get('PUGORUGH_METRICS_TOKEN')
+
+# Archived Swipes
+# `manage.py archive_inactive_users` moves the swipes of users not seen for
+# ARCHIVE_AFTER_DAYS into compressed cold storage (ARCHIVE_CHUNK_SIZE users
+# per transaction); they come back when the user returns. Token
+# authentication updates a user's last_login at most every
+# ARCHIVE_TOUCH_INTERVAL seconds (see pugorugh.archive).
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_CHUNK_SIZE = 100
+ARCHIVE_TOUCH_INTERVAL = 24 * 60 * 60  # seconds
+
+# Background Jobs
+# Jobs are stored in the database and run by `manage.py runworker` (see
+# pugorugh.jobs). A worker holds a lease of JOBS_LEASE_SECONDS on each job
+# it runs (renewed while it runs); a failed job is retried after
+# JOBS_RETRY_BACKOFF seconds, doubling each time up to
+# JOBS_RETRY_BACKOFF_MAX. JOBS_EAGER runs jobs as soon as they are enqueued
+# instead (e.g., under tests).
+JOBS_EAGER = False
+JOBS_LEASE_SECONDS = 5 * 60
+JOBS_RETRY_BACKOFF = 10  # seconds
+JOBS_RETRY_BACKOFF_MAX = 60 * 60  # seconds
+JOBS_POLL_INTERVAL = 1.0  # seconds between polls of an idle worker thread
+JOBS_KEEP_DAYS = 7  # finished jobs older than this are purged
+
+# Deletion
+# Deleted dogs (and deleted users' rows) are removed by a background job in
+# batches of DELETION_BATCH_SIZE rows, one transaction per batch, with a
+# pause of DELETION_BATCH_PAUSE seconds in between (see pugorugh.deletion).
+DELETION_BATCH_SIZE = 500
+DELETION_BATCH_PAUSE = 0.01  # seconds
+
+# Slow Query Log
+# SQL statements slower than SLOW_QUERY_THRESHOLD_MS are logged with their
+# call site and query plan (the last SLOW_QUERY_LOG_SIZE per process; see
+# /admin/tools/slow-queries/ and `manage.py slow_query_report`). Set the
+# threshold to None to disable the log.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG_SIZE = 200
+SLOW_QUERY_DIR = os.path.join(tempfile.gettempdir(), 'pugorugh-slow-queries')
+
+# Traffic Capture
+# Set TRAFFIC_CAPTURE_FILE to record a sample of the API requests (as JSON
+# lines, without secrets) for `manage.py replay_traffic`.
+TRAFFIC_CAPTURE_FILE = None  # e.g., os.path.join(BASE_DIR, 'traffic.jsonl')
+TRAFFIC_CAPTURE_SAMPLE_RATE = 0.01
+
+# Profiling
+# Requests from staff users with `?_profile=1`, or with a signed `X-Profile`
+# header (`manage.py profile_token`), are profiled with cProfile and the
+# stats saved here (see /admin/tools/profiles/). Set to None to disable.
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_TOKEN_MAX_AGE = 60 * 60  # seconds
+PROFILE_KEEP = 100  # the oldest profiles beyond this number are deleted
+
+# API Formats
+# The API speaks JSON (encoded with orjson, if installed), and MessagePack
+# and CBOR if the packages listed here are installed (see
+# pugorugh.renderers).
+API_BINARY_FORMATS = [
+    (renderer, parser)
+    for package, renderer, parser in [
+        ('msgpack', 'pugorugh.renderers.MessagePackRenderer',
+         'pugorugh.renderers.MessagePackParser'),
+        ('cbor2', 'pugorugh.renderers.CBORRenderer',
+         'pugorugh.renderers.CBORParser'),
+    ]
+    if importlib.util.find_spec(package) is not None
+]
+
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        # (DRF's, encoding with orjson and sending prerendered JSON as is;
+        # see pugorugh.renderers)
+        'pugorugh.renderers.FastJSONRenderer',
+        *(renderer for renderer, _ in API_BINARY_FORMATS),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'pugorugh.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        *(parser for _, parser in API_BINARY_FORMATS),
+    ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        # (DRF's TokenAuthentication, traced)
+        'pugorugh.authentication.TokenAuthentication',
         # (note app registration page will fail CSRF if
         # SessionAuthentication is allowed)
         # 'rest_framework.authentication.SessionAuthentication',
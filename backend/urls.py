@@ -1,13 +1,16 @@
 from django.contrib import admin
 from django.urls import path, re_path, include
 
-from rest_framework.authtoken import views
+from pugorugh.views import UserLoginView, asset_view, dog_image_view
 
 
 # URL Patterns
 # ------------
 urlpatterns = [
     # Django
+    #   (staff-only diagnostic pages; before `admin/` so they aren't
+    #   swallowed by the admin's URLs)
+    path('admin/tools/', include('pugorugh.admin_urls')),
     path('admin/', admin.site.urls),
 
     # Rest Framework
@@ -18,8 +21,16 @@ urlpatterns = [
     re_path(r'^api-auth/', include('rest_framework.urls')),
     #   Built-in view for getting a token from a username/password
     #   (will return a JSON response when a valid username/password are POSTed)
-    re_path(r'^api-token-auth/', views.obtain_auth_token),
+    #   (pugorugh's, which also records the login)
+    re_path(r'^api-token-auth/', UserLoginView.as_view()),
 
     # Pug Or Ugh
+    #   Fingerprinted assets (see `pugorugh.assets`); outside of
+    #   `pugorugh.urls`, whose format suffixes would match their extensions
+    re_path(r'^assets/(?P<name>.+)$', asset_view, name='asset'),
+    #   Dog images, by version (see `pugorugh.images`)
+    re_path(r'^images/dogs/(?P<version>[0-9a-f]+-[0-9a-f]+)/'
+            r'(?P<filename>[^/]+)$',
+            dog_image_view, name='dog-image'),
     re_path(r'^', include('pugorugh.urls')),
 ]
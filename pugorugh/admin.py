@@ -1,8 +1,67 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import Dog, UserDog, UserPref
+from . import deletion
+from .models import (ArchivedSwipes, DeletionTask, Dog, Job, UserDog,
+                     UserPref)
+
+
+@admin.register(Dog)
+class DogAdmin(admin.ModelAdmin):
+    """Deletes dogs in the background (see deletion.py)"""
+
+    def delete_model(self, request, obj):
+        deletion.delete_dog(obj)
+
+    def delete_queryset(self, request, queryset):
+        for dog in queryset:
+            deletion.delete_dog(dog)
+
+    def get_deleted_objects(self, objs, request):
+        # (the default lists every related userdog: potentially thousands)
+        dogs = [str(dog) for dog in objs]
+        return dogs, {Dog._meta.verbose_name_plural: len(dogs)}, set(), []
+
+
+@admin.register(DeletionTask)
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'label', 'status', 'progress_label',
+                    'updated_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('kind', 'object_id', 'label', 'status', 'total',
+                       'deleted', 'error', 'created_at', 'updated_at')
+
+    def progress_label(self, obj):
+        return f'{obj.progress}% ({obj.deleted} of {obj.total})'
+    progress_label.short_description = 'progress'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_at',
+                    'locked_by', 'updated_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'arguments')
+    readonly_fields = ('name', 'arguments', 'status', 'attempts',
+                       'lease_until', 'locked_by', 'last_error', 'created_at',
+                       'updated_at', 'finished_at')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            finished_at=None
+        )
+        self.message_user(request, f"Queued {count} jobs")
+    retry_now.short_description = "Run the selected jobs again now"
+
+    def has_add_permission(self, request):
+        return False
 
 
-admin.site.register(Dog)
 admin.site.register(UserDog)
 admin.site.register(UserPref)
+admin.site.register(ArchivedSwipes)
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from . import admin_views
+
+
+# URL Patterns
+# ------------
+urlpatterns = [
+    path('profiles/', admin_views.profile_list, name='admin-profiles'),
+    path('profiles/<str:name>/', admin_views.profile_detail,
+         name='admin-profile-detail'),
+    path('slow-queries/', admin_views.slow_query_list,
+         name='admin-slow-queries'),
+]
@@ -0,0 +1,55 @@
+"""Staff-only diagnostic pages, served under `/admin/tools/` alongside the
+Django admin (see `admin_urls.py`).
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404
+from django.shortcuts import render
+
+from . import profiling
+from . import slow_queries
+
+
+def admin_context(request, title):
+    """Returns the context the `admin/base_site.html` template expects"""
+    return {**admin.site.each_context(request), 'title': title}
+
+
+@staff_member_required
+def profile_list(request):
+    """Lists the saved request profiles, newest first, with the slowest
+    functions in this app's code for each
+    """
+    context = admin_context(request, "Request profiles")
+    context['profiles'] = [
+        profiling.summary(name) for name in profiling.profile_names()
+    ]
+    context['token'] = profiling.make_token()
+    return render(request, 'pugorugh/admin/profiles.html', context)
+
+
+@staff_member_required
+def profile_detail(request, name):
+    """Shows the pstats report for one profile"""
+    if profiling.profile_path(name) is None:
+        raise Http404("No such profile")
+    context = admin_context(request, name)
+    context['report'] = profiling.report(name)
+    context['top'] = profiling.top_functions(profiling.profile_path(name),
+                                             limit=20, project_only=True)
+    return render(request, 'pugorugh/admin/profile_detail.html', context)
+
+
+@staff_member_required
+def slow_query_list(request):
+    """Shows the slow query log, grouped by fingerprint, and the most
+    recent slow queries
+    """
+    entries, plans = slow_queries.collect()
+    context = admin_context(request, "Slow queries")
+    context['groups'] = slow_queries.summarize(entries, plans)
+    context['recent'] = entries[:50]
+    context['threshold_ms'] = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS',
+                                      None)
+    return render(request, 'pugorugh/admin/slow_queries.html', context)
@@ -0,0 +1,174 @@
+"""Cold storage for the swipes of inactive users.
+
+Users who haven't been seen for `settings.ARCHIVE_AFTER_DAYS` can have their
+`UserDog` rows moved out of the (hot) `UserDog` table into one compressed
+`ArchivedSwipes` row each (`manage.py archive_inactive_users`; run it
+periodically), so that the table and its indexes only grow with the
+active users.
+
+The swipes are restored, in one bulk insert, the next time the user logs
+in or authenticates with their token (see `touch`). A user counts as seen
+when their `last_login` is updated: on login, and at most every
+`settings.ARCHIVE_TOUCH_INTERVAL` seconds by token authentication (so that
+API clients that keep their token aren't mistaken for inactive users).
+"""
+import logging
+import struct
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# dog id, status, favourite, met in person
+ROW = struct.Struct('<Ic??')
+COMPRESSION_LEVEL = 6
+
+
+def pack(rows):
+    """Takes (dog id, status, favourite, met in person) tuples and returns
+    them packed and compressed
+    """
+    data = b''.join(
+        ROW.pack(dog_id, status.encode('ascii'), favourite, met_in_person)
+        for dog_id, status, favourite, met_in_person in sorted(rows)
+    )
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def unpack(data):
+    """Returns the (dog id, status, favourite, met in person) tuples in
+    `pack`ed data
+    """
+    return [
+        (dog_id, status.decode('ascii'), favourite, met_in_person)
+        for dog_id, status, favourite, met_in_person
+        in ROW.iter_unpack(zlib.decompress(bytes(data)))
+    ]
+
+
+# Archiving
+# ---------
+def inactive_user_ids(days=None):
+    """Returns the ids of the users not seen for `days` (by default,
+    `settings.ARCHIVE_AFTER_DAYS`)
+    """
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    return list(
+        get_user_model().objects.filter(
+            Q(last_login__lt=cutoff) |
+            Q(last_login__isnull=True, date_joined__lt=cutoff)
+        ).order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def archive_user(user_id):
+    """Moves a user's userdogs into their archive (adding to any archive
+    they already have). Returns the number of userdogs moved.
+    """
+    from .models import ArchivedSwipes, UserDog
+
+    with transaction.atomic():
+        userdogs = UserDog.objects.for_user(user_id)
+        rows = list(userdogs.values_list('dog_id', 'status', 'favourite',
+                                         'met_in_person'))
+        if not rows:
+            return 0
+
+        archived = (ArchivedSwipes.objects.select_for_update()
+                    .filter(user_id=user_id).first())
+        if archived is not None:
+            # (the rows in the table are newer)
+            live_ids = {row[0] for row in rows}
+            rows += [row for row in unpack(archived.data)
+                     if row[0] not in live_ids]
+        else:
+            archived = ArchivedSwipes(user_id=user_id)
+        archived.data = pack(rows)
+        archived.count = len(rows)
+        archived.save()
+
+        userdogs.delete()
+    return len(rows)
+
+
+def archive_users(user_ids, chunk_size=None):
+    """Archives the userdogs of the users, `chunk_size` users per
+    transaction. Returns the number of (users, userdogs) archived.
+    """
+    from .models import UserDog
+
+    if chunk_size is None:
+        chunk_size = settings.ARCHIVE_CHUNK_SIZE
+    users = userdogs = 0
+    for start in range(0, len(user_ids), chunk_size):
+        with transaction.atomic():
+            for user_id in user_ids[start:start + chunk_size]:
+                if not UserDog.objects.for_user(user_id).exists():
+                    continue
+                userdogs += archive_user(user_id)
+                users += 1
+        logger.info("Archived the swipes of %s users (%s userdogs)",
+                    users, userdogs)
+    return users, userdogs
+
+
+# Restoring
+# ---------
+def restore_user(user_id):
+    """Moves a user's archived swipes back into `UserDog`. Returns the
+    number of userdogs restored.
+    """
+    from .models import ArchivedSwipes, Dog, UserDog
+
+    # (most users have no archive: don't take the write lock for them)
+    if not ArchivedSwipes.objects.filter(user_id=user_id).exists():
+        return 0
+    with transaction.atomic():
+        archived = (ArchivedSwipes.objects.select_for_update()
+                    .filter(user_id=user_id).first())
+        if archived is None:
+            return 0
+
+        rows = unpack(archived.data)
+        # (the dogs deleted since don't come back)
+        live_dogs = set(
+            Dog.objects.filter(
+                pk__in=[row[0] for row in rows]
+            ).values_list('pk', flat=True)
+        )
+        # (ignore_conflicts: any swipes made since the archive win)
+        UserDog.objects.bulk_create(
+            [UserDog(user_id=user_id, dog_id=dog_id, status=status,
+                     favourite=favourite, met_in_person=met_in_person)
+             for dog_id, status, favourite, met_in_person in rows
+             if dog_id in live_dogs],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        archived.delete()
+    logger.info("Restored %s archived swipes for user %s", len(rows),
+                user_id)
+    return len(rows)
+
+
+def touch(user):
+    """Records that the user has been seen (if their `last_login` is more
+    than `settings.ARCHIVE_TOUCH_INTERVAL` seconds old), restoring their
+    archived swipes if they have any
+    """
+    now = timezone.now()
+    interval = timedelta(seconds=settings.ARCHIVE_TOUCH_INTERVAL)
+    if user.last_login is not None and now - user.last_login < interval:
+        return
+    user.last_login = now
+    get_user_model().objects.filter(pk=user.pk).update(last_login=now)
+    restore_user(user.pk)
@@ -0,0 +1,208 @@
+"""Fingerprinted, precompressed static assets.
+
+`manage.py build_assets` (run it on each deploy) writes to
+`settings.ASSETS_DIR`:
+
+- each bundle in `settings.ASSET_BUNDLES` (its source files, concatenated)
+  and each file in `settings.ASSET_FILES`, named after the MD5 of its
+  content (e.g., `js/pugorugh.3f2a1b4c5d6e.js`);
+- a gzip (and, if the `brotli` package is installed, a Brotli) variant of
+  each, when it is smaller;
+- `manifest.json`, which maps the names to the fingerprinted names.
+
+Since a fingerprinted file never changes, the asset view lets browsers cache
+it for a year. The templates refer to the assets with the `asset` and
+`bundle` tags (`{% load assets %}`), which fall back on the source files in
+the static directory until the assets have been built (e.g., under
+development).
+
+Earlier builds are left in place, so that pages rendered before a deploy can
+still load their assets: the asset view serves any fingerprinted file in
+`settings.ASSETS_DIR`, not just the ones in the current manifest.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# a fingerprinted name's hash (see `fingerprint`), before its extension
+FINGERPRINT_PATTERN = re.compile(rf'\.[0-9a-f]{{{HASH_LENGTH}}}$')
+
+# file name extension -> Content-Encoding, best first
+ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+
+# manifest path -> (modification time, {name: fingerprinted name})
+_manifests = {}
+
+
+# Manifest
+# --------
+def manifest_path():
+    return os.path.join(settings.ASSETS_DIR, MANIFEST_NAME)
+
+
+def manifest():
+    """Returns the {name: fingerprinted name} of the built assets (empty if
+    they haven't been built). Reloaded when the manifest changes.
+    """
+    path = manifest_path()
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return {}
+    cached = _manifests.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'r') as file:
+            cached = (mtime, json.load(file)['files'])
+        _manifests[path] = cached
+    return cached[1]
+
+
+def url(name):
+    """Returns the URL of the fingerprinted asset `name`, or None if it
+    hasn't been built
+    """
+    fingerprinted = manifest().get(name)
+    if fingerprinted is None:
+        return None
+    return settings.ASSETS_URL + fingerprinted
+
+
+def is_fingerprinted(fingerprinted):
+    """Returns whether `fingerprinted` names a file built (by this build or
+    an earlier one) in `settings.ASSETS_DIR`
+    """
+    base, _ = os.path.splitext(fingerprinted)
+    if not FINGERPRINT_PATTERN.search(base):
+        return False
+    # (and not outside the directory, e.g., through '..' or a symlink)
+    root = os.path.realpath(settings.ASSETS_DIR)
+    path = os.path.realpath(os.path.join(root, fingerprinted))
+    if os.path.commonpath([root, path]) != root:
+        return False
+    return os.path.isfile(path)
+
+
+# Building
+# --------
+def fingerprint(name, content):
+    """Returns `name` with the hash of `content` before its extension"""
+    base, extension = os.path.splitext(name)
+    digest = hashlib.md5(content).hexdigest()[:HASH_LENGTH]
+    return f'{base}.{digest}{extension}'
+
+
+def read_source(name):
+    path = finders.find(name)
+    if path is None:
+        raise FileNotFoundError(f"Static file {name!r} not found")
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def bundle(names):
+    """Returns the content of the source files, concatenated"""
+    # (`;` ends a last statement that has no semicolon of its own)
+    sources = [read_source(name).rstrip() for name in names]
+    return b'\n;\n'.join(sources) + b'\n'
+
+
+def compressed(content):
+    """Yields the (extension, content) of the compressed variants worth
+    keeping (those smaller than the original)
+    """
+    variants = [('.gz', gzip.compress(content, GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(content,
+                                                quality=BROTLI_QUALITY)))
+    for extension, data in variants:
+        if len(data) < len(content):
+            yield extension, data
+
+
+def write(path, content):
+    """Writes the file atomically (a server may be reading it)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, 'wb') as file:
+        file.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+def build():
+    """Builds the assets and their manifest. Returns a list of (name,
+    fingerprinted name, {extension: size}).
+    """
+    sources = {name: bundle(names)
+               for name, names in settings.ASSET_BUNDLES.items()}
+    sources.update((name, read_source(name))
+                   for name in settings.ASSET_FILES)
+
+    files = {}
+    built = []
+    for name, content in sources.items():
+        fingerprinted = fingerprint(name, content)
+        path = os.path.join(settings.ASSETS_DIR, fingerprinted)
+        sizes = {'': len(content)}
+        write(path, content)
+        for extension, data in compressed(content):
+            write(path + extension, data)
+            sizes[extension] = len(data)
+        files[name] = fingerprinted
+        built.append((name, fingerprinted, sizes))
+
+    # (last, so that the new names are only used once the files exist)
+    write(manifest_path(), json.dumps({'files': files}, indent=2).encode())
+    logger.info("Built %s assets in %s", len(files), settings.ASSETS_DIR)
+    return built
+
+
+# Serving
+# -------
+def accepted_encodings(header):
+    """Returns the content codings the Accept-Encoding header allows"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, parameters = part.strip().partition(';')
+        quality = parameters.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def variant(fingerprinted, accept_encoding):
+    """Returns the (path, Content-Encoding) of the best variant of the
+    asset that the client accepts (the encoding is None for the original)
+    """
+    path = os.path.join(settings.ASSETS_DIR, fingerprinted)
+    accepted = accepted_encodings(accept_encoding)
+    for extension, encoding in ENCODINGS.items():
+        if encoding in accepted and os.path.isfile(path + extension):
+            return path + extension, encoding
+    return path, None
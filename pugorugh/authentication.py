@@ -0,0 +1,17 @@
+from rest_framework import authentication
+
+from . import archive
+from . import tracing
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """DRF's token authentication, with the token lookup traced (see
+    `tracing.py`), that also records that the user has been seen (see
+    `archive.touch`)
+    """
+
+    @tracing.span('auth.token')
+    def authenticate_credentials(self, key):
+        user, token = super().authenticate_credentials(key)
+        archive.touch(user)
+        return user, token
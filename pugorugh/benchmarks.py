@@ -0,0 +1,215 @@
+"""Helpers for benchmarking the API (see the `benchmark` management command).
+
+Requests can be sent either through Django's test `Client` (which skips the
+WSGI layer) or straight into the project's WSGI application with a
+hand-built WSGI environ (which exercises the same code path as a real
+server, minus the network).
+"""
+import json
+import subprocess
+import sys
+import threading
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import connections
+
+
+# Statistics
+# ----------
+def percentile(sorted_samples, pct):
+    """Returns the `pct`th percentile (nearest-rank) of an already sorted
+    list of samples
+    """
+    if not sorted_samples:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def summarize(samples, elapsed, errors=0):
+    """Takes a list of latencies (seconds), the wall-clock time taken to
+    collect them (seconds) and the number of failed requests and returns a
+    dict of throughput and latency statistics (milliseconds)
+    """
+    ordered = sorted(samples)
+    throughput = round(len(ordered) / elapsed, 2) if elapsed else None
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': throughput,
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'max_ms': ms(ordered[-1]) if ordered else None,
+    }
+
+
+def measure(send, count, warmup=0):
+    """Calls `send()` `warmup` times (unmeasured) then `count` times and
+    returns the `summarize`d results. `send` returns an HTTP status code;
+    5xx codes count as errors (a 404 from next-dog just means there are no
+    dogs with that status).
+    """
+    for _ in range(warmup):
+        send()
+
+    samples = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        request_start = time.perf_counter()
+        status_code = send()
+        samples.append(time.perf_counter() - request_start)
+        if status_code >= 500:
+            errors += 1
+    return summarize(samples, time.perf_counter() - start, errors)
+
+
+def measure_concurrent(make_send, threads, count, warmup=0):
+    """Like `measure`, but from `threads` threads at once, each calling
+    `make_send(index)` to get its own `send` function and then sending
+    `count` requests. Returns the `summarize`d results of all the threads
+    (the throughput is over the wall-clock time).
+    """
+    lock = threading.Lock()
+    samples = []
+    errors = [0]
+    ready = threading.Barrier(threads + 1)
+    done = threading.Barrier(threads + 1)
+
+    def worker(index):
+        try:
+            send = make_send(index)
+            for _ in range(warmup):
+                send()
+            ready.wait()
+
+            thread_samples = []
+            thread_errors = 0
+            for _ in range(count):
+                request_start = time.perf_counter()
+                try:
+                    status_code = send()
+                except Exception:
+                    status_code = 599
+                thread_samples.append(time.perf_counter() - request_start)
+                if status_code >= 500:
+                    thread_errors += 1
+            with lock:
+                samples.extend(thread_samples)
+                errors[0] += thread_errors
+            done.wait()
+        except BaseException:
+            # (so that the other threads don't wait forever)
+            ready.abort()
+            done.abort()
+            raise
+        finally:
+            # (each thread has its own database connections)
+            connections.close_all()
+
+    workers = [
+        threading.Thread(target=worker, args=(index,), daemon=True)
+        for index in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    try:
+        ready.wait()
+        start = time.perf_counter()
+        done.wait()
+    except threading.BrokenBarrierError:
+        raise RuntimeError("A benchmark thread failed")
+    elapsed = time.perf_counter() - start
+    for thread in workers:
+        thread.join()
+    return summarize(samples, elapsed, errors[0])
+
+
+# Requests
+# --------
+def client_host():
+    """Returns a Host header value that passes the ALLOWED_HOSTS check
+    (the test client's default, 'testserver', is only allowed under test)
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def wsgi_request(application, method, path, headers=None, body=b'',
+                 content_type='application/json', query_string=''):
+    """Calls the WSGI `application` directly and returns
+    (status code, response headers, response body)
+    """
+    environ = {
+        'REQUEST_METHOD': method.upper(),
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'CONTENT_LENGTH': str(len(body)),
+        'CONTENT_TYPE': content_type,
+        'wsgi.input': BytesIO(body),
+    }
+    environ.update(headers or {})
+    setup_testing_defaults(environ)
+
+    captured = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = response_headers
+
+    result = application(environ, start_response)
+    try:
+        content = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return captured['status'], captured['headers'], content
+
+
+# Reporting
+# ---------
+def git_revision():
+    """Returns the current commit hash (or None outside a git checkout)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(results, **meta):
+    """Wraps benchmark results with enough metadata to compare runs"""
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            **meta,
+        },
+        'results': results,
+    }
+
+
+def write_report(data, output=None):
+    """Writes the report as JSON to `output` (a path) or stdout"""
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
@@ -0,0 +1,185 @@
+"""Shared, precomputed candidate lists for the 'undecided' dog feed.
+
+The preference fields on `UserPref` can only take a handful of values (the
+`UserPrefSerializer` validators limit them to subsets of the age, gender and
+size classes), so every user with the same preferences sees exactly the same
+set of pref-filtered dogs. Rather than running the `with_prefs` subqueries
+for every user on every request, we compute the sorted list of candidate dog
+ids once per *preference signature* and share it between users.
+
+The lists are kept in each process's memory (as compact arrays, so reading
+one costs nothing), keyed by the signature and the *catalog version*. The
+catalog version lives in the database (`CatalogVersion`), so every process
+sees it change, and it is bumped whenever dogs are saved, deleted, updated
+or bulk-created through the ORM (see signals.py and `DogQuerySet`); stale
+lists are never read, they are just evicted (only the
+`CANDIDATES_CACHE_SIZE` most recently used lists are kept).
+
+A user's undecided feed is then the shared candidate list minus the dogs
+the user has already rated, which are looked up one page of candidates at a
+time (a range scan of the user's userdogs), rather than all at once. A user
+who has rated most of their candidates would need many pages, so after
+`CANDIDATES_MAX_PAGES` the rest is left to one anti-join query.
+"""
+import itertools
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from . import metrics
+from . import tracing
+from .managers import AGE_MAPPING
+
+
+CANDIDATES_CACHE_SIZE = 64  # lists kept per process
+CANDIDATES_PAGE_SIZE = 200  # candidates checked for ratings at a time
+CANDIDATES_MAX_PAGES = 3  # pages checked before querying the rest at once
+
+AGE_ORDER = [tup[0] for tup in AGE_MAPPING]
+GENDER_ORDER = ['m', 'f']
+SIZE_ORDER = ['s', 'm', 'l', 'xl']
+
+
+# Catalog Version
+# ---------------
+def catalog_version(using=None):
+    """Returns the current catalog version"""
+    from .models import CatalogVersion
+
+    manager = CatalogVersion.objects.db_manager(using)
+    version = manager.filter(pk=1).values_list('version', flat=True).first()
+    if version is None:  # (not created by the migration)
+        version = manager.get_or_create(
+            pk=1, defaults={'version': time.time_ns() // 1000}
+        )[0].version
+    return version
+
+
+def bump_catalog_version(using=None):
+    """Invalidates every shared candidate list.
+
+    The new version is at least the time in microseconds rather than just
+    the next number, so that a version is never reused for a different
+    catalog, even if the transaction that bumped it is rolled back.
+    """
+    from .models import CatalogVersion
+
+    manager = CatalogVersion.objects.db_manager(using)
+    if not manager.filter(pk=1).update(
+        version=Greatest(F('version') + 1, time.time_ns() // 1000)
+    ):
+        catalog_version(using)
+
+
+# Signatures
+# ----------
+def _normalise(value, order):
+    """Takes a comma-separated preference string and returns it with the
+    components in canonical order (so 'l,s' and 's,l' are the same)
+    """
+    components = set(value.split(","))
+    return ",".join([item for item in order if item in components])
+
+
+def pref_signature(userpref):
+    """Returns a string that is identical for any two `UserPref`s that
+    select the same dogs
+    """
+    return "|".join([
+        _normalise(userpref.age, AGE_ORDER),
+        _normalise(userpref.gender, GENDER_ORDER),
+        _normalise(userpref.size, SIZE_ORDER),
+    ])
+
+
+# Candidate Lists
+# ---------------
+_lists = OrderedDict()  # (version, signature) -> array of ids
+_lists_lock = threading.Lock()
+
+
+def candidate_ids(user):
+    """Returns the sorted array of ids of all the dogs that match the user's
+    preferences (regardless of whether the user has rated them)
+    """
+    # Imported here to avoid a circular import (models imports managers)
+    from .models import Dog
+
+    key = (catalog_version(), pref_signature(user.userpref))
+    with _lists_lock:
+        ids = _lists.get(key)
+        if ids is not None:
+            _lists.move_to_end(key)
+    metrics.inc('pugorugh_cache_requests_total',
+                {'cache': 'candidates',
+                 'result': 'miss' if ids is None else 'hit'})
+    if ids is None:
+        with tracing.span('candidates.query'):
+            ids = array('q', Dog.objects.with_prefs(user).order_by(
+                'pk'
+            ).values_list('pk', flat=True))
+        with _lists_lock:
+            _lists[key] = ids
+            while len(_lists) > CANDIDATES_CACHE_SIZE:
+                _lists.popitem(last=False)
+    return ids
+
+
+def rated_ids(user, first_id, last_id):
+    """Returns the set of ids between `first_id` and `last_id` (inclusive)
+    of the dogs the user has liked or disliked
+    """
+    from .models import UserDog
+
+    return set(
+        UserDog.objects.for_user(user).filter(
+            dog_id__gte=first_id, dog_id__lte=last_id
+        ).values_list('dog_id', flat=True)
+    )
+
+
+def _pages(ids, start):
+    """Yields the ids from index `start` on and then the ones before it
+    (wrapping around), `CANDIDATES_PAGE_SIZE` at a time
+    """
+    for low, high in [(start, len(ids)), (0, start)]:
+        for page in range(low, high, CANDIDATES_PAGE_SIZE):
+            yield ids[page:min(page + CANDIDATES_PAGE_SIZE, high)]
+
+
+def next_undecided_id(user, after_pk=-1):
+    """Returns the id of the first undecided dog (that matches the user's
+    preferences) with a pk greater than `after_pk`, wrapping around to the
+    lowest pk if necessary. Returns None if there are no undecided dogs.
+    """
+    ids = candidate_ids(user)
+    pages = _pages(ids, bisect_right(ids, after_pk))
+    for page in itertools.islice(pages, CANDIDATES_MAX_PAGES):
+        rated = rated_ids(user, page[0], page[-1])
+        for dog_id in page:
+            if dog_id not in rated:
+                return dog_id
+    if next(pages, None) is None:
+        return None
+    return first_undecided_id(user, after_pk)
+
+
+def first_undecided_id(user, after_pk):
+    """Returns the same as `next_undecided_id`, with an anti-join query (one
+    more, from the lowest pk, if it has to wrap around)
+    """
+    from .models import Dog
+
+    with tracing.span('candidates.anti_join'):
+        undecided = Dog.objects.with_prefs(user).with_status(
+            user, 'u'
+        ).order_by('pk').values_list('pk', flat=True)
+        dog_id = undecided.filter(pk__gt=after_pk).first()
+        if dog_id is None:
+            dog_id = undecided.first()
+    return dog_id
@@ -0,0 +1,106 @@
+"""SQLite connection tuning.
+
+Every new SQLite connection is configured with `settings.SQLITE_PRAGMAS`
+(see the `connection_created` receiver in `signals.py`). The defaults are
+for concurrent reads and writes:
+
+- `journal_mode=wal`: readers don't block the writer (or vice versa); this
+  is stored in the database file, so it persists until changed.
+- `synchronous=normal`: in WAL mode this is still corruption-safe; a power
+  loss can only lose the last few commits.
+- `busy_timeout`: a writer waits (in ms) for the lock instead of failing
+  at once with "database is locked".
+- `mmap_size`, `cache_size` and `temp_store`: memory-map the database file,
+  keep more pages in the page cache and keep temporary tables in memory.
+
+It also starts the connection's transactions (`atomic` blocks) with
+`BEGIN {settings.SQLITE_TRANSACTION_MODE}` (except on the read replicas).
+Django's plain `BEGIN` is deferred: the transaction starts as a reader, and
+if another connection commits a write before it writes too, its first
+write fails at once with "database is locked" (`busy_timeout` doesn't
+apply). `BEGIN IMMEDIATE` takes the write lock up front, waiting up to
+`busy_timeout` for it.
+
+see: https://www.sqlite.org/pragma.html,
+https://www.sqlite.org/lang_transaction.html
+"""
+import functools
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+
+
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite(connection):
+    """Applies `settings.SQLITE_PRAGMAS` and `SQLITE_TRANSACTION_MODE` to a
+    new SQLite connection
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    # (the DB-API cursor: the pragmas shouldn't be counted or logged as
+    # application queries)
+    cursor = connection.connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+    # (Django's sqlite3 backend starts every transaction with this; the
+    # replicas are only read, and mustn't block their snapshots)
+    mode = getattr(settings, 'SQLITE_TRANSACTION_MODE', None)
+    if connection.alias in getattr(settings, 'DATABASE_REPLICAS', []):
+        mode = None
+    mode = mode or 'DEFERRED'
+    connection._start_transaction_under_autocommit = functools.partial(
+        begin, connection, mode
+    )
+    logger.debug("Configured SQLite connection: %s (BEGIN %s)", pragmas,
+                 mode)
+
+
+def begin(connection, mode):
+    """Starts a transaction on a SQLite connection in the given mode
+    ('DEFERRED', 'IMMEDIATE' or 'EXCLUSIVE')
+    """
+    connection.cursor().execute(f'BEGIN {mode}')
+
+
+def pragma_values(connection, names):
+    """Returns a dict of the current values of the named pragmas"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def object_sizes(connection, table):
+    """Returns a dict of the bytes used by a table and by each of its
+    indexes (None if the database can't report it: it needs SQLite's
+    `dbstat` virtual table)
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE tbl_name = %s AND type IN ('table', 'index')",
+                [table]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat "
+                f"WHERE name IN ({', '.join(['%s'] * len(names))}) "
+                "GROUP BY name",
+                names
+            )
+            return dict(cursor.fetchall())
+    except DatabaseError:
+        return None
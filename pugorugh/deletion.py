@@ -0,0 +1,191 @@
+"""Background deletion of dogs and of deleted users' rows.
+
+Deleting a dog with `dog.delete()` makes Django's collector load every
+related `UserDog` and delete them all in one transaction, holding SQLite's
+write lock for as long as that takes. Instead, `delete_dog`:
+
+1. marks the dog as deleted (a *tombstone*), which hides it from
+   `Dog.objects` (and so from every `DogQuerySet` path) at once;
+2. records a `DeletionTask` (listed in the admin, with its progress);
+
+and a background job (see jobs.py) then deletes the related userdogs in
+batches of
+`settings.DELETION_BATCH_SIZE`, each in its own transaction (pausing
+`settings.DELETION_BATCH_PAUSE` seconds in between, so that swipes get the
+write lock too), removes the dog's image file and finally deletes the dog.
+A deleted user's rows (see `delete_user`) are removed the same way.
+
+The batches can be repeated safely, so a task interrupted by a crash is
+simply run again when its job is retried; `manage.py resume_deletions`
+runs any unfinished tasks directly.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from . import images, jobs
+
+
+logger = logging.getLogger(__name__)
+
+
+# Scheduling
+# ----------
+def delete_dog(dog):
+    """Hides the dog at once and deletes it (and its userdogs) in the
+    background. Returns the `DeletionTask`.
+    """
+    from .models import DeletionTask, Dog, UserDog
+
+    with transaction.atomic():
+        Dog.all_objects.filter(pk=dog.pk).update(deleted=True)
+        task = DeletionTask.objects.create(
+            kind=DeletionTask.DOG,
+            object_id=dog.pk,
+            label=dog.name,
+            total=UserDog.objects.filter(dog_id=dog.pk).count()
+        )
+    jobs.enqueue(run_task, task.pk)
+    return task
+
+
+def delete_user(user):
+    """Deletes the rows of a deleted user in the background (see the
+    `post_delete` receiver in signals.py). Returns the `DeletionTask`.
+    """
+    from .models import DeletionTask, UserDog
+
+    task = DeletionTask.objects.create(
+        kind=DeletionTask.USER,
+        object_id=user.pk,
+        label=str(user),
+        total=UserDog.objects.for_user(user.pk).count()
+    )
+    # (if the job runs before the user's deletion has committed (e.g.,
+    # with the users in another database), it fails and is retried)
+    jobs.enqueue(run_task, task.pk)
+    return task
+
+
+# Running
+# -------
+@jobs.job(max_attempts=10)
+def run_task(task_id):
+    """Runs a deletion task (the job enqueued by `delete_dog` and
+    `delete_user`); raises if it fails, so that the job is retried
+    """
+    from .models import DeletionTask
+
+    task = DeletionTask.objects.get(pk=task_id)
+    if task.status == DeletionTask.DONE:
+        return
+    run(task)
+    if task.status == DeletionTask.FAILED:
+        raise RuntimeError(f"Deletion task {task.pk} failed: {task.error}")
+
+
+def run(task):
+    """Runs a deletion task to completion (or failure)"""
+    from .models import DeletionTask
+
+    steps = {
+        DeletionTask.DOG: _delete_dog,
+        DeletionTask.USER: _delete_user,
+    }
+    task.status = DeletionTask.RUNNING
+    task.save(update_fields=['status', 'updated_at'])
+    try:
+        steps[task.kind](task)
+    except Exception as error:
+        logger.exception("Deletion task %s failed", task.pk)
+        task.status = DeletionTask.FAILED
+        task.error = str(error)
+    else:
+        task.status = DeletionTask.DONE
+        task.error = ''
+    task.save(update_fields=['status', 'error', 'deleted', 'updated_at'])
+
+
+def delete_in_batches(task, queryset):
+    """Deletes the rows of `queryset` in batches, each in its own
+    transaction, counting them in the task's progress
+    """
+    batch_size = getattr(settings, 'DELETION_BATCH_SIZE', 500)
+    pause = getattr(settings, 'DELETION_BATCH_PAUSE', 0)
+    model = queryset.model
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            deleted, _ = model.objects.filter(pk__in=ids).delete()
+            task.deleted += deleted
+            task.save(update_fields=['deleted', 'updated_at'])
+        if pause:
+            time.sleep(pause)
+
+
+def _delete_dog(task):
+    from .models import Dog, UserDog
+
+    dog = Dog.all_objects.filter(pk=task.object_id).first()
+    if dog is None:  # (already done)
+        return
+    if not dog.deleted:
+        raise ValueError(f"Dog {dog.pk} isn't marked as deleted")
+
+    delete_in_batches(task, UserDog.objects.filter(dog_id=dog.pk))
+    remove_image(dog)
+    Dog.all_objects.filter(pk=dog.pk).delete()
+    logger.info("Deleted dog %s (%s userdogs)", dog.pk, task.deleted)
+
+
+def _delete_user(task):
+    from .models import ArchivedSwipes, UserDog, UserPref
+
+    if get_user_model().objects.filter(pk=task.object_id).exists():
+        raise ValueError(f"User {task.object_id} still exists")
+
+    delete_in_batches(task, UserDog.objects.for_user(task.object_id))
+    UserPref.objects.filter(user_id=task.object_id).delete()
+    ArchivedSwipes.objects.filter(user_id=task.object_id).delete()
+    logger.info("Deleted the rows of user %s (%s userdogs)",
+                task.object_id, task.deleted)
+
+
+def remove_image(dog):
+    """Deletes a dog's image file (unless another dog uses it too)"""
+    from .models import Dog
+
+    if not dog.image_filename:
+        return
+    shared = Dog.all_objects.filter(
+        image_filename=dog.image_filename
+    ).exclude(pk=dog.pk).exists()
+    if shared:
+        return
+    try:
+        os.remove(os.path.join(settings.DOG_UPLOAD_DIR, dog.image_filename))
+    except FileNotFoundError:
+        pass
+    images.forget(dog.image_filename)
+
+
+def resume():
+    """Runs the tasks left pending or running (e.g., by a restart). Returns
+    the number of tasks run.
+    """
+    from .models import DeletionTask
+
+    tasks = DeletionTask.objects.filter(
+        status__in=[DeletionTask.PENDING, DeletionTask.RUNNING]
+    ).order_by('pk')
+    count = 0
+    for task in tasks:
+        run(task)
+        count += 1
+    return count
@@ -0,0 +1,52 @@
+"""A cache of the dogs' rendered JSON.
+
+A dog's JSON only changes when the dog does, so rather than running the
+`DogSerializer` (whose field introspection costs more than the query that
+fetched the dog) on every request, the dog views send the bytes rendered
+the first time:
+
+    return Response(dog_json.get(dog))
+
+The cached bytes are keyed by the dog's id and `row_version`, which changes
+on every save and every queryset `update()` (see `DogQuerySet`), so an
+edited dog is never served stale (the old entry just ages out); deleting a
+dog also drops its entry (see `signals.py`). Raw SQL that changes dogs must
+bump their `row_version` itself, or they are served stale for up to
+`DOG_JSON_TIMEOUT`. (The image URL in the JSON is the one current when it
+was rendered; an outdated one redirects to the current image, see
+images.py.)
+"""
+from django.core.cache import cache
+
+from .renderers import FastJSONRenderer, Prerendered
+
+
+DOG_JSON_KEY = 'pugorugh:dog-json:{id}:{version}'
+DOG_JSON_TIMEOUT = 60 * 60 * 24  # a day; versioning handles invalidation
+
+
+def key(dog):
+    return DOG_JSON_KEY.format(id=dog.pk, version=dog.row_version)
+
+
+def render(dog):
+    """Returns the dog's JSON, rendered by the serializer"""
+    from .serializers import DogSerializer
+
+    return FastJSONRenderer().render(DogSerializer(dog).data)
+
+
+def get(dog):
+    """Returns the dog's JSON (from the cache if possible) as `Prerendered`
+    response data
+    """
+    dog_key = key(dog)
+    content = cache.get(dog_key)
+    if content is None:
+        content = render(dog)
+        cache.set(dog_key, content, DOG_JSON_TIMEOUT)
+    return Prerendered(content)
+
+
+def invalidate(dog):
+    cache.delete(key(dog))
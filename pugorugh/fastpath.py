@@ -0,0 +1,192 @@
+"""A read-only fast path for serializing many dogs.
+
+Loading `Dog` instances and running `DogSerializer(many=True)` costs a model
+instance, a serializer field lookup and a `to_representation` call per field
+per dog. For the endpoints that send many dogs at once (list, batch and
+export) we fetch `values_list` tuples of just the columns the serializer
+needs, and turn them into dicts with a `FieldMapper` compiled once from the
+serializer's fields:
+
+    dicts = fastpath.dogs(Dog.objects.filter(...))
+
+The dicts are the same as `DogSerializer(dog).data` (same keys, order and
+values). A mapper can also be compiled for some of the serializer's fields
+(a sparse fieldset, e.g., `?fields=id,name`), and then only fetches the
+columns those fields need: a `SerializerMethodField` needs the model fields
+its serializer lists for it in `method_field_sources`.
+
+Only fields whose representation is the raw column value (char, integer,
+choice and boolean fields) and `SerializerMethodField`s are supported;
+compiling a mapper for a serializer with any other kind of field raises
+`ImproperlyConfigured`, so that the two can't silently diverge.
+"""
+from collections import namedtuple
+from operator import attrgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import fields as serializer_fields
+
+from . import tracing
+from .renderers import FastJSONRenderer
+
+
+# (fields whose `to_representation` returns the column value unchanged, for
+# the values the model allows)
+RAW_FIELDS = (
+    serializer_fields.CharField,
+    serializer_fields.IntegerField,
+    serializer_fields.ChoiceField,
+    serializer_fields.BooleanField,
+)
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+class FieldMapper:
+    """Turns `values_list` rows into the serializer's representation.
+
+    `fields` are the names of the serializer fields to send (all of them
+    by default; `names` are all of them). `columns` are the model fields to
+    fetch, in row order; the methods of `SerializerMethodField`s get each
+    row as a record (a namedtuple, i.e., with `__slots__`) with those fields
+    as attributes.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        serializer = serializer_class()
+        method_field_sources = getattr(serializer_class,
+                                       'method_field_sources', {})
+        self.names = tuple(serializer.fields)
+        if fields is not None and not set(fields) <= set(self.names):
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__} has no fields "
+                f"{', '.join(sorted(set(fields) - set(self.names)))}"
+            )
+        columns = []
+        getters = []
+        for name, field in serializer.fields.items():
+            if fields is not None and name not in fields:
+                continue
+            if isinstance(field, serializer_fields.SerializerMethodField):
+                method = getattr(serializer, field.method_name)
+                getters.append((name, method))
+                columns.extend(source for source in
+                               method_field_sources.get(name, ())
+                               if source not in columns)
+            elif (isinstance(field, RAW_FIELDS) and
+                  not isinstance(field, serializer_fields.MultipleChoiceField)
+                  and '.' not in field.source):
+                if field.source not in columns:
+                    columns.append(field.source)
+                getters.append((name, attrgetter(field.source)))
+            else:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} "
+                    f"({type(field).__name__}) isn't supported by the fast "
+                    f"path"
+                )
+        self.columns = tuple(columns)
+        self.record = namedtuple('Record', self.columns)
+        self.getters = tuple(getters)
+
+    def to_dict(self, row):
+        record = self.record._make(row)
+        return {name: get(record) for name, get in self.getters}
+
+    def instance_to_dict(self, instance):
+        """Returns the representation of a model instance (which needs
+        only `columns` loaded)
+        """
+        return {name: get(instance) for name, get in self.getters}
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def to_dicts(self, queryset):
+        to_dict = self.to_dict
+        return [to_dict(row) for row in self.rows(queryset)]
+
+    def to_dicts_by_pk(self, queryset):
+        """Returns {pk: dict}, in the queryset's order (whether or not the
+        pk is one of the fields)
+        """
+        to_dict = self.to_dict
+        return {row[0]: to_dict(row[1:])
+                for row in queryset.values_list('pk', *self.columns)}
+
+
+_dog_mappers = {}
+
+
+def dog_mapper(fields=None):
+    """Returns the `FieldMapper` for `DogSerializer`, or for the tuple of
+    its `fields` (compiled on first use)
+    """
+    mapper = _dog_mappers.get(fields)
+    if mapper is None:
+        from .serializers import DogSerializer
+        mapper = _dog_mappers[fields] = FieldMapper(DogSerializer, fields)
+    return mapper
+
+
+def dog_fields(names):
+    """Returns the tuple of `DogSerializer` fields in the comma-separated
+    `names`, in the serializer's order (raising ValueError if there are
+    none, or any isn't a field)
+    """
+    allowed = dog_mapper().names
+    requested = {name.strip() for name in names.split(',') if name.strip()}
+    if not requested:
+        raise ValueError("Must name at least one field")
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown))} (the fields are "
+            f"{', '.join(allowed)})"
+        )
+    return tuple(name for name in allowed if name in requested)
+
+
+@tracing.span('fastpath.dogs')
+def dogs(queryset, fields=None):
+    """Returns the serialized dogs of the queryset, as dicts (of just the
+    tuple of `fields`, if given)
+    """
+    return dog_mapper(fields).to_dicts(queryset)
+
+
+def dogs_by_pk(queryset, fields=None):
+    """Like `dogs`, but returns {pk: dict}, in the queryset's order"""
+    return dog_mapper(fields).to_dicts_by_pk(queryset)
+
+
+def dogs_by_id(queryset, ids, fields=None):
+    """Returns the serialized dogs with the ids, in the order of `ids`
+    (skipping any that don't exist)
+    """
+    found = dogs_by_pk(queryset.filter(pk__in=ids), fields)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def export_json(queryset, chunk_size=EXPORT_CHUNK_SIZE, fields=None):
+    """Yields the serialized dogs of the queryset as one JSON array, in
+    pieces (the dogs are fetched `chunk_size` at a time, in pk order, so the
+    whole export is never held in memory)
+    """
+    mapper = dog_mapper(fields)
+    renderer = FastJSONRenderer()
+    rows = mapper.rows(queryset.order_by('pk')).iterator(
+        chunk_size=chunk_size
+    )
+    yield b'['
+    separator = b''
+    chunk = []
+    for row in rows:
+        chunk.append(mapper.to_dict(row))
+        if len(chunk) >= chunk_size:
+            yield separator + renderer.render(chunk)[1:-1]
+            separator = b','
+            chunk = []
+    if chunk:
+        yield separator + renderer.render(chunk)[1:-1]
+    yield b']'
@@ -1,8 +1,14 @@
 import logging
+import time
 from pathlib import Path
 
 from django.conf import settings
 
+from . import images, metrics
+
+
+logger = logging.getLogger(__name__)
+
 
 def rename(filename, prefix):
     """takes two strings (representing a filename and a prefix) and returns a
@@ -23,14 +29,22 @@ def handle_uploaded_file(uploaded_file, path, name):
     `name` is the filename to be written to disk
     """
 
-    logging.debug(f'creating file at {path} called {name}')
+    logger.debug('creating file at %s called %s', path, name)
 
+    start = time.perf_counter()
+    size = 0
     # (w)rite (b)inary mode (+)can update
     with open(f'{path}/{name}', 'wb+') as target_file:
         for chunk in uploaded_file.chunks():
             target_file.write(chunk)
+            size += len(chunk)
+    images.forget(name)
+
+    metrics.inc('pugorugh_upload_bytes_total', value=size)
+    metrics.observe('pugorugh_upload_duration_seconds',
+                    time.perf_counter() - start)
 
-    logging.debug(f'done creating file')
+    logger.debug('done creating file')
 
 
 # Note we might need to set MEDIA_URL and MEDIA_ROOT in settings.py (and
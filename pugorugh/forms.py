@@ -68,7 +68,8 @@ class AddDogForm(forms.ModelForm):
         """This only works because we've explicitly made `pk` our "order by"
         property on the model.
         """
-        if Dog.objects.all().count() != 0:
-            return Dog.objects.last().pk + 1
+        # (including the deleted dogs whose images may not be gone yet)
+        if Dog.all_objects.all().count() != 0:
+            return Dog.all_objects.order_by('pk').last().pk + 1
         else:
             return 1
@@ -0,0 +1,89 @@
+"""A WSGI application that runs a shorter middleware chain for the API.
+
+The API views authenticate with tokens only, so the sessions, CSRF,
+authentication, messages and clickjacking middleware in `MIDDLEWARE` are
+pure overhead for them. `PathDispatchHandler` sends the requests whose path
+starts with one of `settings.API_PATH_PREFIXES` through a handler built
+from `settings.API_MIDDLEWARE` instead, and every other request (the admin,
+the HTML views) through the usual one:
+
+    # backend/wsgi.py
+    from pugorugh.handlers import get_wsgi_application
+
+    application = get_wsgi_application()
+
+(The test client always uses the full chain.)
+"""
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler, get_path_info
+from django.utils.module_loading import import_string
+
+
+class MiddlewareChainHandler(WSGIHandler):
+    """A WSGI handler that runs the given middleware (dotted paths) rather
+    than `settings.MIDDLEWARE`
+    """
+
+    def __init__(self, middleware, *args, **kwargs):
+        self.middleware = list(middleware)
+        super().__init__(*args, **kwargs)
+
+    def load_middleware(self):
+        # (BaseHandler.load_middleware, with `self.middleware`)
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for middleware_path in reversed(self.middleware):
+            middleware = import_string(middleware_path)
+            try:
+                mw_instance = middleware(handler)
+            except MiddlewareNotUsed:
+                continue
+            if mw_instance is None:
+                raise ImproperlyConfigured(
+                    f"Middleware factory {middleware_path} returned None."
+                )
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, 'process_template_response'):
+                self._template_response_middleware.append(
+                    mw_instance.process_template_response
+                )
+            if hasattr(mw_instance, 'process_exception'):
+                self._exception_middleware.append(
+                    mw_instance.process_exception
+                )
+            handler = convert_exception_to_response(mw_instance)
+
+        self._middleware_chain = handler
+
+
+class PathDispatchHandler:
+    """Runs the requests for the API paths through `settings.API_MIDDLEWARE`
+    and the others through `settings.MIDDLEWARE`
+    """
+
+    def __init__(self):
+        self.prefixes = tuple(settings.API_PATH_PREFIXES)
+        self.full_handler = WSGIHandler()
+        self.api_handler = MiddlewareChainHandler(settings.API_MIDDLEWARE)
+
+    def handler_for(self, path):
+        if path.startswith(self.prefixes):
+            return self.api_handler
+        return self.full_handler
+
+    def __call__(self, environ, start_response):
+        handler = self.handler_for(get_path_info(environ))
+        return handler(environ, start_response)
+
+
+def get_wsgi_application():
+    """Like `django.core.wsgi.get_wsgi_application`, with the API lane"""
+    django.setup(set_prefix=False)
+    return PathDispatchHandler()
@@ -0,0 +1,146 @@
+"""Versioned URLs for the dog images, and serving them.
+
+An image is stored as `<dog pk>.<extension>` in `settings.DOG_UPLOAD_DIR`,
+so once a dog is deleted a new dog can reuse its file name with a different
+image. Its URL therefore includes a version derived from the file (like
+nginx's ETags: its modification time and size, in hex):
+
+    /images/dogs/<version>/<file name>
+
+which changes whenever the file does, so the image can be cached for good
+(`Cache-Control: immutable`), and the version is also its ETag.
+
+Each process remembers the versions it has read (in a bounded LRU, for
+`VERSION_CACHE_SECONDS`), so that rendering a list of dogs doesn't `stat`
+every image. Writing or deleting an image through the app (see
+`file_handling.py` and `deletion.py`) forgets its version at once; a change
+made by another process shows up once the remembered version expires. An
+outdated URL still works: it redirects to the current one.
+
+The image itself is sent by the front proxy when one is configured
+(`settings.DOG_IMAGE_SENDFILE`: `'x-sendfile'` for Apache/lighttpd, or
+`'x-accel-redirect'` for nginx, with an internal location at
+`settings.DOG_IMAGE_ACCEL_PREFIX` aliased to the upload directory), so the
+WSGI worker never reads it. Otherwise it is a `FileResponse`, which WSGI
+servers that provide `wsgi.file_wrapper` (e.g., gunicorn) send with
+`sendfile()`.
+"""
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, HttpResponseRedirect)
+
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# how long, and for how many images, each process remembers their versions
+VERSION_CACHE_SECONDS = 10
+VERSION_CACHE_SIZE = 10000
+
+# file name -> (version, when it was read), least recently used first
+_versions = OrderedDict()
+_versions_lock = threading.Lock()
+
+
+def path(filename):
+    """Returns the path of the image, or raises Http404 if the name isn't a
+    plain file name
+    """
+    if (not filename or filename != os.path.basename(filename) or
+            filename.startswith('.')):
+        raise Http404("No such image")
+    return os.path.join(settings.DOG_UPLOAD_DIR, filename)
+
+
+def version(filename):
+    """Returns the image's current version, or None if it is missing"""
+    try:
+        stat = os.stat(path(filename))
+    except (OSError, Http404):
+        return None
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def cached_version(filename):
+    """Returns the image's version as remembered by this process (reading
+    it if it isn't remembered, or has expired)
+    """
+    now = time.monotonic()
+    with _versions_lock:
+        remembered = _versions.get(filename)
+        if (remembered is not None and
+                now - remembered[1] < VERSION_CACHE_SECONDS):
+            _versions.move_to_end(filename)
+            return remembered[0]
+    current = version(filename)
+    with _versions_lock:
+        _versions[filename] = (current, now)
+        _versions.move_to_end(filename)
+        while len(_versions) > VERSION_CACHE_SIZE:
+            _versions.popitem(last=False)
+    return current
+
+
+def forget(filename):
+    """Forgets the image's version (call when it is written or deleted)"""
+    with _versions_lock:
+        _versions.pop(filename, None)
+
+
+def url(filename):
+    """Returns the versioned URL of the image, or None if it is missing"""
+    current = cached_version(filename)
+    if current is None:
+        return None
+    return f'{settings.DOG_IMAGE_URL}{current}/{quote(filename)}'
+
+
+def etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    return etag in tags or f'W/{etag}' in tags
+
+
+def serve(request, image_version, filename):
+    """Returns the response for a versioned image URL"""
+    image_path = path(filename)
+    current = version(filename)
+    if current is None:
+        raise Http404("No such image")
+    if image_version != current:
+        # (the URL of an image that has changed since: not cacheable)
+        forget(filename)
+        response = HttpResponseRedirect(url(filename))
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    etag = f'"{current}"'
+    if etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(filename)
+        content_type = content_type or 'application/octet-stream'
+        sendfile = settings.DOG_IMAGE_SENDFILE
+        if sendfile == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = image_path
+        elif sendfile == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = (
+                settings.DOG_IMAGE_ACCEL_PREFIX + quote(filename)
+            )
+        else:
+            try:
+                response = FileResponse(open(image_path, 'rb'),
+                                        content_type=content_type)
+            except FileNotFoundError:  # (deleted since)
+                raise Http404("No such image")
+    response['ETag'] = etag
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
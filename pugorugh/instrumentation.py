@@ -0,0 +1,127 @@
+"""Per-request query and latency instrumentation.
+
+`QueryInstrumentationMiddleware` (see `middleware.py`) creates a
+`RequestMetrics` object for each request and installs it as an execute
+wrapper on every database connection (see `wrap_connections` and
+https://docs.djangoproject.com/en/2.2/topics/db/instrumentation/), so every
+SQL statement issued while handling the request is counted and timed,
+whichever database (e.g., the auth database or a replica) it goes to.
+Statements the app issues for its own diagnostics (e.g., the slow query
+log's EXPLAINs) are run in an `uncounted` block, and left out.
+
+Other layers can attribute time to a named phase with the `timed` context
+manager, e.g.:
+
+```python
+with instrumentation.timed('serializer'):
+    data = serializer.data
+```
+
+Outside of a request (e.g., in management commands) `timed` does nothing.
+"""
+import contextvars
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+_current_metrics = contextvars.ContextVar('pugorugh_request_metrics',
+                                          default=None)
+_uncounted = contextvars.ContextVar('pugorugh_uncounted', default=False)
+
+
+class RequestMetrics:
+    """Accumulates the SQL count/time and named phase timings for a single
+    request. Instances are callable so that they can be passed directly to
+    `connection.execute_wrapper`.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0  # seconds
+        self.timings = OrderedDict()  # phase name -> seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        if _uncounted.get():
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.query_count += 1
+
+    def add_timing(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def server_timing(self):
+        """Returns the metrics formatted as a `Server-Timing` header value
+        (durations in milliseconds)
+        see: https://www.w3.org/TR/server-timing/
+        """
+        entries = [
+            f'db;desc="{self.query_count} queries";'
+            f'dur={self.query_time * 1000:.2f}'
+        ]
+        for name, duration in self.timings.items():
+            entries.append(f'{name};dur={duration * 1000:.2f}')
+        return ', '.join(entries)
+
+
+def current_metrics():
+    """Returns the `RequestMetrics` for the request being handled (or None)"""
+    return _current_metrics.get()
+
+
+@contextmanager
+def collect(metrics):
+    """Makes `metrics` the current request's metrics for the duration of
+    the block
+    """
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def wrap_connections(metrics):
+    """Installs `metrics` as an execute wrapper on every database
+    connection (of this thread) for the duration of the block
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        yield metrics
+
+
+@contextmanager
+def uncounted():
+    """Leaves the statements executed in the block out of the request's
+    metrics
+    """
+    token = _uncounted.set(True)
+    try:
+        yield
+    finally:
+        _uncounted.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Adds the time spent in the block to the current request's `name`
+    timing
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_timing(name, time.perf_counter() - start)
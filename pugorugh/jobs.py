@@ -0,0 +1,293 @@
+"""A small background job queue, kept in the database (no broker needed).
+
+Register a function as a job and enqueue calls to it:
+
+    @jobs.job(max_attempts=3, priority=10)
+    def rebuild_something(something_id):
+        ...
+
+    jobs.enqueue(rebuild_something, 42)
+
+The arguments must be JSON-serializable. A job is stored as a `Job` row (in
+the caller's transaction, so it is only run if that commits) and run by
+`manage.py runworker` (processes x threads):
+
+- the highest priority job that is due runs first;
+- a worker *claims* a job with a conditional UPDATE and holds a lease on it
+  (`settings.JOBS_LEASE_SECONDS`, renewed while it runs), so if a worker
+  dies its jobs are claimed again once their leases expire;
+- a job that raises is retried after an exponential backoff
+  (`settings.JOBS_RETRY_BACKOFF` seconds, doubling, capped at
+  `settings.JOBS_RETRY_BACKOFF_MAX`) until it has had `max_attempts`.
+
+With `settings.JOBS_EAGER` (e.g., under tests) jobs run as soon as they are
+enqueued, in the calling thread.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+CLAIM_CANDIDATES = 10
+# seconds before a worker thread retries a claim that failed (e.g., with
+# "database is locked"), doubling up to CLAIM_RETRY_DELAY_MAX
+CLAIM_RETRY_DELAY = 0.1
+CLAIM_RETRY_DELAY_MAX = 30
+
+# name -> function
+registry = {}
+
+
+def eager():
+    return getattr(settings, 'JOBS_EAGER', False)
+
+
+# Registering and Enqueueing
+# --------------------------
+def job(max_attempts=DEFAULT_MAX_ATTEMPTS, priority=0):
+    """Registers a function as a job (by its dotted path)"""
+    def decorator(func):
+        func.job_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        func.priority = priority
+        registry[func.job_name] = func
+        return func
+    return decorator
+
+
+def get_function(name):
+    """Returns the job function registered as `name` (importing its module
+    if need be)
+    """
+    if name not in registry:
+        import_string(name)  # (registers it)
+    return registry[name]
+
+
+def enqueue(func, *args, priority=None, delay=0, **kwargs):
+    """Stores a call to a job function and returns the `Job` (which, in
+    eager mode, has already run)
+    """
+    from .models import Job
+
+    if getattr(func, 'job_name', None) not in registry:
+        raise ValueError(f"{func!r} isn't registered with @jobs.job()")
+    job = Job.objects.create(
+        name=func.job_name,
+        arguments=json.dumps({'args': args, 'kwargs': kwargs}),
+        priority=func.priority if priority is None else priority,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay)
+    )
+    if eager():
+        worker_id = f'eager-{os.getpid()}'
+        if claim_job(job.pk, worker_id):
+            job.refresh_from_db()
+            execute(job, worker_id)
+    return job
+
+
+# Claiming and Running
+# --------------------
+def claimable(now):
+    """Returns a Q for the jobs that are due, or whose lease has expired"""
+    from .models import Job
+
+    return (Q(status=Job.QUEUED, run_at__lte=now) |
+            Q(status=Job.RUNNING, lease_until__lt=now))
+
+
+def lease_seconds():
+    return getattr(settings, 'JOBS_LEASE_SECONDS', 300)
+
+
+def claim_job(pk, worker_id):
+    """Tries to take the job for the worker; returns True if it got it"""
+    from .models import Job
+
+    now = timezone.now()
+    return bool(
+        Job.objects.filter(claimable(now), pk=pk).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            lease_until=now + timedelta(seconds=lease_seconds()),
+            attempts=F('attempts') + 1,
+            updated_at=now
+        )
+    )
+
+
+def claim(worker_id):
+    """Claims the next job for the worker. Returns the `Job` (or None if
+    there is nothing to do).
+    """
+    from .models import Job
+
+    candidates = Job.objects.filter(
+        claimable(timezone.now())
+    ).order_by('-priority', 'run_at', 'pk').values_list('pk', flat=True)
+    # (another worker may claim a candidate first: try the next one)
+    for pk in candidates[:CLAIM_CANDIDATES]:
+        if claim_job(pk, worker_id):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    """Returns the delay in seconds before retrying a job that has failed
+    `attempts` times (with some jitter, so that retries spread out)
+    """
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF', 10)
+    cap = getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', 60 * 60)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_retry_delay(failures):
+    """Returns the delay in seconds before a worker thread retries after
+    `failures` failed claims in a row (with jitter, like `backoff`)
+    """
+    delay = min(CLAIM_RETRY_DELAY_MAX,
+                CLAIM_RETRY_DELAY * 2 ** min(failures - 1, 16))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def execute(job, worker_id):
+    """Runs a claimed job and records the outcome (unless the lease has
+    been lost to another worker in the meantime)
+    """
+    from .models import Job
+
+    now = timezone.now()
+    if job.attempts > job.max_attempts:  # (its leases kept expiring)
+        outcome = {'status': Job.FAILED, 'finished_at': now,
+                   'last_error': "Lease expired on every attempt"}
+    else:
+        try:
+            arguments = json.loads(job.arguments)
+            get_function(job.name)(*arguments['args'], **arguments['kwargs'])
+        except Exception:
+            error = traceback.format_exc()
+            now = timezone.now()
+            if job.attempts >= job.max_attempts:
+                logger.exception("Job %s (%s) failed", job.pk, job.name)
+                outcome = {'status': Job.FAILED, 'finished_at': now,
+                           'last_error': error}
+            else:
+                delay = backoff(job.attempts)
+                logger.warning("Job %s (%s) failed; retrying in %.0fs",
+                               job.pk, job.name, delay, exc_info=True)
+                outcome = {'status': Job.QUEUED, 'last_error': error,
+                           'run_at': now + timedelta(seconds=delay)}
+        else:
+            now = timezone.now()
+            outcome = {'status': Job.DONE, 'finished_at': now}
+
+    Job.objects.filter(pk=job.pk, locked_by=worker_id).update(
+        lease_until=None, locked_by='', updated_at=now, **outcome
+    )
+    for name, value in outcome.items():
+        setattr(job, name, value)
+
+
+def renew_leases(worker_id):
+    """Extends the leases of the jobs the worker is running"""
+    from .models import Job
+
+    now = timezone.now()
+    Job.objects.filter(status=Job.RUNNING, locked_by=worker_id).update(
+        lease_until=now + timedelta(seconds=lease_seconds())
+    )
+
+
+def purge(days):
+    """Deletes the jobs that finished more than `days` ago"""
+    from .models import Job
+
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+# Worker
+# ------
+class Worker:
+    """Runs jobs from `threads` threads until stopped (or, with `once`,
+    until there is nothing left to do)
+    """
+
+    def __init__(self, threads=1, poll_interval=None):
+        self.threads = threads
+        self.poll_interval = (
+            getattr(settings, 'JOBS_POLL_INTERVAL', 1.0)
+            if poll_interval is None else poll_interval
+        )
+        self.id = (f'{socket.gethostname()}-{os.getpid()}-'
+                   f'{uuid.uuid4().hex[:6]}')
+        self.stopping = threading.Event()
+
+    def run(self, once=False):
+        threads = [
+            threading.Thread(target=self._loop, args=(f'{self.id}-{i}', once),
+                             name=f'job-worker-{i}', daemon=True)
+            for i in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # (renew the leases of the running jobs until every thread is done)
+        interval = lease_seconds() / 3
+        deadline = time.monotonic() + interval
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=max(0, deadline - time.monotonic()))
+            if time.monotonic() >= deadline:
+                for index in range(self.threads):
+                    renew_leases(f'{self.id}-{index}')
+                deadline += interval
+        connections.close_all()
+
+    def stop(self):
+        self.stopping.set()
+
+    def _loop(self, worker_id, once):
+        failures = 0
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = claim(worker_id)
+                except Exception:
+                    # (not an empty queue: even with `once`, try again)
+                    failures += 1
+                    logger.exception("Couldn't claim a job (%s in a row)",
+                                     failures)
+                    self.stopping.wait(claim_retry_delay(failures))
+                    continue
+                failures = 0
+                if job is not None:
+                    execute(job, worker_id)
+                elif once:
+                    return
+                else:
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connections.close_all()  # (this thread's)
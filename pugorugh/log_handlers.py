@@ -0,0 +1,166 @@
+"""Logging components used by the `LOGGING` configuration in settings.
+
+- `QueueListenerHandler`: a `QueueHandler` that starts its own
+  `QueueListener`, so that the handlers it feeds (e.g., the file handler for
+  `pugorugh.log`) run on a background thread and never block a request.
+  The listener thread is started by the first record each process logs
+  (threads don't survive a fork, so one started while logging is configured
+  would be lost in pre-forked workers), and the queue is bounded: if the
+  listener falls behind, records are dropped (and counted) rather than
+  piling up.
+- `JSONFormatter`: one JSON object per line, including any `extra` fields.
+- `SamplingFilter`: keeps only a fraction of the records for high-volume
+  events (records logged with `extra={'event': name}`).
+
+This module is imported while logging is configured (before the apps are
+loaded) so it mustn't import any models.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+# the attributes every LogRecord has (anything else came from `extra`)
+STANDARD_ATTRIBUTES = set(vars(
+    logging.LogRecord('', logging.INFO, '', 0, '', None, None)
+)) | {'message', 'asctime'}
+
+
+class _QueueListener(QueueListener):
+
+    def enqueue_sentinel(self):
+        # (waits for room: the queue is bounded)
+        self.queue.put(self._sentinel)
+
+
+class QueueListenerHandler(QueueHandler):
+    """Puts records on a queue that a background thread passes on to
+    `handlers`.
+
+    In a `dictConfig`, the handlers must be given as references so that they
+    are resolved to handler objects:
+
+    ```python
+    'queue': {
+        '()': 'pugorugh.log_handlers.QueueListenerHandler',
+        'handlers': ['cfg://handlers.file'],
+    }
+    ```
+    """
+
+    def __init__(self, handlers, respect_handler_level=True,
+                 queue_size=10000):
+        super().__init__(None)
+        # (indexing a dictConfig ConvertingList resolves the references)
+        self.handlers = [handlers[i] for i in range(len(handlers))]
+        self.respect_handler_level = respect_handler_level
+        self.queue_size = queue_size
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def start(self):
+        """Starts this process's listener (with a new queue: a forked
+        process's copy of its parent's queue isn't read by anyone)
+        """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue_size)
+            self.listener = _QueueListener(
+                self.queue,
+                *self.handlers,
+                respect_handler_level=self.respect_handler_level
+            )
+            self.listener.start()
+            self.dropped = 0
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        """Returns a copy of the record with its arguments merged into its
+        message and its exception formatted into `exc_text`.
+
+        (`QueueHandler.prepare` folds the traceback into the message and
+        clears `exc_text`, so the formatters downstream, e.g.
+        `JSONFormatter`, couldn't tell the two apart.)
+        """
+        message = record.getMessage()
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                sys.stderr.write(
+                    f"Log queue full: dropped {self.dropped} records\n"
+                )
+
+    def stop(self):
+        """Stops the listener once it has handled every queued record"""
+        if (self._pid == os.getpid() and
+                self.listener._thread is not None):
+            self.listener.stop()
+        self._pid = None
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats each record as a single-line JSON object"""
+
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps each record for a sampled event (one logged with
+    `extra={'event': name}` where `name` is in `rates`) with probability
+    `rates[name]`. Other records are always kept.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None:
+            return True
+        return random.random() < rate
@@ -0,0 +1,50 @@
+"""Moves the swipes of inactive users into compressed cold storage (see
+`pugorugh.archive`). Schedule it periodically (e.g., nightly from cron).
+
+    $ python3 manage.py archive_inactive_users
+    $ python3 manage.py archive_inactive_users --days 180 --dry-run
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from pugorugh import archive
+from pugorugh import db
+from pugorugh.models import ArchivedSwipes, UserDog
+
+
+class Command(BaseCommand):
+    help = "Archives the swipes of users who haven't been seen for a while"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="inactivity threshold (default: "
+                                 "settings.ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--chunk-size', type=int,
+                            help="users per transaction (default: "
+                                 "settings.ARCHIVE_CHUNK_SIZE)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="only count the inactive users")
+
+    def handle(self, *args, **options):
+        user_ids = archive.inactive_user_ids(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f"{len(user_ids)} inactive users")
+            return
+
+        start = time.perf_counter()
+        users, userdogs = archive.archive_users(user_ids,
+                                                options['chunk_size'])
+        self.stdout.write(
+            f"Archived {userdogs} userdogs of {users} users in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+        for model in (UserDog, ArchivedSwipes):
+            sizes = db.object_sizes(connection, model._meta.db_table)
+            if sizes:
+                self.stdout.write(
+                    f"{model._meta.db_table}: "
+                    f"{sum(sizes.values()) / 2 ** 20:.1f} MB"
+                )
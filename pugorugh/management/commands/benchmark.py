@@ -0,0 +1,232 @@
+"""Benchmarks each API route and reports throughput and latency percentiles
+as JSON, so that runs can be compared across commits.
+
+    $ python3 manage.py benchmark --requests 500 --output before.json
+
+Requests are sent as the `--user` user (default: the first user with
+preferences). The `set-status` route really does change the user's dog
+statuses, so (as with `generate_dataset`) run this against a copy of the
+database.
+
+With `--concurrency N` each route is hit from N threads at once (as N
+different users, unless `--user` is given); the `mixed` route interleaves
+next-dog reads with set-status writes. Add `--sqlite-baseline` to run with
+SQLite's default settings instead of `SQLITE_PRAGMAS` and
+`SQLITE_TRANSACTION_MODE`, to measure what the tuning buys:
+
+    $ python3 manage.py benchmark --mode wsgi --concurrency 8 \\
+          --routes mixed --sqlite-baseline --output baseline.json
+    $ python3 manage.py benchmark --mode wsgi --concurrency 8 \\
+          --routes mixed --output tuned.json
+
+The `wsgi` mode calls the project's WSGI application, which runs the API
+requests through the lean `API_MIDDLEWARE` chain (see `handlers.py`);
+`wsgi-full` runs them through the whole `MIDDLEWARE` chain instead, to
+measure the difference:
+
+    $ python3 manage.py benchmark --mode wsgi wsgi-full --routes next-dog
+"""
+import json
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.test import Client, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from pugorugh import benchmarks
+from pugorugh.handlers import get_wsgi_application
+from pugorugh.models import Dog, UserPref
+
+
+User = get_user_model()
+
+STATUSES = ['liked', 'disliked', 'undecided']
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the API routes through the test client and/or WSGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help="measured requests per route and mode")
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--mode', nargs='+', default=['both'],
+                            choices=['client', 'wsgi', 'wsgi-full', 'both'],
+                            help="'both' is client and wsgi")
+        parser.add_argument('--routes', nargs='+',
+                            help="URL names to benchmark (default: all)")
+        parser.add_argument('--user', help="username to benchmark as")
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help="number of threads sending requests")
+        parser.add_argument('--sqlite-baseline', action='store_true',
+                            help="use SQLite's defaults, not SQLITE_PRAGMAS")
+        parser.add_argument('--seed', type=int, default=11)
+        parser.add_argument('--output', help="write the JSON report here")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.dog_ids = list(Dog.objects.values_list('pk', flat=True))
+        if not self.dog_ids:
+            raise CommandError("There are no dogs; see generate_dataset")
+
+        users = self.get_users(options['user'], options['concurrency'])
+        self.auths = []
+        for user in users:
+            token, _ = Token.objects.get_or_create(user=user)
+            self.auths.append(f'Token {token.key}')
+
+        routes = self.routes()
+        if options['routes']:
+            unknown = set(options['routes']) - set(routes)
+            if unknown:
+                raise CommandError(f"Unknown routes: {sorted(unknown)}")
+            routes = {name: routes[name] for name in options['routes']}
+
+        requested = options['mode']
+        if isinstance(requested, str):  # (from call_command)
+            requested = [requested]
+        modes = []
+        for mode in requested:
+            for name in (['client', 'wsgi'] if mode == 'both' else [mode]):
+                if name not in modes:
+                    modes.append(name)
+
+        if options['sqlite_baseline']:
+            # (journal_mode is stored in the file, so it must be reset)
+            pragmas = override_settings(SQLITE_PRAGMAS={
+                'journal_mode': 'delete'
+            }, SQLITE_TRANSACTION_MODE=None)
+        else:
+            pragmas = override_settings()
+        with pragmas:
+            connections.close_all()  # (reconnect with the pragmas)
+            results = self.run_routes(routes, modes, options)
+        connections.close_all()
+
+        benchmarks.write_report(
+            benchmarks.report(
+                results,
+                dogs=len(self.dog_ids),
+                users=[user.username for user in users],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                sqlite_baseline=options['sqlite_baseline'],
+            ),
+            options['output']
+        )
+
+    def run_routes(self, routes, modes, options):
+        results = {}
+        concurrency = options['concurrency']
+        for name, make_request in routes.items():
+            results[name] = {}
+            for mode in modes:
+                if concurrency > 1:
+                    def make_send(index):
+                        auth = self.auths[index % len(self.auths)]
+                        return self.sender(mode, make_request, auth)
+                    results[name][mode] = benchmarks.measure_concurrent(
+                        make_send,
+                        concurrency,
+                        options['requests'],
+                        options['warmup']
+                    )
+                else:
+                    send = self.sender(mode, make_request, self.auths[0])
+                    results[name][mode] = benchmarks.measure(
+                        send,
+                        options['requests'],
+                        options['warmup']
+                    )
+        return results
+
+    # Helper Methods
+    # --------------
+    def get_users(self, username, count):
+        if username:
+            try:
+                return [User.objects.get(username=username)]
+            except User.DoesNotExist:
+                raise CommandError(f"No user called {username}")
+        # (no join: the users may be in a separate database)
+        user_ids = UserPref.objects.order_by('user_id').values_list(
+            'user_id', flat=True
+        )[:count]
+        users = list(User.objects.filter(pk__in=list(user_ids)))
+        if not users:
+            raise CommandError("There are no users with preferences")
+        return users
+
+    def random_dog_id(self):
+        return self.random.choice(self.dog_ids)
+
+    def routes(self):
+        """URL name -> function returning (method, path, JSON body)"""
+        return {
+            'next-dog': lambda: (
+                'GET',
+                f'/api/dog/{self.random_dog_id()}/'
+                f'{self.random.choice(STATUSES)}/next/',
+                None
+            ),
+            'set-status': lambda: (
+                'PUT',
+                f'/api/dog/{self.random_dog_id()}/'
+                f'{self.random.choice(STATUSES)}/',
+                None
+            ),
+            'random-dog': lambda: ('GET', '/api/dog/random/', None),
+            'needs-love-dog': lambda: ('GET', '/api/dog/needs-love/', None),
+            'set-preferences': lambda: (
+                'GET', '/api/user/preferences/', None
+            ),
+            'mixed': self.mixed_request,
+        }
+
+    def mixed_request(self):
+        """A next-dog read or (half the time) a set-status write"""
+        path = f'/api/dog/{self.random_dog_id()}/'
+        if self.random.random() < 0.5:
+            return 'GET', path + 'undecided/next/', None
+        return 'PUT', path + f'{self.random.choice(STATUSES)}/', None
+
+    def sender(self, mode, make_request, auth):
+        """Returns a function that sends one request and returns its status
+        code
+        """
+        if mode == 'client':
+            client = Client()
+
+            def send():
+                method, path, body = make_request()
+                response = client.generic(
+                    method,
+                    path,
+                    data=json.dumps(body) if body is not None else '',
+                    content_type='application/json',
+                    HTTP_AUTHORIZATION=auth,
+                    HTTP_HOST=benchmarks.client_host(),
+                )
+                return response.status_code
+            return send
+
+        if mode == 'wsgi-full':
+            application = WSGIHandler()
+        else:
+            application = get_wsgi_application()
+
+        def send():
+            method, path, body = make_request()
+            status_code, _, _ = benchmarks.wsgi_request(
+                application,
+                method,
+                path,
+                headers={'HTTP_AUTHORIZATION': auth},
+                body=json.dumps(body).encode() if body is not None else b'',
+            )
+            return status_code
+        return send
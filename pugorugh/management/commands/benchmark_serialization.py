@@ -0,0 +1,169 @@
+"""Microbenchmarks turning one dog into response bytes, and reports the
+latencies as JSON (like `benchmark`):
+
+    $ python3 manage.py benchmark_serialization --calls 10000
+
+- `serializer`: `DogSerializer` and the JSON renderer, as on every request
+  before the dog JSON cache;
+- `cached`: `dog_json.get`, once the dog's JSON is in the cache (see
+  `dog_json.py`).
+
+The dogs are the first `--dogs` dogs in the database, loaded up front, so
+no queries are measured.
+
+It also measures a response of `--rows` dogs (query included), and its peak
+memory (traced separately, as tracing slows everything down):
+
+- `list-serializer`: model instances and `DogSerializer(many=True)`;
+- `list-fastpath`: `values_list` rows and the field mapper (see
+  `fastpath.py`);
+- `list-sparse`: the same, for just the `SPARSE_FIELDS` (`?fields=`).
+
+Finally, it encodes (`encode-*`) and decodes (`decode-*`) a default page of
+the list endpoint (all fields, and `list-sparse`) and a full batch
+(`DOG_BATCH_MAX_IDS` dogs) in each format the API speaks (see
+`renderers.py`; `json` is DRF's own encoder), and reports each payload's
+size (`bytes`).
+"""
+import io
+import itertools
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import parsers, renderers as drf_renderers
+
+from pugorugh import benchmarks
+from pugorugh import dog_json
+from pugorugh import fastpath
+from pugorugh import renderers
+from pugorugh.models import Dog
+from pugorugh.renderers import JSONRenderer
+from pugorugh.serializers import DogSerializer
+
+
+# (what a list view or a prefetch queue needs)
+SPARSE_FIELDS = ('id', 'name', 'image_filename')
+
+
+class Command(BaseCommand):
+    help = "Microbenchmarks rendering a dog's JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=5000,
+                            help="measured calls per case")
+        parser.add_argument('--warmup', type=int, default=500)
+        parser.add_argument('--dogs', type=int, default=100)
+        parser.add_argument('--rows', type=int, default=10000,
+                            help="dogs per list response")
+        parser.add_argument('--lists', type=int, default=20,
+                            help="measured list responses per case")
+        parser.add_argument('--encodes', type=int, default=200,
+                            help="measured encodings per format and payload")
+        parser.add_argument('--output', help="write the JSON report here")
+
+    def handle(self, *args, **options):
+        dogs = list(Dog.objects.all()[:options['dogs']])
+        if not dogs:
+            raise CommandError("There are no dogs; see generate_dataset")
+
+        results = {}
+        for name, render in self.cases().items():
+            cycle = itertools.cycle(dogs)
+
+            def send():
+                render(next(cycle))
+                return 200
+            results[name] = benchmarks.measure(send, options['calls'],
+                                               options['warmup'])
+
+        queryset = Dog.objects.order_by('pk')[:options['rows']]
+        list_results = {}
+        for name, render in self.list_cases().items():
+            def send():
+                render(queryset.all())
+                return 200
+            list_results[name] = benchmarks.measure(send, options['lists'],
+                                                    warmup=1)
+            tracemalloc.start()
+            render(queryset.all())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            list_results[name]['peak_kib'] = round(peak / 1024, 1)
+
+        groups = {'dog': results, 'dog-list': list_results}
+        for name, payload in self.payloads().items():
+            groups[f'encode-{name}'] = encoded = {}
+            groups[f'decode-{name}'] = decoded = {}
+            for fmt, (renderer, parser) in self.formats().items():
+                content = renderer.render(payload)
+
+                def encode():
+                    renderer.render(payload)
+                    return 200
+
+                def decode():
+                    parser.parse(io.BytesIO(content))
+                    return 200
+                encoded[fmt] = benchmarks.measure(encode, options['encodes'],
+                                                  warmup=10)
+                encoded[fmt]['bytes'] = len(content)
+                decoded[fmt] = benchmarks.measure(decode, options['encodes'],
+                                                  warmup=10)
+
+        benchmarks.write_report(
+            benchmarks.report(groups, dogs=len(dogs), calls=options['calls'],
+                              rows=queryset.count()),
+            options['output']
+        )
+
+    def cases(self):
+        """Case name -> function rendering a dog to bytes"""
+        return {
+            'serializer': dog_json.render,
+            'cached': lambda dog: dog_json.get(dog).content,
+        }
+
+    def list_cases(self):
+        """Case name -> function rendering a queryset of dogs to bytes"""
+        renderer = JSONRenderer()
+        return {
+            'list-serializer': lambda dogs: renderer.render(
+                DogSerializer(dogs, many=True).data
+            ),
+            'list-fastpath': lambda dogs: renderer.render(
+                fastpath.dogs(dogs)
+            ),
+            'list-sparse': lambda dogs: renderer.render(
+                fastpath.dogs(dogs, SPARSE_FIELDS)
+            ),
+        }
+
+    def payloads(self):
+        """Payload name -> response data, as the many-dog endpoints send"""
+        queryset = Dog.objects.order_by('pk')[:settings.DOG_LIST_LIMIT]
+        page = fastpath.dogs(queryset)
+        sparse_page = fastpath.dogs(queryset, SPARSE_FIELDS)
+        ids = list(Dog.objects.order_by('?').values_list('pk', flat=True)
+                   [:settings.DOG_BATCH_MAX_IDS])
+        return {
+            'list': {'results': page, 'next': page[-1]['id']},
+            'list-sparse': {'results': sparse_page,
+                            'next': sparse_page[-1]['id']},
+            'batch': fastpath.dogs_by_id(Dog.objects.all(), ids),
+        }
+
+    def formats(self):
+        """Format name -> (renderer, parser), for the installed formats"""
+        formats = {
+            'json': (drf_renderers.JSONRenderer(), parsers.JSONParser()),
+            'fast-json': (renderers.FastJSONRenderer(),
+                          renderers.FastJSONParser()),
+        }
+        if renderers.msgpack is not None:
+            formats['msgpack'] = (renderers.MessagePackRenderer(),
+                                  renderers.MessagePackParser())
+        if renderers.cbor2 is not None:
+            formats['cbor'] = (renderers.CBORRenderer(),
+                               renderers.CBORParser())
+        return formats
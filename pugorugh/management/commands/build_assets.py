@@ -0,0 +1,26 @@
+"""Builds the fingerprinted, precompressed assets in `settings.ASSETS_DIR`
+(see `pugorugh.assets`). Run it on each deploy, before restarting the web
+server.
+
+    $ python3 manage.py build_assets
+
+Brotli variants are only written if the `brotli` package is installed.
+"""
+from django.core.management.base import BaseCommand
+
+from pugorugh import assets
+
+
+class Command(BaseCommand):
+    help = "Bundles, fingerprints and precompresses the static assets"
+
+    def handle(self, *args, **options):
+        if assets.brotli is None:
+            self.stdout.write("brotli isn't installed: "
+                              "only writing gzip variants")
+        for name, fingerprinted, sizes in assets.build():
+            variants = ', '.join(
+                f'{extension or "raw"} {size / 1024:.1f} KiB'
+                for extension, size in sizes.items()
+            )
+            self.stdout.write(f'{name} -> {fingerprinted} ({variants})')
@@ -0,0 +1,126 @@
+"""Deletes the files in `settings.DOG_UPLOAD_DIR` that no dog refers to
+(e.g., left by a failed upload), and reports the dogs whose image is
+missing.
+
+    $ python3 manage.py collect_orphan_images --dry-run
+    $ python3 manage.py collect_orphan_images --workers 8 --missing
+
+Neither side is loaded in full: the directory is read with `os.scandir` in
+chunks of `--chunk-size` names, and each chunk is checked against the
+database with one `image_filename IN (...)` query, and its orphans are
+deleted (by `--workers` threads) before the next chunk is read. Files newer
+than
+`--min-age` seconds are left alone, as an upload may not have saved its
+dog yet. The images of deleted dogs are removed by their deletion job (see
+`pugorugh.deletion`), not here.
+"""
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pugorugh.models import Dog
+
+
+def scan(directory, min_age, chunk_size):
+    """Yields lists of up to `chunk_size` names of the files in `directory`
+    last modified more than `min_age` seconds ago
+    """
+    cutoff = time.time() - min_age
+    chunk = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            if entry.stat().st_mtime > cutoff:
+                continue
+            chunk.append(entry.name)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def orphans(directory, min_age, chunk_size):
+    """Yields lists of the names of the files in `directory` no dog refers
+    to (one list per chunk scanned)
+    """
+    for chunk in scan(directory, min_age, chunk_size):
+        # (including the deleted dogs: their images go with them)
+        referenced = set(
+            Dog.all_objects.filter(
+                image_filename__in=chunk
+            ).values_list('image_filename', flat=True)
+        )
+        yield [name for name in chunk if name not in referenced]
+
+
+def missing(directory, chunk_size):
+    """Yields the (pk, image filename) of the dogs whose image is missing"""
+    rows = Dog.objects.order_by('pk').values_list(
+        'pk', 'image_filename'
+    ).iterator(chunk_size=chunk_size)
+    for pk, name in rows:
+        if not name or not os.path.isfile(os.path.join(directory, name)):
+            yield pk, name
+
+
+class Command(BaseCommand):
+    help = "Deletes unreferenced dog images and reports missing ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="only list the files that would be deleted")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="threads deleting files")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="file names checked per query")
+        parser.add_argument('--min-age', type=int, default=60 * 60,
+                            help="ignore files newer than this (seconds)")
+        parser.add_argument('--missing', action='store_true',
+                            help="also list the dogs whose image is missing")
+
+    def handle(self, *args, **options):
+        directory = settings.DOG_UPLOAD_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} isn't a directory")
+
+        chunks = orphans(directory, options['min_age'],
+                         options['chunk_size'])
+        if options['dry_run']:
+            count = 0
+            for chunk in chunks:
+                for name in chunk:
+                    self.stdout.write(f"Would delete {name}")
+                count += len(chunk)
+            self.stdout.write(f"{count} orphaned images")
+        else:
+            delete = functools.partial(self.delete, directory)
+            deleted = 0
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                # (a chunk at a time: `map` submits everything it's given
+                # up front, which would read the whole directory first)
+                for chunk in chunks:
+                    deleted += sum(pool.map(delete, chunk))
+            self.stdout.write(f"Deleted {deleted} orphaned images")
+
+        if options['missing']:
+            count = 0
+            for pk, name in missing(directory, options['chunk_size']):
+                self.stdout.write(f"Dog {pk}: image {name!r} is missing")
+                count += 1
+            self.stdout.write(f"{count} dogs with missing images")
+
+    def delete(self, directory, name):
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            return False
+        except OSError as error:
+            self.stderr.write(f"Couldn't delete {name}: {error}")
+            return False
+        return True
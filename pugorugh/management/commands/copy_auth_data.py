@@ -0,0 +1,69 @@
+"""Copies the auth apps' rows (`settings.AUTH_DB_APPS`: users, tokens,
+sessions...) from the default database into the separate 'auth' database
+(see `pugorugh.routers.AuthRouter`), keeping their primary keys so that the
+dog tables' user ids still match.
+
+    $ export PUGORUGH_SPLIT_AUTH_DB=1
+    $ python3 manage.py migrate --database auth
+    $ python3 manage.py copy_auth_data
+
+The rows are left in the default database (nothing reads them there once
+the split is on); drop the tables once you are happy with the copy.
+"""
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from pugorugh.routers import AuthRouter
+
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Copies the auth apps' data into the separate auth database"
+
+    def handle(self, *args, **options):
+        target = AuthRouter.alias
+        if target not in settings.DATABASES:
+            raise CommandError("There is no auth database (set "
+                               "PUGORUGH_SPLIT_AUTH_DB=1)")
+        if get_user_model()._base_manager.using(target).exists():
+            raise CommandError("The auth database already has users")
+
+        models = [
+            model for model in apps.get_models(include_auto_created=True)
+            if model._meta.app_label in settings.AUTH_DB_APPS and
+            not model._meta.proxy
+        ]
+
+        connection = connections[target]
+        with transaction.atomic(using=target):
+            with connection.constraint_checks_disabled():
+                # (`migrate` created its own content types and permissions;
+                # the copies keep the primary keys everything refers to)
+                Permission.objects.using(target).all().delete()
+                ContentType.objects.using(target).all().delete()
+                for model in models:
+                    copied = self.copy(model, target)
+                    self.stdout.write(f"{model._meta.label}: {copied}")
+            connection.check_constraints()
+        ContentType.objects.clear_cache()
+
+    def copy(self, model, target):
+        rows = model._base_manager.using(DEFAULT_DB_ALIAS).order_by(
+            'pk'
+        ).iterator(chunk_size=CHUNK_SIZE)
+        copied = 0
+        while True:
+            chunk = list(islice(rows, CHUNK_SIZE))
+            if not chunk:
+                return copied
+            model._base_manager.using(target).bulk_create(chunk)
+            copied += len(chunk)
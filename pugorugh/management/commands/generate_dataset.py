@@ -0,0 +1,187 @@
+"""Generates a large, realistic synthetic dataset for benchmarking.
+
+Example (the scale mentioned in the benchmarking plan):
+
+    $ python3 manage.py generate_dataset --dogs 500000 --users 100000 \\
+          --userdogs 50000000
+
+Don't run this against a database you care about: use a copy, e.g.,
+by pointing `DATABASES['default']['NAME']` at a scratch file.
+"""
+import json
+import os
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from pugorugh.managers import AGE_MAPPING
+from pugorugh.models import Dog, UserDog, UserPref
+
+
+User = get_user_model()
+
+DATA_FILE = os.path.join(settings.BASE_DIR, 'initial_data',
+                         'dog_details.json')
+
+AGES = [tup[0] for tup in AGE_MAPPING]
+GENDERS = ['m', 'f']
+SIZES = ['s', 'm', 'l', 'xl']
+
+
+class Command(BaseCommand):
+    help = ("Bulk-inserts synthetic dogs, users (with preferences) and "
+            "UserDogs for benchmarking")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dogs', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--userdogs', type=int, default=10000,
+                            help="approximate total number of UserDogs")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="objects built in memory per bulk insert")
+        parser.add_argument('--seed', type=int, default=11)
+        parser.add_argument('--password', default='testpassword',
+                            help="password for every generated user")
+        parser.add_argument('--prefix', default='bench',
+                            help="prefix for generated usernames")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with open(DATA_FILE, 'r', encoding='utf-8') as file:
+            self.templates = json.load(file)
+
+        start = time.perf_counter()
+        dog_ids = self.create_dogs(options['dogs'])
+        user_ids = self.create_users(options['users'], options['prefix'],
+                                     options['password'])
+        userdog_count = self.create_userdogs(user_ids, dog_ids,
+                                             options['userdogs'])
+
+        self.stdout.write(
+            f"Created {len(dog_ids)} dogs, {len(user_ids)} users and "
+            f"{userdog_count} userdogs in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+
+    # Helper Methods
+    # --------------
+    def bulk_create(self, model, objects, **kwargs):
+        # (let Django pick the INSERT size: SQLite limits the number of
+        # variables and compound SELECT terms per statement)
+        model.objects.bulk_create(objects, **kwargs)
+
+    def new_ids(self, model, before_pk):
+        return list(
+            model.objects.filter(pk__gt=before_pk).order_by('pk').values_list(
+                'pk',
+                flat=True
+            )
+        )
+
+    def last_pk(self, model):
+        last = model.objects.order_by('pk').values_list('pk', flat=True)
+        return last.last() or 0
+
+    # Dogs
+    # ----
+    def make_dog(self, n):
+        template = self.random.choice(self.templates)
+        # ages skew young, like a real shelter
+        age = min(int(self.random.expovariate(1 / 36)) + 1, 240)
+        return Dog(
+            name=f"{template['name']} {n}",
+            image_filename=template['image_filename'],
+            breed=template.get('breed', ''),
+            age=age,
+            gender=self.random.choices('mfu', weights=[48, 48, 4])[0],
+            size=self.random.choices(['s', 'm', 'l', 'xl', 'u'],
+                                     weights=[25, 30, 25, 15, 5])[0],
+        )
+
+    def create_dogs(self, count):
+        before_pk = self.last_pk(Dog)
+        for offset in range(0, count, self.batch_size):
+            batch = [
+                self.make_dog(n)
+                for n in range(offset, min(offset + self.batch_size, count))
+            ]
+            self.bulk_create(Dog, batch)
+        return self.new_ids(Dog, before_pk)
+
+    # Users
+    # -----
+    def make_pref(self, choices):
+        """Most users keep the default (everything); the rest pick a
+        random non-empty subset
+        """
+        if self.random.random() < 0.4:
+            return ",".join(choices)
+        size = self.random.randint(1, len(choices))
+        picked = set(self.random.sample(choices, size))
+        return ",".join([choice for choice in choices if choice in picked])
+
+    def create_users(self, count, prefix, password):
+        # hashing is deliberately slow, so every user shares one hash
+        password_hash = make_password(password)
+        before_pk = self.last_pk(User)
+        for offset in range(0, count, self.batch_size):
+            batch = [
+                User(username=f'{prefix}_{n}', password=password_hash)
+                for n in range(offset, min(offset + self.batch_size, count))
+            ]
+            self.bulk_create(User, batch)
+        user_ids = self.new_ids(User, before_pk)
+
+        prefs = [
+            UserPref(
+                user_id=user_id,
+                age=self.make_pref(AGES),
+                gender=self.make_pref(GENDERS),
+                size=self.make_pref(SIZES),
+            )
+            for user_id in user_ids
+        ]
+        self.bulk_create(UserPref, prefs)
+        return user_ids
+
+    # UserDogs
+    # --------
+    def create_userdogs(self, user_ids, dog_ids, total):
+        if not user_ids or not dog_ids:
+            return 0
+
+        # Each dog has an 'appeal' (the probability that a user who sees it
+        # likes it); most dogs are middling, a few are very popular.
+        appeal = [self.random.betavariate(2, 3) for _ in dog_ids]
+
+        # Activity is heavy-tailed: most users swipe a little, a few swipe
+        # a lot. Pareto(alpha=1.5) has a mean of 3, hence the scaling.
+        mean_swipes = total / len(user_ids)
+
+        created = 0
+        batch = []
+        for user_id in user_ids:
+            swipes = int(self.random.paretovariate(1.5) * mean_swipes / 3)
+            swipes = min(swipes, len(dog_ids))
+            for index in self.random.sample(range(len(dog_ids)), swipes):
+                liked = self.random.random() < appeal[index]
+                batch.append(UserDog(
+                    user_id=user_id,
+                    dog_id=dog_ids[index],
+                    status=UserDog.LIKED if liked else UserDog.DISLIKED,
+                ))
+            if len(batch) >= self.batch_size:
+                self.bulk_create(UserDog, batch, ignore_conflicts=True)
+                created += len(batch)
+                batch = []
+
+        if batch:
+            self.bulk_create(UserDog, batch, ignore_conflicts=True)
+            created += len(batch)
+        return created
@@ -0,0 +1,63 @@
+"""Runs SQLite's query planner maintenance. Schedule it periodically (e.g.,
+hourly from cron) and after bulk loads such as `generate_dataset`.
+
+    $ python3 manage.py optimize_db
+    $ python3 manage.py optimize_db --analyze --checkpoint
+    $ python3 manage.py optimize_db --vacuum
+
+`--vacuum` rebuilds the file to return free pages to the file system (e.g.,
+after a migration that rebuilds a large table); it needs as much free disk
+space as the database takes and locks it while it runs.
+
+`PRAGMA optimize` re-analyzes only the tables whose statistics look stale,
+so it is cheap enough to run often; `--analyze` re-gathers all of them.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from pugorugh import db
+
+
+class Command(BaseCommand):
+    help = "Runs PRAGMA optimize (and optionally ANALYZE) on SQLite"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--analyze', action='store_true',
+                            help="run a full ANALYZE first")
+        parser.add_argument('--checkpoint', action='store_true',
+                            help="checkpoint and truncate the WAL file")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="rebuild the database file (slow)")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError("optimize_db only supports SQLite")
+
+        statements = []
+        if options['analyze']:
+            statements.append('ANALYZE')
+        statements.append('PRAGMA optimize')
+        if options['vacuum']:
+            statements.append('VACUUM')
+        if options['checkpoint']:
+            statements.append('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        with connection.cursor() as cursor:
+            for statement in statements:
+                start = time.perf_counter()
+                cursor.execute(statement)
+                cursor.fetchall()
+                self.stdout.write(
+                    f'{statement}: '
+                    f'{(time.perf_counter() - start) * 1000:.1f} ms'
+                )
+
+        values = db.pragma_values(connection, ['journal_mode', 'page_count',
+                                               'freelist_count'])
+        self.stdout.write(
+            ', '.join(f'{name}={value}' for name, value in values.items())
+        )
@@ -0,0 +1,15 @@
+"""Prints a signed `X-Profile` header value, which makes the server profile
+the requests it is sent with (see `pugorugh.profiling`).
+
+    $ curl -H "X-Profile: $(python3 manage.py profile_token)" ...
+"""
+from django.core.management.base import BaseCommand
+
+from pugorugh import profiling
+
+
+class Command(BaseCommand):
+    help = "Prints a signed X-Profile header value"
+
+    def handle(self, *args, **options):
+        self.stdout.write(profiling.make_token())
@@ -0,0 +1,165 @@
+"""Replays traffic captured by `TrafficCaptureMiddleware` and reports the
+latencies as JSON.
+
+    $ python3 manage.py replay_traffic traffic.jsonl --concurrency 8 \\
+          --speedup 10 --output replay.json
+
+By default the requests go straight into this project's WSGI application
+(so run it against a copy of the database: the captured writes are
+replayed too); use `--url` to replay against a running server instead.
+Each request is sent with a token for the user who made it.
+"""
+import http.client
+import json
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from rest_framework.authtoken.models import Token
+
+from pugorugh import benchmarks
+from pugorugh import traffic
+from pugorugh.handlers import get_wsgi_application
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Replays captured API traffic and reports the latencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture_file')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--speedup', type=float, default=1.0,
+                            help="time compression factor (0: no delays)")
+        parser.add_argument('--limit', type=int,
+                            help="only replay the first N requests")
+        parser.add_argument('--url',
+                            help="replay against this server, e.g., "
+                                 "http://127.0.0.1:8000")
+        parser.add_argument('--client', action='store_true',
+                            help="use Django's test client instead of WSGI")
+        parser.add_argument('--output', help="write the JSON report here")
+
+    def handle(self, *args, **options):
+        try:
+            records = traffic.load(options['capture_file'])
+        except OSError as error:
+            raise CommandError(str(error))
+        if options['limit']:
+            records = records[:options['limit']]
+
+        self.tokens = self.get_tokens(records)
+
+        if options['url']:
+            send = self.http_sender(options['url'])
+        elif options['client']:
+            send = self.client_sender()
+        else:
+            send = self.wsgi_sender()
+
+        replayer = traffic.Replayer(
+            send,
+            concurrency=options['concurrency'],
+            speedup=options['speedup']
+        )
+        results = replayer.run(records)
+
+        benchmarks.write_report(
+            benchmarks.report(
+                results,
+                capture_file=options['capture_file'],
+                concurrency=options['concurrency'],
+                speedup=options['speedup'],
+            ),
+            options['output']
+        )
+
+    # Helper Methods
+    # --------------
+    def get_tokens(self, records):
+        """Returns a dict of user id -> Authorization header value (for the
+        users that still exist)
+        """
+        user_ids = {entry['user_id'] for entry in records if entry['user_id']}
+        tokens = {}
+        for user in User.objects.filter(pk__in=user_ids):
+            token, _ = Token.objects.get_or_create(user=user)
+            tokens[user.pk] = f'Token {token.key}'
+        return tokens
+
+    def request_parts(self, entry):
+        """Returns the (headers, body, query string) to send for a record"""
+        headers = {}
+        auth = self.tokens.get(entry['user_id'])
+        if auth:
+            headers['HTTP_AUTHORIZATION'] = auth
+        body = b''
+        if entry.get('body') is not None:
+            body = json.dumps(entry['body']).encode()
+        return headers, body, urlencode(entry.get('query') or {})
+
+    def wsgi_sender(self):
+        application = get_wsgi_application()
+
+        def send(entry):
+            headers, body, query_string = self.request_parts(entry)
+            status_code, _, _ = benchmarks.wsgi_request(
+                application,
+                entry['method'],
+                entry['path'],
+                headers=headers,
+                body=body,
+                query_string=query_string,
+            )
+            return status_code
+        return send
+
+    def client_sender(self):
+        client = Client()
+
+        def send(entry):
+            headers, body, query_string = self.request_parts(entry)
+            path = entry['path']
+            if query_string:
+                path = f'{path}?{query_string}'
+            response = client.generic(
+                entry['method'],
+                path,
+                data=body,
+                content_type='application/json',
+                HTTP_HOST=benchmarks.client_host(),
+                **headers
+            )
+            return response.status_code
+        return send
+
+    def http_sender(self, url):
+        parts = urlsplit(url)
+        connection_class = (http.client.HTTPSConnection
+                            if parts.scheme == 'https'
+                            else http.client.HTTPConnection)
+
+        def send(entry):
+            headers, body, query_string = self.request_parts(entry)
+            http_headers = {'Content-Type': 'application/json'}
+            if 'HTTP_AUTHORIZATION' in headers:
+                http_headers['Authorization'] = headers['HTTP_AUTHORIZATION']
+            path = entry['path']
+            if query_string:
+                path = f'{path}?{query_string}'
+
+            # (a connection per request: http.client isn't thread-safe)
+            connection = connection_class(parts.netloc, timeout=30)
+            try:
+                connection.request(entry['method'], path, body=body or None,
+                                   headers=http_headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            finally:
+                connection.close()
+        return send
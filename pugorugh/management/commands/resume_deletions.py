@@ -0,0 +1,16 @@
+"""Runs the background deletions (see `pugorugh.deletion`) left unfinished,
+e.g., by a restart.
+
+    $ python3 manage.py resume_deletions
+"""
+from django.core.management.base import BaseCommand
+
+from pugorugh import deletion
+
+
+class Command(BaseCommand):
+    help = "Runs the unfinished background deletions"
+
+    def handle(self, *args, **options):
+        count = deletion.resume()
+        self.stdout.write(f"Ran {count} deletion tasks")
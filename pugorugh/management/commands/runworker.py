@@ -0,0 +1,65 @@
+"""Runs background jobs (see `pugorugh.jobs`).
+
+    $ python3 manage.py runworker --processes 2 --threads 4
+    $ python3 manage.py runworker --once
+
+Each process runs its own threads; stop them with SIGTERM or Ctrl-C (the
+jobs being run are finished first). Finished jobs older than
+`settings.JOBS_KEEP_DAYS` are purged when the worker starts.
+"""
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from pugorugh import jobs
+
+
+def run_worker(threads, once):
+    worker = jobs.Worker(threads=threads)
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+    signal.signal(signal.SIGINT, lambda *args: worker.stop())
+    worker.run(once=once)
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=1,
+                            help="threads per process")
+        parser.add_argument('--once', action='store_true',
+                            help="exit when there are no jobs left to run")
+
+    def handle(self, *args, **options):
+        purged = jobs.purge(getattr(settings, 'JOBS_KEEP_DAYS', 7))
+        if purged:
+            self.stdout.write(f"Purged {purged} finished jobs")
+
+        if options['processes'] <= 1:
+            run_worker(options['threads'], options['once'])
+            return
+
+        # (the children mustn't share the parent's database connections)
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=run_worker,
+                            args=(options['threads'], options['once']))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        # (pass a SIGTERM on: each child then stops gracefully)
+        signal.signal(signal.SIGTERM, lambda *args: [
+            process.terminate() for process in processes
+        ])
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:  # (the children get the SIGINT too)
+            for process in processes:
+                process.join()
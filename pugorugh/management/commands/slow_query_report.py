@@ -0,0 +1,47 @@
+"""Prints the slow query log (see `pugorugh.slow_queries`) grouped by
+fingerprint, most total time first. Run it periodically (e.g., from cron)
+to keep an eye on new slow queries.
+
+    $ python3 manage.py slow_query_report --limit 10
+    $ python3 manage.py slow_query_report --json > slow-queries.json
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from pugorugh import slow_queries
+
+
+class Command(BaseCommand):
+    help = "Reports the logged slow queries, grouped by fingerprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--json', action='store_true',
+                            help="output the report as JSON")
+
+    def handle(self, *args, **options):
+        entries, plans = slow_queries.collect()
+        groups = slow_queries.summarize(entries, plans)[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(groups, indent=2))
+            return
+
+        if not groups:
+            self.stdout.write("No slow queries have been logged")
+            return
+
+        for group in groups:
+            self.stdout.write(
+                f"{group['count']} x {group['mean_ms']:.1f} ms "
+                f"(total {group['total_ms']:.1f} ms, "
+                f"max {group['max_ms']:.1f} ms)"
+            )
+            self.stdout.write(f"  {group['fingerprint']}")
+            for site in group['call_sites']:
+                self.stdout.write(f"  from {site}")
+            if group['plan']:
+                for line in group['plan'].splitlines():
+                    self.stdout.write(f"  plan: {line}")
+            self.stdout.write('')
@@ -0,0 +1,57 @@
+"""Prints the traced spans (see `pugorugh.tracing`), slowest first.
+
+    $ python3 manage.py slowest_spans --sort p95 --limit 10
+
+Times are in milliseconds; the percentiles are the upper bounds of the
+histogram buckets they fall in ('>1000' if beyond the largest bucket).
+"""
+from django.core.management.base import BaseCommand
+
+from pugorugh import tracing
+
+
+SORT_KEYS = ['p50', 'p95', 'p99', 'mean', 'total', 'count']
+
+
+class Command(BaseCommand):
+    help = "Prints the slowest traced spans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=SORT_KEYS, default='p95')
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        stats = tracing.span_stats()
+        if not stats:
+            self.stdout.write("No spans have been recorded")
+            return
+
+        sort_key = options['sort']
+        # (None means "beyond the largest bucket", i.e., slowest)
+        stats.sort(
+            key=lambda row: (row[sort_key] is None,
+                             row[sort_key] or 0),
+            reverse=True
+        )
+
+        width = max(len(row['name']) for row in stats)
+        columns = ['count', 'mean', 'p50', 'p95', 'p99', 'total']
+        self.stdout.write(
+            'span'.ljust(width) + ''.join(
+                column.rjust(12) for column in columns
+            )
+        )
+        for row in stats[:options['limit']]:
+            cells = [str(row['count'])] + [
+                self.format_ms(row[column]) for column in columns[1:]
+            ]
+            self.stdout.write(
+                row['name'].ljust(width) + ''.join(
+                    cell.rjust(12) for cell in cells
+                )
+            )
+
+    def format_ms(self, seconds):
+        if seconds is None:
+            return '>1000'
+        return f'{seconds * 1000:.3f}'
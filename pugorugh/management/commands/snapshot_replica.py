@@ -0,0 +1,74 @@
+"""Copies the primary SQLite database into a local read replica (see
+`pugorugh.routers`), once or every `--interval` seconds. The copy is made
+with SQLite's online backup API, so it is consistent even while the
+primary is being written to.
+
+The replica lags by up to the interval plus the time a copy takes, which
+must stay below `settings.REPLICA_PIN_SECONDS` for clients to read their
+own writes (see `pugorugh.routers`).
+
+    $ PUGORUGH_LOCAL_REPLICA=1 python3 manage.py snapshot_replica --interval 5
+"""
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Snapshots the primary SQLite database into a replica"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replica', default='replica',
+                            help="the replica's alias in DATABASES")
+        parser.add_argument('--source', help="primary path (default: "
+                                             "the 'default' database)")
+        parser.add_argument('--target', help="replica path (default: "
+                                             "the replica's database)")
+        parser.add_argument('--interval', type=float,
+                            help="keep snapshotting every N seconds")
+
+    def handle(self, *args, **options):
+        source = options['source'] or settings.DATABASES['default']['NAME']
+        target = options['target']
+        if target is None:
+            if options['replica'] not in settings.DATABASES:
+                raise CommandError(
+                    f"There is no '{options['replica']}' database "
+                    f"(set PUGORUGH_LOCAL_REPLICA=1 or pass --target)"
+                )
+            target = settings.DATABASES[options['replica']]['NAME']
+
+        interval = options['interval']
+        pin_seconds = settings.REPLICA_PIN_SECONDS
+        if interval and interval >= pin_seconds:
+            raise CommandError(
+                f"--interval must be shorter than REPLICA_PIN_SECONDS "
+                f"({pin_seconds}s), or clients may not read their own writes"
+            )
+
+        while True:
+            start = time.perf_counter()
+            self.snapshot(source, target)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"Copied {source} to {target} in {elapsed * 1000:.0f} ms"
+            )
+            if not interval:
+                return
+            if interval + elapsed >= pin_seconds:
+                self.stderr.write(
+                    f"The replica lags by up to {interval + elapsed:.1f}s, "
+                    f"more than REPLICA_PIN_SECONDS ({pin_seconds}s)"
+                )
+            time.sleep(interval)
+
+    def snapshot(self, source, target):
+        source_connection = sqlite3.connect(source)
+        target_connection = sqlite3.connect(target)
+        try:
+            source_connection.backup(target_connection)
+        finally:
+            target_connection.close()
+            source_connection.close()
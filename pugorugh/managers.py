@@ -1,6 +1,9 @@
 import sys
+import time
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
 
 
 AGE_MAPPING = [
@@ -14,6 +17,29 @@ AGE_MAPPING = [
 
 class DogQuerySet(models.QuerySet):
 
+    # Writes
+    # ------
+    # (neither sends post_save, so they bump the catalog version here; see
+    # candidates.py)
+    def update(self, **kwargs):
+        # (and, like Dog.save, the rows' versions, which key their cached
+        # JSON; see dog_json.py)
+        kwargs.setdefault('row_version', Greatest(
+            F('row_version') + 1, time.time_ns() // 1000
+        ))
+        rows = super().update(**kwargs)
+        if rows:
+            from .candidates import bump_catalog_version
+            bump_catalog_version(using=self.db)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            from .candidates import bump_catalog_version
+            bump_catalog_version(using=self.db)
+        return created
+
     # Non user-specific filters
     # -------------------------
     def with_genders(self, genders):
@@ -70,41 +96,15 @@ class DogQuerySet(models.QuerySet):
         has that status.
         """
 
+        from .models import UserDog
+
+        # (a subquery on the user's range of UserDog keys rather than a
+        # join: see UserDog.make_key)
+        users_dogs = UserDog.objects.for_user(user)
         if status == 'u':
-            return self.exclude(
-                userdog__user=user
-            )
-
-        # first dog is first pk with corresponding status
-        #
-        # Reminder: when querying through a reverseFK or a MTM, the
-        # behaviour of chained filters can be subtly different.
-        # Imagine there is a dog called 'Spot'. Current_user has marked
-        # Spot as 'l'. Someother_user has marked Spot as 'd'.
-        # Now consider the following chained filters. First:
-        # dogs_disliked_by_current_user = Dog.objects.filter(
-        #     userdog__user=current_user,
-        #     userdog__status='d'
-        # )
-        #
-        # This will return exactly what we might expect, a queryset that
-        # does not include Spot: he does not have a userdog relation that
-        # contains both current_user and 'd'.
-        #
-        # Second:
-        # dogs_reviewed_by_cu_and_disliked_by_someone = Dog.objects.filter(
-        #     userdog__user=current_user
-        # ).filter(
-        #     userdog__status='d'
-        # )
-        #
-        # Spot WILL appear in this queryset because he does have a userdog
-        # relation containing the current_user, so he isn't filtered out
-        # by the first filter. He also has a userdog relation with 'd',
-        # so he's not filtered out by the second filter.
+            return self.exclude(pk__in=users_dogs.values('dog_id'))
         return self.filter(
-            userdog__user=user,
-            userdog__status=status
+            pk__in=users_dogs.filter(status=status).values('dog_id')
         )
 
     # UserPref-specific filters
@@ -157,7 +157,8 @@ class DogQuerySet(models.QuerySet):
 class DogManager(models.Manager):
 
     def get_queryset(self):
-        return DogQuerySet(self.model, using=self._db)
+        # (deleted dogs are hidden until they are removed: see deletion.py)
+        return DogQuerySet(self.model, using=self._db).filter(deleted=False)
 
     def with_status(self, user, status):
         return self.get_queryset().with_status(user, status)
@@ -173,3 +174,33 @@ class DogManager(models.Manager):
 
     def with_prefs(self, user):
         return self.get_queryset().with_prefs(user)
+
+
+class UserDogQuerySet(models.QuerySet):
+
+    def for_user(self, user):
+        """Returns the userdogs of a user (or user id): one contiguous
+        range of primary keys (see UserDog.make_key)
+        """
+        user_id = getattr(user, 'pk', user)
+        return self.filter(
+            pk__gte=self.model.make_key(user_id, 0),
+            pk__lte=self.model.make_key(user_id, self.model.KEY_MASK)
+        )
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # (bulk_create doesn't call save(), which normally sets the key)
+        objs = list(objs)
+        for obj in objs:
+            if obj.pk is None:
+                obj.pk = obj.make_key(obj.user_id, obj.dog_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class UserDogManager(models.Manager):
+
+    def get_queryset(self):
+        return UserDogQuerySet(self.model, using=self._db)
+
+    def for_user(self, user):
+        return self.get_queryset().for_user(user)
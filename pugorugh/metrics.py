@@ -0,0 +1,394 @@
+"""Application metrics in the Prometheus text exposition format.
+
+see: https://prometheus.io/docs/instrumenting/exposition_formats/
+
+Each process keeps its own counters and histograms in memory and
+periodically writes a snapshot of them to `settings.METRICS_DIR` (one JSON
+file per process, named after its pid and a random token, so that a process
+reusing a dead one's pid never overwrites its file; replaced atomically).
+The `/metrics` view sums the snapshots of every process, so the exported
+values cover all of the WSGI worker processes. The snapshots of processes
+that are no longer running are added into a running total
+(`RETIRED_NAME`) and deleted, so counters remain monotonic when a worker is
+recycled without the files piling up.
+
+`/metrics` is only served to staff users and to scrapers sending
+`settings.METRICS_TOKEN` as a bearer token (see `views.metrics_view`).
+
+Usage:
+
+```python
+from . import metrics
+
+metrics.inc('pugorugh_swipes_total', {'status': 'l'})
+metrics.observe('pugorugh_upload_duration_seconds', 0.25)
+```
+
+Every metric name must be declared in `METRICS`.
+"""
+import atexit
+import json
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # (Windows)
+    fcntl = None
+    import msvcrt
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PREFIX = 'metrics-'
+RETIRED_NAME = 'retired.json'
+LOCK_NAME = '.lock'
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+                   1.0, 2.5, 5.0, 10.0)
+# (spans time single methods, so they need finer buckets)
+SPAN_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'pugorugh_http_request_duration_seconds': (
+        'histogram', 'Request latency by URL name.', LATENCY_BUCKETS),
+    'pugorugh_http_responses_total': (
+        'counter', 'Responses by URL name and status code.', None),
+    'pugorugh_swipes_total': (
+        'counter', 'Dog status changes by status.', None),
+    'pugorugh_db_queries_total': (
+        'counter', 'SQL queries issued by URL name.', None),
+    'pugorugh_cache_requests_total': (
+        'counter', 'Cache lookups by cache and result (hit/miss).', None),
+    'pugorugh_upload_bytes_total': (
+        'counter', 'Bytes written by image uploads.', None),
+    'pugorugh_upload_duration_seconds': (
+        'histogram', 'Time taken to write image uploads.', LATENCY_BUCKETS),
+    'pugorugh_span_duration_seconds': (
+        'histogram', 'Time spent in traced code paths by span name.',
+        SPAN_BUCKETS),
+}
+
+
+def _label_key(labels):
+    """Returns a hashable, canonical representation of a labels dict"""
+    return tuple(sorted((labels or {}).items()))
+
+
+class Registry:
+    """The metric values of the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._token = secrets.token_hex(4)
+        self._last_flush = time.monotonic()
+        # (name, label key) -> value
+        self.counters = {}
+        # (name, label key) -> [bucket counts..., +Inf count, sum, count]
+        self.histograms = {}
+
+    def _check_pid(self):
+        # A forked worker inherits its parent's values; start from zero so
+        # they aren't counted twice.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_pid()
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def observe(self, name, value, labels=None):
+        buckets = METRICS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_pid()
+            series = self.histograms.get(key)
+            if series is None:
+                # one count per bucket, then +Inf, sum and count
+                series = [0] * (len(buckets) + 3)
+                self.histograms[key] = series
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(buckets)] += 1
+            series[-2] += value
+            series[-1] += 1
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            return {
+                'counters': [
+                    [name, dict(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, dict(labels), list(series)]
+                    for (name, labels), series in self.histograms.items()
+                ],
+            }
+
+    # Persistence
+    # -----------
+    def path(self):
+        metrics_dir = getattr(settings, 'METRICS_DIR', None)
+        if not metrics_dir:
+            return None
+        with self._lock:
+            self._check_pid()
+            name = f'{SNAPSHOT_PREFIX}{self._pid}-{self._token}.json'
+        return os.path.join(metrics_dir, name)
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Writes the snapshot of this process's metrics to disk"""
+        path = self.path()
+        self._last_flush = time.monotonic()
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write(path, self.snapshot())
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+atexit.register(registry.flush)
+
+
+# Aggregation
+# -----------
+def _add(totals, snapshot):
+    """Adds a snapshot's values to `totals` ({'counters': {}, 'histograms':
+    {}}, keyed by (name, label key))
+    """
+    for name, labels, value in snapshot['counters']:
+        key = (name, _label_key(labels))
+        totals['counters'][key] = totals['counters'].get(key, 0) + value
+    for name, labels, series in snapshot['histograms']:
+        key = (name, _label_key(labels))
+        total = totals['histograms'].setdefault(key, [0] * len(series))
+        for i, value in enumerate(series):
+            total[i] += value
+
+
+def _read(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):  # e.g., deleted mid-scan
+        return None
+
+
+def _write(path, data):
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def pid_alive(pid):
+    """Returns whether a process with the pid is running (always True on
+    Windows, where `os.kill` can't probe a process without ending it: the
+    files of dead processes are only retired on POSIX systems)
+    """
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # (it exists, but isn't ours)
+        return True
+    return True
+
+
+def _snapshot_pid(name):
+    """Returns the pid in a snapshot's file name (None if it isn't one)"""
+    if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith('.json')):
+        return None
+    try:
+        return int(name[len(SNAPSHOT_PREFIX):-len('.json')].split('-')[0])
+    except ValueError:
+        return None
+
+
+@contextmanager
+def locked(path):
+    """Holds an exclusive lock on the file at `path` (created if needed),
+    across processes, for the duration of the block
+    """
+    with open(path, 'a') as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        else:
+            # (locks the file's first byte, retrying for up to 10s)
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is None:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def retire(metrics_dir):
+    """Adds the snapshots of the processes that are no longer running to
+    the retired total, and deletes them (call with `METRICS_DIR`'s lock
+    held).
+
+    The total records the names of the snapshots added to it, so that a
+    snapshot is never added twice, even after a crash between writing the
+    total and deleting the snapshot.
+    """
+    retired_path = os.path.join(metrics_dir, RETIRED_NAME)
+    retired = _read(retired_path) or {
+        'counters': [], 'histograms': [], 'merged': [],
+    }
+    dead = [name for name in os.listdir(metrics_dir)
+            if _snapshot_pid(name) is not None and
+            not pid_alive(_snapshot_pid(name))]
+    new = [name for name in dead if name not in retired['merged']]
+    if new:
+        totals = {'counters': {}, 'histograms': {}}
+        _add(totals, retired)
+        for name in new:
+            snapshot = _read(os.path.join(metrics_dir, name))
+            if snapshot is not None:
+                _add(totals, snapshot)
+        _write(retired_path, {
+            'counters': [[metric, dict(labels), value]
+                         for (metric, labels), value
+                         in totals['counters'].items()],
+            'histograms': [[metric, dict(labels), series]
+                           for (metric, labels), series
+                           in totals['histograms'].items()],
+            # (only the names still in the directory need remembering)
+            'merged': sorted(dead),
+        })
+    for name in dead:
+        try:
+            os.remove(os.path.join(metrics_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def collect():
+    """Returns the sum of the metrics of every process (running or not) as
+    a dict with 'counters' and 'histograms' keys (each mapping (name, label
+    key) to a value)
+    """
+    registry.flush()
+
+    snapshots = []
+    metrics_dir = getattr(settings, 'METRICS_DIR', None)
+    if metrics_dir and os.path.isdir(metrics_dir):
+        # (locked, so that no snapshot is read both in the retired total
+        # and on its own, or in neither)
+        with locked(os.path.join(metrics_dir, LOCK_NAME)):
+            try:
+                retire(metrics_dir)
+            except OSError:
+                logger.exception("Could not retire the metrics in %s",
+                                 metrics_dir)
+            for entry in os.scandir(metrics_dir):
+                if (entry.name == RETIRED_NAME or
+                        _snapshot_pid(entry.name) is not None):
+                    snapshot = _read(entry.path)
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+    else:
+        snapshots.append(registry.snapshot())
+
+    totals = {'counters': {}, 'histograms': {}}
+    for snapshot in snapshots:
+        _add(totals, snapshot)
+    return totals
+
+
+# Exposition
+# ----------
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', r'\\').replace('"', r'\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render():
+    """Returns all of the metrics in the Prometheus text format"""
+    collected = collect()
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+        if metric_type == 'counter':
+            series = sorted(
+                item for item in collected['counters'].items()
+                if item[0][0] == name
+            )
+            for (_, labels), value in series:
+                lines.append(
+                    f'{name}{_format_labels(labels)} {_format_value(value)}'
+                )
+            continue
+
+        series = sorted(
+            item for item in collected['histograms'].items()
+            if item[0][0] == name
+        )
+        for (_, labels), values in series:
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values):
+                cumulative += count
+                bucket_labels = labels + (('le', bound),)
+                lines.append(
+                    f'{name}_bucket{_format_labels(bucket_labels)} '
+                    f'{cumulative}'
+                )
+            lines.append(
+                f'{name}_sum{_format_labels(labels)} '
+                f'{_format_value(float(values[-2]))}'
+            )
+            lines.append(
+                f'{name}_count{_format_labels(labels)} {values[-1]}'
+            )
+    return '\n'.join(lines) + '\n'
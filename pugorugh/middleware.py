@@ -0,0 +1,214 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import instrumentation
+from . import metrics
+from . import profiling
+from . import routers
+from . import traffic
+
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Records the latency, status code and SQL query count of each
+    request (labelled with the URL name) for the `/metrics` endpoint.
+
+    This should be the first entry in `MIDDLEWARE` (i.e., wrapping
+    `QueryInstrumentationMiddleware`) so that the query count is complete
+    when it is recorded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.url_name if match else None) or 'unmatched'
+
+        metrics.observe('pugorugh_http_request_duration_seconds', duration,
+                        {'url_name': url_name})
+        metrics.inc('pugorugh_http_responses_total',
+                    {'url_name': url_name,
+                     'status': str(response.status_code)})
+
+        request_metrics = getattr(request, 'instrumentation', None)
+        if request_metrics is not None:
+            metrics.inc('pugorugh_db_queries_total', {'url_name': url_name},
+                        request_metrics.query_count)
+
+        return response
+
+
+class QueryInstrumentationMiddleware:
+    """Records the number of SQL queries, the total SQL time and the time
+    spent in the view and serializer for each request.
+
+    The results are returned to the client as a `Server-Timing` header and,
+    if the request's route has a query budget (`settings.QUERY_BUDGETS`,
+    keyed by URL name) and the request exceeded it, logged as a warning.
+
+    This should come before the other middleware in `MIDDLEWARE` (only
+    `MetricsMiddleware` goes first) so that queries issued by the other
+    middleware are counted too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = instrumentation.RequestMetrics()
+        request.instrumentation = request_metrics
+
+        start = time.perf_counter()
+        with instrumentation.collect(request_metrics):
+            with instrumentation.wrap_connections(request_metrics):
+                response = self.get_response(request)
+        end = time.perf_counter()
+
+        # The view timing runs from `process_view` to the end of the
+        # response (i.e., it includes rendering the response)
+        view_start = getattr(request, '_view_start', None)
+        if view_start is not None:
+            request_metrics.add_timing('view', end - view_start)
+        request_metrics.add_timing('total', end - start)
+
+        response['Server-Timing'] = request_metrics.server_timing()
+        self.check_budget(request, request_metrics)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._view_start = time.perf_counter()
+
+    def check_budget(self, request, request_metrics):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(match.url_name)
+        if budget is not None and request_metrics.query_count > budget:
+            logger.warning(
+                "Query budget exceeded for %s (%s %s): %s queries "
+                "(budget %s)",
+                match.url_name, request.method, request.path,
+                request_metrics.query_count, budget
+            )
+
+
+class TrafficCaptureMiddleware:
+    """Records a sample of the API requests (see `traffic.py`) for replaying
+    with the `replay_traffic` management command.
+
+    Capturing is off unless `settings.TRAFFIC_CAPTURE_FILE` is set;
+    `settings.TRAFFIC_CAPTURE_SAMPLE_RATE` is the fraction of requests
+    recorded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.recorder = None
+        path = getattr(settings, 'TRAFFIC_CAPTURE_FILE', None)
+        if path:
+            self.recorder = traffic.TrafficRecorder(path)
+
+    def __call__(self, request):
+        if not self.should_capture(request):
+            return self.get_response(request)
+
+        # the body has to be read before the view consumes the stream
+        body = None
+        if request.content_type == 'application/json' and request.body:
+            try:
+                body = traffic.scrub(json.loads(request.body))
+            except ValueError:
+                body = None
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        # DRF copies the token-authenticated user onto the Django request
+        user = getattr(request, 'user', None)
+        self.recorder.record({
+            'ts': time.time() - duration,
+            'method': request.method,
+            'path': request.path,
+            'route': match.url_name if match else None,
+            'kwargs': match.kwargs if match else {},
+            'query': traffic.scrub(request.GET.dict()),
+            'body': body,
+            'user_id': user.pk if user and user.is_authenticated else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+        })
+        return response
+
+    def should_capture(self, request):
+        if self.recorder is None or not request.path.startswith('/api/'):
+            return False
+        rate = getattr(settings, 'TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0)
+        return random.random() < rate
+
+
+class ProfilingMiddleware:
+    """Runs requests under cProfile on demand (see `profiling.py`) and saves
+    the stats to `settings.PROFILE_DIR`.
+
+    This must come after `AuthenticationMiddleware` in `MIDDLEWARE` (it
+    checks whether the session user is staff).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.profile_dir() and profiling.wants_profile(request):
+            return profiling.profile(request, self.get_response)
+        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """Sends the reads of GET requests to the routes in
+    `settings.REPLICA_ROUTES` (by URL name) to a read replica (see
+    `routers.py`), unless the client has written recently.
+
+    Any other request (i.e., a potential write) pins the client to the
+    primary for `settings.REPLICA_PIN_SECONDS` (and so does logging in: see
+    `UserLoginView`).
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        token = getattr(request, '_replica_token', None)
+        if token is not None:
+            routers._read_alias.reset(token)
+        if request.method not in self.SAFE_METHODS and routers.replicas():
+            routers.pin(routers.client_key(request))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method != 'GET' or
+                request.resolver_match.url_name not in getattr(
+                    settings, 'REPLICA_ROUTES', [])):
+            return None
+        alias = routers.choose_replica()
+        if alias is None or routers.is_pinned(request):
+            return None
+        request._replica_token = routers._read_alias.set(alias)
+        return None
@@ -0,0 +1,128 @@
+# Generated by Django 2.2.8 on 2026-10-19 12:58
+
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError, migrations, models, transaction
+import django.db.models.deletion
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+KEY_BITS = 32
+
+# (the sizes before the conversion, by database alias)
+sizes_before = {}
+
+
+# (a copy of `pugorugh.db.object_sizes` as it was: migrations mustn't
+# depend on the app's code, which may change after them)
+def object_sizes(connection, table):
+    """Returns a dict of the bytes used by a table and by each of its
+    indexes (None if the database can't report it: it needs SQLite's
+    `dbstat` virtual table)
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE tbl_name = %s AND type IN ('table', 'index')",
+                [table]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT name, SUM(pgsize) FROM dbstat "
+                f"WHERE name IN ({', '.join(['%s'] * len(names))}) "
+                "GROUP BY name",
+                names
+            )
+            return dict(cursor.fetchall())
+    except DatabaseError:
+        return None
+
+
+def log_sizes(label, sizes):
+    if sizes is None:
+        return
+    for name, size in sorted(sizes.items()):
+        logger.info("%s: %s %.1f MB", label, name, size / 2 ** 20)
+    logger.info("%s: total %.1f MB", label, sum(sizes.values()) / 2 ** 20)
+
+
+def convert_keys(apps, schema_editor):
+    """Renumbers the userdogs with their (user, dog) keys (see
+    `UserDog.make_key`), in chunks, each in its own transaction (so an
+    interrupted conversion picks up where it left off)
+    """
+    UserDog = apps.get_model('pugorugh', 'UserDog')
+    connection = schema_editor.connection
+    if not UserDog.objects.using(connection.alias).exists():
+        return
+
+    table = UserDog._meta.db_table
+    sizes_before[connection.alias] = object_sizes(connection, table)
+    log_sizes("UserDog before", sizes_before[connection.alias])
+
+    # (converted keys are at least 1 << KEY_BITS: user ids start at 1)
+    converted = 0
+    while True:
+        with transaction.atomic(using=connection.alias):
+            ids = list(
+                UserDog.objects.using(connection.alias).filter(
+                    pk__lt=1 << KEY_BITS
+                ).order_by('pk').values_list('pk', flat=True)[:CHUNK_SIZE]
+            )
+            if not ids:
+                break
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} '
+                    f'SET id = user_id * {1 << KEY_BITS} + dog_id '
+                    f"WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                    ids
+                )
+        converted += len(ids)
+    logger.info("Converted the keys of %s userdogs", converted)
+
+
+def report_sizes(apps, schema_editor):
+    UserDog = apps.get_model('pugorugh', 'UserDog')
+    connection = schema_editor.connection
+    if connection.alias not in sizes_before:
+        return
+    log_sizes("UserDog after",
+              object_sizes(connection, UserDog._meta.db_table))
+
+
+class Migration(migrations.Migration):
+
+    # (so that each chunk of convert_keys commits on its own)
+    atomic = False
+
+    dependencies = [
+        ('pugorugh', '0009_auto_20261019_1253'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_keys, migrations.RunPython.noop,
+                             hints={'model_name': 'userdog'}),
+        migrations.AlterField(
+            model_name='userdog',
+            name='id',
+            field=models.BigAutoField(primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='userdog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userdog',
+            unique_together=set(),
+        ),
+        migrations.RunPython(report_sizes, migrations.RunPython.noop,
+                             hints={'model_name': 'userdog'}),
+    ]
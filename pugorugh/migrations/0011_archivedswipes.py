@@ -0,0 +1,29 @@
+# Generated by Django 2.2.8 on 2026-10-19 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('pugorugh', '0010_auto_20261019_1258'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSwipes',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('count', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'archived swipes',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.8 on 2026-10-19 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pugorugh', '0013_auto_20261019_1307'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dog',
+            name='row_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.8 on 2026-10-19 13:54
+
+import time
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    """Creates the single row, seeded from the clock (see
+    `candidates.bump_catalog_version`)
+    """
+    CatalogVersion = apps.get_model('pugorugh', 'CatalogVersion')
+    CatalogVersion.objects.using(schema_editor.connection.alias).create(
+        pk=1, version=time.time_ns() // 1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pugorugh', '0014_dog_row_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
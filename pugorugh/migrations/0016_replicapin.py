@@ -0,0 +1,20 @@
+# Generated by Django 2.2.8 on 2026-10-19 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pugorugh', '0015_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplicaPin',
+            fields=[
+                ('client', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('until', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
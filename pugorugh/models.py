@@ -1,10 +1,15 @@
 import sys
+import time
 from django.conf import settings
-from django.db.models import Model, CASCADE
-from django.db.models import (CharField, PositiveIntegerField,
-                              ForeignKey, OneToOneField, BooleanField)
+from django.db.models import Model, Index, CASCADE, DO_NOTHING
+from django.db.models import (CharField, PositiveIntegerField, BigAutoField,
+                              BigIntegerField,
+                              ForeignKey, OneToOneField, BooleanField,
+                              BinaryField, DateTimeField, TextField,
+                              SmallIntegerField, PositiveSmallIntegerField)
+from django.utils import timezone
 
-from .managers import DogManager
+from .managers import DogManager, DogQuerySet, UserDogManager
 
 
 class Dog(Model):
@@ -46,9 +51,20 @@ class Dog(Model):
     favourite_toy = CharField(max_length=255, blank=True, default='')
     favourite_treat = CharField(max_length=255, blank=True, default='')
 
+    # Bookkeeping
+    # -----------
+    # (a deleted dog is hidden at once and removed in the background; see
+    # deletion.py)
+    deleted = BooleanField(default=False)
+    # (changes on every save and queryset update(), and keys the dog's
+    # cached JSON; see dog_json.py)
+    row_version = BigIntegerField(default=0, editable=False)
+
     # Custom Manager
     # --------------
+    # (`objects` hides deleted dogs; `all_objects` doesn't)
     objects = DogManager()
+    all_objects = DogQuerySet.as_manager()
 
     class Meta:
         # Make explicit our intent that, unless otherwise specified in a
@@ -58,8 +74,56 @@ class Dog(Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # (microseconds since the epoch rather than a counter, so that a new
+        # dog that reuses a deleted dog's pk never reuses its version)
+        self.row_version = max(self.row_version + 1, time.time_ns() // 1000)
+        super().save(*args, **kwargs)
+
+
+class CatalogVersion(Model):
+    """The version of the set of dogs (a single row), which keys the shared
+    candidate lists (see candidates.py).
+
+    It is bumped, in the database so that every process sees it, whenever
+    dogs are saved, deleted, updated or bulk-created through the ORM (see
+    signals.py and `DogQuerySet`); raw SQL writes to the dogs must call
+    `candidates.bump_catalog_version` themselves.
+    """
+
+    version = BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.version)
+
+
+class ReplicaPin(Model):
+    """Sends a client's reads to the primary database until `until`, so
+    that it reads its own writes however far the replicas lag (see
+    routers.py). Kept in the primary database so that every process sees
+    it.
+    """
+
+    # (a hash of the client's credentials; see `routers.client_key`)
+    client = CharField(max_length=40, primary_key=True)
+    until = DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.client} until {self.until}'
+
 
 class UserDog(Model):
+    """A user's status for a dog.
+
+    The primary key is derived from the user and dog (see `make_key`), and
+    on SQLite an integer primary key *is* the table's B-tree key, so the
+    table is stored clustered on (user, dog): all of a user's userdogs are
+    one contiguous range (see `UserDog.objects.for_user`), and the key also
+    enforces that a user has at most one userdog per dog.
+    """
+
+    KEY_BITS = 32
+    KEY_MASK = (1 << KEY_BITS) - 1
 
     LIKED = 'l'
     DISLIKED = 'd'
@@ -67,7 +131,12 @@ class UserDog(Model):
         (LIKED, 'liked'),
         (DISLIKED, 'disliked'),
     )
-    user = ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=CASCADE)
+    # (the users may be in another database (see routers.py), so there is
+    # no DB constraint and signals.py deletes a user's userdogs)
+    # (no index on user: the primary key covers per-user lookups)
+    id = BigAutoField(primary_key=True)
+    user = ForeignKey(to=settings.AUTH_USER_MODEL, on_delete=DO_NOTHING,
+                      db_constraint=False, db_index=False)
     dog = ForeignKey(to='Dog', on_delete=CASCADE)
     status = CharField(max_length=1, choices=STATUS_CHOICES)
 
@@ -76,18 +145,39 @@ class UserDog(Model):
     favourite = BooleanField(default=False)
     met_in_person = BooleanField(default=False)
 
-    class Meta:
-        unique_together = (
-            ('user', 'dog'),
-        )
+    # Custom Manager
+    # --------------
+    objects = UserDogManager()
 
     def __str__(self):
         return "{} x {}".format(self.user, self.dog)
 
+    @classmethod
+    def make_key(cls, user_id, dog_id):
+        """Returns the primary key of a user's userdog for a dog (raises
+        ValueError if the dog's id doesn't fit in `KEY_BITS`)
+        """
+        if not 0 <= dog_id <= cls.KEY_MASK:
+            raise ValueError(f"Dog id out of range for a userdog key: "
+                             f"{dog_id}")
+        return (user_id << cls.KEY_BITS) | dog_id
+
+    def save(self, *args, **kwargs):
+        key = self.make_key(self.user_id, self.dog_id)
+        if self.pk is None:
+            self.pk = key
+            # (an INSERT: don't let Django turn a duplicate into an UPDATE)
+            kwargs['force_insert'] = True
+        elif self.pk != key:
+            raise ValueError("A userdog's user and dog can't be changed")
+        super().save(*args, **kwargs)
+
 
 class UserPref(Model):
 
-    user = OneToOneField(to=settings.AUTH_USER_MODEL, on_delete=CASCADE)
+    # (see UserDog.user)
+    user = OneToOneField(to=settings.AUTH_USER_MODEL, on_delete=DO_NOTHING,
+                         db_constraint=False)
     age = CharField(max_length=7, default="b,y,a,s")
     gender = CharField(max_length=3, default="m,f")
     size = CharField(max_length=8, default="s,m,l,xl")
@@ -106,3 +196,110 @@ class UserPref(Model):
             f'size: {self.size}'
         )
         return s
+
+
+class ArchivedSwipes(Model):
+    """The userdogs of an inactive user, packed and compressed (see
+    archive.py)
+    """
+
+    # (see UserDog.user)
+    user = OneToOneField(to=settings.AUTH_USER_MODEL, on_delete=DO_NOTHING,
+                         db_constraint=False)
+    data = BinaryField()
+    count = PositiveIntegerField()
+    archived_at = DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'archived swipes'
+
+    def __str__(self):
+        return f'{self.user} ({self.count} swipes)'
+
+
+class DeletionTask(Model):
+    """The background deletion of a dog, or of a deleted user's rows (see
+    deletion.py)
+    """
+
+    DOG = 'dog'
+    USER = 'user'
+    KIND_CHOICES = (
+        (DOG, 'dog'),
+        (USER, 'user'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    kind = CharField(max_length=4, choices=KIND_CHOICES)
+    object_id = PositiveIntegerField()
+    label = CharField(max_length=255, blank=True, default='')
+    status = CharField(max_length=7, choices=STATUS_CHOICES,
+                       default=PENDING)
+    # (the related rows to delete, as counted when the task was created)
+    total = PositiveIntegerField(default=0)
+    deleted = PositiveIntegerField(default=0)
+    error = TextField(blank=True, default='')
+    created_at = DateTimeField(auto_now_add=True)
+    updated_at = DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-pk', ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id} ({self.label}): {self.status}'
+
+    @property
+    def progress(self):
+        """Returns the percentage of the related rows deleted so far"""
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, round(100 * self.deleted / self.total))
+
+
+class Job(Model):
+    """A call to a background job function (see jobs.py)"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'queued'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    )
+
+    name = CharField(max_length=255)  # the function's dotted path
+    arguments = TextField(default='{}')  # JSON: {"args": [], "kwargs": {}}
+    priority = SmallIntegerField(default=0)  # (highest first)
+    status = CharField(max_length=7, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = PositiveSmallIntegerField(default=0)
+    max_attempts = PositiveSmallIntegerField(default=5)
+    run_at = DateTimeField(default=timezone.now)
+    lease_until = DateTimeField(null=True, blank=True)
+    locked_by = CharField(max_length=100, blank=True, default='')
+    last_error = TextField(blank=True, default='')
+    created_at = DateTimeField(auto_now_add=True)
+    updated_at = DateTimeField(auto_now=True)
+    finished_at = DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-pk', ]
+        indexes = [
+            Index(fields=['status', 'priority', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}: {self.status}'
@@ -0,0 +1,169 @@
+"""On-demand profiling of individual requests.
+
+`ProfilingMiddleware` (see `middleware.py`) runs a request under cProfile
+when either:
+
+- the request has an `X-Profile` header containing a token signed with
+  this project's SECRET_KEY (see `make_token`, or run
+  `python3 manage.py profile_token`), so API clients can ask for a profile
+  without a redeploy; or
+- a staff user (logged in to the admin) adds `?_profile=1` or any
+  `X-Profile` header to a request.
+
+The stats are written to `settings.PROFILE_DIR` as `.pstats` files (open
+them with `python3 -m pstats` or snakeviz) and are listed, with their top
+functions, at `/admin/tools/profiles/`.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+
+
+SALT = 'pugorugh.profiling'
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAMETER = '_profile'
+SUFFIX = '.pstats'
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Tokens
+# ------
+def make_token():
+    """Returns a value for the `X-Profile` header"""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def is_valid_token(value):
+    max_age = getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 60 * 60)
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(value, max_age=max_age)
+    except signing.BadSignature:  # (includes SignatureExpired)
+        return False
+    return True
+
+
+def wants_profile(request):
+    """Returns True if the request should be profiled"""
+    header = request.META.get(HEADER)
+    if header and is_valid_token(header):
+        return True
+    if header or request.GET.get(QUERY_PARAMETER):
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated and user.is_staff)
+    return False
+
+
+# Profiling
+# ---------
+def profile_dir():
+    return getattr(settings, 'PROFILE_DIR', None)
+
+
+def profile(request, get_response):
+    """Calls `get_response(request)` under cProfile, saves the stats and
+    returns the response
+    """
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    response = profiler.runcall(get_response, request)
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    match = getattr(request, 'resolver_match', None)
+    url_name = (match.url_name if match else None) or 'unmatched'
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-"
+        f"{re.sub(r'[^A-Za-z0-9_-]', '_', url_name)}-"
+        f"{request.method}-{duration_ms:.0f}ms-{uuid.uuid4().hex[:6]}"
+        f"{SUFFIX}"
+    )
+
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, name))
+    prune()
+
+    response['X-Profile-Name'] = name
+    return response
+
+
+def prune():
+    """Deletes all but the newest `settings.PROFILE_KEEP` profiles"""
+    keep = getattr(settings, 'PROFILE_KEEP', 100)
+    for name in profile_names()[keep:]:
+        try:
+            os.remove(os.path.join(profile_dir(), name))
+        except OSError:
+            pass
+
+
+# Reading Profiles
+# ----------------
+def profile_names():
+    """Returns the names of the saved profiles, newest first"""
+    directory = profile_dir()
+    if not directory or not os.path.isdir(directory):
+        return []
+    entries = [
+        entry for entry in os.scandir(directory)
+        if entry.name.endswith(SUFFIX)
+    ]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [entry.name for entry in entries]
+
+
+def profile_path(name):
+    """Returns the path of the named profile (or None if there isn't one)"""
+    if os.path.basename(name) != name or not name.endswith(SUFFIX):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.exists(path) else None
+
+
+def _function_label(func):
+    filename, line, function = func
+    if filename.startswith(PROJECT_DIR):
+        filename = 'pugorugh' + filename[len(PROJECT_DIR):]
+    return f'{filename}:{line}({function})'
+
+
+def top_functions(path, limit=10, project_only=False):
+    """Returns a list of (label, calls, total time, cumulative time) for
+    the functions with the highest cumulative time. `project_only` limits
+    the list to this app's code (views, managers, serializers...).
+    """
+    stats = pstats.Stats(path)
+    rows = []
+    for func, (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if project_only and not func[0].startswith(PROJECT_DIR):
+            continue
+        rows.append((_function_label(func), calls, tottime, cumtime))
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows[:limit]
+
+
+def summary(name):
+    """Returns a dict describing a saved profile"""
+    path = profile_path(name)
+    stats = pstats.Stats(path)
+    return {
+        'name': name,
+        'total_time': stats.total_tt,
+        'calls': stats.total_calls,
+        'top': top_functions(path, limit=5, project_only=True),
+    }
+
+
+def report(name, limit=40):
+    """Returns the pstats text report for a saved profile"""
+    output = io.StringIO()
+    stats = pstats.Stats(profile_path(name), stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
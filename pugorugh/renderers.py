@@ -0,0 +1,166 @@
+"""Renderers and parsers for the API (see `REST_FRAMEWORK` in the settings)
+
+Besides JSON (rendered and parsed with orjson, if it is installed), the API
+speaks two compact binary formats for the native clients, if their packages
+are installed:
+
+- MessagePack (`application/msgpack`, `.msgpack`; the `msgpack` package);
+- CBOR (`application/cbor`, `.cbor`; the `cbor2` package).
+
+They are chosen by the `Accept` header or the URL's format suffix, and
+request bodies by their `Content-Type`. Values the formats can't represent
+natively are converted as for JSON (by DRF's `JSONEncoder`).
+"""
+import json
+from collections.abc import Mapping
+
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+def to_builtin(obj):
+    """Converts what the encoders can't represent natively (e.g., lazy
+    strings, decimals) like DRF's `JSONEncoder`
+    """
+    return JSONEncoder().default(obj)
+
+
+class Prerendered(Mapping):
+    """Response data whose JSON rendering is already known (e.g., cached;
+    see dog_json.py): `JSONRenderer` sends `content` as is. It only parses
+    the JSON if it is read as a mapping (e.g., by the browsable API or the
+    tests).
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            loads = json.loads if orjson is None else orjson.loads
+            self._data = loads(self.content)
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """DRF's JSON renderer, which passes `Prerendered` content through"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, Prerendered):
+            # (the content is compact: re-render it if indentation was
+            # asked for)
+            if not self.get_indent(accepted_media_type or '',
+                                   renderer_context or {}):
+                return data.content
+            data = data.data
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """`JSONRenderer` encoding with orjson (if it is installed, and unless
+    indentation is asked for), to the same bytes
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or isinstance(data, Prerendered)
+                or self.get_indent(accepted_media_type or '',
+                                   renderer_context or {})):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        content = orjson.dumps(data, default=to_builtin,
+                               option=(orjson.OPT_NON_STR_KEYS |
+                                       orjson.OPT_PASSTHROUGH_DATETIME))
+        # (like DRF, escape the line separators that are valid in JSON
+        # strings but not in JavaScript ones)
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class FastJSONParser(parsers.JSONParser):
+    """`JSONParser` decoding with orjson (if it is installed)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, Prerendered):
+            data = data.data
+        return msgpack.packb(data, default=to_builtin, use_bin_type=True)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class CBORRenderer(renderers.BaseRenderer):
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, Prerendered):
+            data = data.data
+        return cbor2.dumps(
+            data, default=lambda encoder, obj: encoder.encode(to_builtin(obj))
+        )
+
+
+class CBORParser(parsers.BaseParser):
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except (ValueError, cbor2.CBORDecodeError) as exc:
+            raise ParseError(f"CBOR parse error - {exc}")
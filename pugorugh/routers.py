@@ -0,0 +1,221 @@
+"""Database routing.
+
+`AuthRouter` keeps the auth apps (users, tokens, sessions...) in their own
+'auth' database, if there is one (see `settings.AUTH_DB_APPS`), so that
+logins and registrations don't queue behind swipe writes for SQLite's
+write lock. The dog tables refer to users by id only (their user foreign
+keys have no database constraint; see `signals.py` for the cascade on
+delete).
+
+`ReplicaRouter` sends reads to a read replica (one of the aliases in
+`settings.DATABASE_REPLICAS`) while `ReplicaRoutingMiddleware` (see
+`middleware.py`) has selected one for the current request, and everything
+else to 'default'. The middleware only selects a replica for GET requests
+to the routes in `settings.REPLICA_ROUTES`, and not for clients that wrote
+something (or logged in) in the last `settings.REPLICA_PIN_SECONDS` (so a
+user always reads their own writes, as long as the replicas lag by less
+than that). The pins are kept in the primary database (`ReplicaPin`), so
+that they hold whichever process serves the client's next request.
+
+Each process also remembers the pins it has written or read (in a bounded
+LRU), so that a pinned client's reads don't query the primary for its pin,
+and its writes only refresh the pin once it has less than
+`settings.REPLICA_PIN_SECONDS` left (pins are written `PIN_SLACK` longer
+than that for the purpose).
+"""
+import contextvars
+import hashlib
+import random
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+
+# the chance that a pin also deletes the expired pins
+PRUNE_RATE = 0.01
+# how much longer than REPLICA_PIN_SECONDS a pin lasts (as a fraction of it)
+PIN_SLACK = 0.5
+# the number of pins each process remembers
+PIN_CACHE_SIZE = 10000
+
+_read_alias = contextvars.ContextVar('pugorugh_read_alias', default=None)
+
+# client key -> until, least recently used first
+_pins = OrderedDict()
+_pins_lock = threading.Lock()
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def current_read_alias():
+    """Returns the alias reads are being sent to (None: the default)"""
+    return _read_alias.get()
+
+
+@contextmanager
+def read_from(alias):
+    """Sends reads to `alias` for the duration of the block"""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def choose_replica():
+    """Returns a random replica alias (None if there are no replicas)"""
+    aliases = replicas()
+    return random.choice(aliases) if aliases else None
+
+
+# Read-your-writes Pinning
+# ------------------------
+def client_key(request):
+    """Returns a string identifying the client (by its token or session),
+    or None for anonymous clients
+    """
+    return credential_key(request.META.get('HTTP_AUTHORIZATION') or
+                          request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+
+
+def credential_key(credential):
+    """Returns the client key for an Authorization header value or a
+    session id (None if there is none)
+    """
+    if not credential:
+        return None
+    return hashlib.sha1(credential.encode()).hexdigest()
+
+
+def _remember(client, until):
+    with _pins_lock:
+        _pins[client] = until
+        _pins.move_to_end(client)
+        while len(_pins) > PIN_CACHE_SIZE:
+            _pins.popitem(last=False)
+
+
+def _remembered(client):
+    """Returns the end of the client's pin, as last seen by this process
+    (None if it hasn't seen one)
+    """
+    with _pins_lock:
+        return _pins.get(client)
+
+
+def forget_pins():
+    """Clears this process's memory of the pins (not the pins themselves)"""
+    with _pins_lock:
+        _pins.clear()
+
+
+def pin(client):
+    """Sends the client's reads to the primary for (at least) the next
+    `settings.REPLICA_PIN_SECONDS`
+    """
+    from .models import ReplicaPin
+
+    if not client or not replicas():
+        return
+    now = timezone.now()
+    seconds = settings.REPLICA_PIN_SECONDS
+    until = _remembered(client)
+    if until is not None and until >= now + timedelta(seconds=seconds):
+        return  # (pinned for long enough already)
+    until = now + timedelta(seconds=seconds * (1 + PIN_SLACK))
+    pins = ReplicaPin.objects.using(DEFAULT_DB_ALIAS)
+    pins.update_or_create(client=client, defaults={'until': until})
+    _remember(client, until)
+    if random.random() < PRUNE_RATE:
+        pins.filter(until__lt=now).delete()
+
+
+def is_pinned(request):
+    """Returns whether the client's reads must go to the primary"""
+    from .models import ReplicaPin
+
+    client = client_key(request)
+    if not client:
+        return False
+    now = timezone.now()
+    until = _remembered(client)
+    if until is not None and until > now:
+        return True
+    until = ReplicaPin.objects.using(DEFAULT_DB_ALIAS).filter(
+        client=client, until__gt=now
+    ).values_list('until', flat=True).first()
+    if until is None:
+        return False
+    _remember(client, until)
+    return True
+
+
+class AuthRouter:
+    """Routes the apps in `settings.AUTH_DB_APPS` to the 'auth' database
+    (if it is configured)
+    """
+
+    alias = 'auth'
+
+    def is_split(self):
+        return self.alias in settings.DATABASES
+
+    def routes(self, app_label):
+        return (self.is_split() and
+                app_label in getattr(settings, 'AUTH_DB_APPS', []))
+
+    def db_for_read(self, model, **hints):
+        if self.routes(model._meta.app_label):
+            return self.alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        if self.routes(model._meta.app_label):
+            return self.alias
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # (e.g., UserDog.user: the foreign key has no DB constraint)
+        if (self.routes(obj1._meta.app_label) or
+                self.routes(obj2._meta.app_label)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not self.is_split():
+            return None
+        if app_label in getattr(settings, 'AUTH_DB_APPS', []):
+            return db == self.alias
+        if db == self.alias:
+            return False
+        return None
+
+
+class ReplicaRouter:
+    """Routes reads to the replica selected for the request (if any) and
+    writes to the primary
+    """
+
+    # (both explicit: otherwise Django uses the database of the instance a
+    # query starts from, e.g., a replica for a save, or the 'auth'
+    # database for `user.userpref`)
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are copies of the primary, not migrated themselves
+        return db not in replicas()
@@ -2,7 +2,21 @@ from django.contrib.auth import get_user_model
 
 from rest_framework import serializers
 
+from . import images
+from . import instrumentation
 from . import models
+from . import tracing
+
+
+class TimedDataMixin:
+    """Attributes the time spent rendering `data` to the request's
+    'serializer' timing (see `instrumentation.py`)
+    """
+
+    @property
+    def data(self):
+        with instrumentation.timed('serializer'):
+            return super().data
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -26,7 +40,21 @@ class UserSerializer(serializers.ModelSerializer):
         model = get_user_model()
 
 
-class DogSerializer(serializers.ModelSerializer):
+class DogSerializer(TimedDataMixin, serializers.ModelSerializer):
+    # (versioned, so that clients can cache the image for good; see
+    # images.py)
+    image_url = serializers.SerializerMethodField()
+
+    # (the model fields each method field reads, for sparse fieldsets; see
+    # fastpath.py)
+    method_field_sources = {'image_url': ('image_filename',)}
+
+    def get_image_url(self, dog):
+        return images.url(dog.image_filename)
+
+    @tracing.span('serializers.Dog.to_representation')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
 
     class Meta:
         model = models.Dog
@@ -34,6 +62,7 @@ class DogSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image_filename',
+            'image_url',
             'breed',
             'age',
             'gender',
@@ -59,7 +88,7 @@ class DogSerializer(serializers.ModelSerializer):
 # serializer = serializers.UserPrefSerializer(
 #     data=request_data, context={'user': user}
 # )
-class UserPrefSerializer(serializers.ModelSerializer):
+class UserPrefSerializer(TimedDataMixin, serializers.ModelSerializer):
 
     # Custom Field-Level Validation
     # -----------------------------
@@ -0,0 +1,59 @@
+from django.db.backends.signals import connection_created
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import archive
+from . import db
+from . import deletion
+from . import dog_json
+from . import slow_queries
+from .candidates import bump_catalog_version
+from .models import Dog
+
+
+# Catalog Invalidation
+# --------------------
+# Any change to the set of dogs (or to a dog's age/gender/size) can change
+# which dogs match a preference signature, so invalidate every shared
+# candidate list.
+@receiver(post_save, sender=Dog)
+@receiver(post_delete, sender=Dog)
+def dog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+# Dog JSON
+# --------
+# (a saved dog gets a new row version, so only deletions need this; see
+# dog_json.py)
+@receiver(post_delete, sender=Dog)
+def dog_deleted(sender, instance, **kwargs):
+    dog_json.invalidate(instance)
+
+
+# User Deletion
+# -------------
+# UserDog.user and UserPref.user don't cascade in the database (the users
+# may be in a separate database), so a user's rows are deleted here, in the
+# background (see deletion.py).
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    deletion.delete_user(instance)
+
+
+# Archived Swipes
+# ---------------
+# Bring back the swipes of a returning user (see archive.py)
+@receiver(user_logged_in)
+def user_logged_in_restore(sender, user, **kwargs):
+    archive.restore_user(user.pk)
+
+
+# Connection Setup
+# ----------------
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    db.configure_sqlite(connection)
+    slow_queries.install(connection)
@@ -0,0 +1,368 @@
+"""A log of slow SQL statements.
+
+`SlowQueryLog.__call__` is installed as a database execute wrapper on every
+connection (see `signals.py`). Any statement that takes longer than
+`settings.SLOW_QUERY_THRESHOLD_MS` is recorded in a ring buffer (the last
+`settings.SLOW_QUERY_LOG_SIZE` entries) with:
+
+- its *fingerprint*: the SQL with the literals and parameter lists
+  collapsed, so that the same query from different requests groups
+  together;
+- its call site: the chain of this app's frames that issued it (e.g.,
+  `views.py:201 get_object > candidates.py:98 candidate_ids`);
+- its query plan (`EXPLAIN QUERY PLAN` on SQLite), captured the first time
+  each fingerprint is seen.
+
+Like the metrics (see `metrics.py`), each process periodically writes its
+log to its own JSON file in `settings.SLOW_QUERY_DIR` (named after its pid
+and a random token, so that a process reusing a dead one's pid doesn't
+overwrite its log); the admin page (`/admin/tools/slow-queries/`) and the
+`slow_query_report` management command read the logs of every process,
+after merging those of the processes that are no longer running into a
+single retired log (bounded like a process's).
+"""
+import json
+import logging
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from . import instrumentation, metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_PREFIX = 'slow-queries-'
+RETIRED_NAME = 'retired.json'
+LOCK_NAME = '.lock'
+MAX_SQL_LENGTH = 2000
+MAX_CALL_SITE_FRAMES = 4
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Returns the statement with its literals replaced by `?` and its
+    parameter lists collapsed to `(...)`
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PARAMETER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def call_site():
+    """Returns the (outermost to innermost) chain of this app's frames on
+    the current stack, excluding this module
+    """
+    frames = []
+    for frame in traceback.extract_stack():
+        filename = frame.filename
+        if (not filename.startswith(PROJECT_DIR) or
+                filename == __file__ or
+                os.sep + 'tests' + os.sep in filename):
+            continue
+        relative = os.path.relpath(filename, PROJECT_DIR)
+        frames.append(f'{relative}:{frame.lineno} {frame.name}')
+    return ' > '.join(frames[-MAX_CALL_SITE_FRAMES:]) or None
+
+
+class SlowQueryLog:
+    """The slow queries seen by the current process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._token = secrets.token_hex(4)
+        self._last_flush = time.monotonic()
+        size = getattr(settings, 'SLOW_QUERY_LOG_SIZE', 200)
+        self.entries = deque(maxlen=size)
+        # fingerprint -> plan (bounded, oldest fingerprint evicted first)
+        self.plans = OrderedDict()
+
+    def threshold(self):
+        """Returns the threshold in seconds (None if logging is off)"""
+        threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+        return None if threshold_ms is None else threshold_ms / 1000
+
+    # Execute Wrapper
+    # ---------------
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(self._local, 'explaining', False):
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            threshold = self.threshold()
+            if threshold is not None and duration >= threshold:
+                self.record(sql, params, many, duration, context)
+
+    def record(self, sql, params, many, duration, context):
+        key = fingerprint(sql)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            need_plan = key not in self.plans
+            if need_plan:
+                self.plans[key] = None  # (so only one thread explains it)
+                while len(self.plans) > self.entries.maxlen:
+                    self.plans.popitem(last=False)
+
+        if need_plan:
+            plan = self.explain(context['connection'], sql, params, many)
+            with self._lock:
+                if key in self.plans:
+                    self.plans[key] = plan
+
+        entry = {
+            'ts': time.time(),
+            'duration_ms': round(duration * 1000, 3),
+            'sql': sql[:MAX_SQL_LENGTH],
+            'fingerprint': key,
+            'call_site': call_site(),
+        }
+        with self._lock:
+            self.entries.append(entry)
+        logger.warning("Slow query (%.1f ms) from %s: %s",
+                       entry['duration_ms'], entry['call_site'], key)
+        self.maybe_flush()
+
+    def explain(self, connection, sql, params, many):
+        """Returns the query plan as text (None for statements we don't
+        explain: we never re-run writes)
+        """
+        if many or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+                  else 'EXPLAIN ')
+        self._local.explaining = True
+        try:
+            # (not one of the request's queries; see instrumentation.py)
+            with instrumentation.uncounted(), connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+        except DatabaseError as error:
+            return f'(EXPLAIN failed: {error})'
+        finally:
+            self._local.explaining = False
+        return '\n'.join(
+            ' | '.join(str(column) for column in row) for row in rows
+        )
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'entries': list(self.entries),
+                'plans': dict(self.plans),
+            }
+
+    # Persistence
+    # -----------
+    def path(self):
+        directory = getattr(settings, 'SLOW_QUERY_DIR', None)
+        if not directory:
+            return None
+        return os.path.join(
+            directory, f'{SNAPSHOT_PREFIX}{self._pid}-{self._token}.json'
+        )
+
+    def maybe_flush(self):
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def flush(self):
+        """Writes this process's log to disk"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+        path = self.path()
+        self._last_flush = time.monotonic()
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write(path, self.snapshot())
+        except OSError:
+            logger.exception("Could not write the slow query log to %s",
+                             path)
+
+
+log = SlowQueryLog()
+
+
+def install(connection):
+    """Adds the slow query log to a connection's execute wrappers.
+
+    It goes first in the list (i.e., outermost) because
+    `connection.execute_wrapper()` removes the *last* wrapper on exit, and
+    connections are often opened inside such a block.
+    """
+    if log not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, log)
+
+
+# Reporting
+# ---------
+def _read(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):  # e.g., deleted mid-scan
+        return None
+
+
+def _write(path, data):
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def _snapshot_pid(name):
+    """Returns the pid in a log's file name (None if it isn't one)"""
+    if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith('.json')):
+        return None
+    try:
+        return int(name[len(SNAPSHOT_PREFIX):-len('.json')].split('-')[0])
+    except ValueError:
+        return None
+
+
+def _merge(snapshots, size=None):
+    """Returns the entries of the snapshots (newest first, the newest
+    `size` if given) and the query plans by fingerprint
+    """
+    entries = []
+    plans = {}
+    for snapshot in snapshots:
+        entries.extend(snapshot['entries'])
+        for key, plan in snapshot['plans'].items():
+            if plan is not None or key not in plans:
+                plans[key] = plan
+    entries.sort(key=lambda entry: entry['ts'], reverse=True)
+    if size is not None:
+        del entries[size:]
+        fingerprints = {entry['fingerprint'] for entry in entries}
+        plans = {key: plan for key, plan in plans.items()
+                 if key in fingerprints}
+    return entries, plans
+
+
+def retire(directory):
+    """Merges the logs of the processes that are no longer running into
+    the retired log (keeping the newest `SLOW_QUERY_LOG_SIZE` entries), and
+    deletes them (call with `SLOW_QUERY_DIR`'s lock held).
+
+    Like the retired metrics, the retired log records the names of the logs
+    merged into it, so that no log is merged twice.
+    """
+    retired_path = os.path.join(directory, RETIRED_NAME)
+    retired = _read(retired_path) or {
+        'entries': [], 'plans': {}, 'merged': [],
+    }
+    dead = [name for name in os.listdir(directory)
+            if _snapshot_pid(name) is not None and
+            not metrics.pid_alive(_snapshot_pid(name))]
+    new = [name for name in dead if name not in retired['merged']]
+    if new:
+        snapshots = [retired]
+        for name in new:
+            snapshot = _read(os.path.join(directory, name))
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        size = getattr(settings, 'SLOW_QUERY_LOG_SIZE', 200)
+        entries, plans = _merge(snapshots, size)
+        _write(retired_path, {
+            'entries': entries,
+            'plans': plans,
+            # (only the names still in the directory need remembering)
+            'merged': sorted(dead),
+        })
+    for name in dead:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def collect():
+    """Returns the slow queries logged by every process (newest first) and
+    the query plans by fingerprint
+    """
+    log.flush()
+
+    snapshots = []
+    directory = getattr(settings, 'SLOW_QUERY_DIR', None)
+    if directory and os.path.isdir(directory):
+        # (locked, so that no log is read both in the retired log and on
+        # its own, or in neither)
+        with metrics.locked(os.path.join(directory, LOCK_NAME)):
+            try:
+                retire(directory)
+            except OSError:
+                logger.exception("Could not retire the slow query logs in %s",
+                                 directory)
+            for entry in os.scandir(directory):
+                if (entry.name == RETIRED_NAME or
+                        _snapshot_pid(entry.name) is not None):
+                    snapshot = _read(entry.path)
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+    else:
+        snapshots.append(log.snapshot())
+
+    return _merge(snapshots)
+
+
+def summarize(entries, plans):
+    """Groups slow query entries by fingerprint and returns a list of dicts
+    (fingerprint, count, total/mean/max duration, call sites, plan), most
+    total time first
+    """
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'call_sites': set(),
+            'example': entry['sql'],
+            'plan': plans.get(entry['fingerprint']),
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        if entry['call_site']:
+            group['call_sites'].add(entry['call_site'])
+
+    summary = []
+    for group in groups.values():
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['call_sites'] = sorted(group['call_sites'])
+        summary.append(group)
+    summary.sort(key=lambda group: group['total_ms'], reverse=True)
+    return summary
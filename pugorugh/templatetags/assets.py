@@ -0,0 +1,31 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from pugorugh import assets
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset(name):
+    """Returns the URL of the fingerprinted asset (or, until the assets are
+    built, of the static file)
+    """
+    return assets.url(name) or static(name)
+
+
+@register.simple_tag
+def bundle(name):
+    """Returns the <script> tag of the bundle (or, until the assets are
+    built, the tags of its source files)
+    """
+    url = assets.url(name)
+    if url is not None:
+        return format_html('<script src="{}"></script>', url)
+    return format_html_join(
+        '\n', '<script src="{}"></script>',
+        ((static(source),) for source in settings.ASSET_BUNDLES[name])
+    )
@@ -73,10 +73,19 @@ TEMP_DIRECTORY = tempfile.TemporaryDirectory()
 TEST_DIRECTORY = os.path.join(TEMP_DIRECTORY.name, 'images', 'dogs')
 if not os.path.exists(TEST_DIRECTORY):
     os.makedirs(TEST_DIRECTORY)
+TEST_METRICS_DIRECTORY = os.path.join(TEMP_DIRECTORY.name, 'metrics')
+TEST_PROFILE_DIRECTORY = os.path.join(TEMP_DIRECTORY.name, 'profiles')
+TEST_SLOW_QUERY_DIRECTORY = os.path.join(TEMP_DIRECTORY.name, 'slow-queries')
 
 
-@override_settings(DOG_UPLOAD_DIR=TEST_DIRECTORY)
+@override_settings(DOG_UPLOAD_DIR=TEST_DIRECTORY,
+                   METRICS_DIR=TEST_METRICS_DIRECTORY,
+                   PROFILE_DIR=TEST_PROFILE_DIRECTORY,
+                   SLOW_QUERY_DIR=TEST_SLOW_QUERY_DIRECTORY,
+                   JOBS_EAGER=True)
 class PugOrUghTestCase(TestCase):
+    # (the users may be in a separate 'auth' database; see routers.py)
+    databases = '__all__'
 
     # Helper Methods
     # --------------
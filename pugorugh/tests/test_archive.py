@@ -0,0 +1,113 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from pugorugh import archive
+from pugorugh.models import ArchivedSwipes, Dog, UserDog
+from .base import VALID_DOG_DATA, VALID_STATUS_LIST
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+User = get_user_model()
+
+
+class PackingTests(SimpleTestCase):
+
+    # Tests
+    # -----
+    def test_unpack_reverses_pack(self):
+        rows = [(7, 'l', False, True), (3, 'd', True, False)]
+
+        self.assertEqual(archive.unpack(archive.pack(rows)), sorted(rows))
+
+
+class ArchiveTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.create_some_userdogs(self.user, VALID_STATUS_LIST)
+        self.swipes = self.stored_swipes()
+        self.make_inactive()
+
+    # Helper Methods
+    # --------------
+    def stored_swipes(self):
+        return sorted(UserDog.objects.for_user(self.user).values_list(
+            'dog_id', 'status'
+        ))
+
+    def make_inactive(self):
+        last_login = timezone.now() - timedelta(days=400)
+        User.objects.filter(pk=self.user.pk).update(last_login=last_login)
+
+    # Tests
+    # -----
+    def test_command_archives_inactive_users_only(self):
+        active_user = User.objects.exclude(pk=self.user.pk).get()
+        User.objects.filter(pk=active_user.pk).update(
+            last_login=timezone.now()
+        )
+        UserDog.objects.create(user=active_user, dog=Dog.objects.first(),
+                               status='l')
+
+        call_command('archive_inactive_users', stdout=StringIO())
+
+        self.assertEqual(self.stored_swipes(), [])
+        archived = ArchivedSwipes.objects.get(user=self.user)
+        self.assertEqual(archived.count, len(self.swipes))
+        self.assertTrue(UserDog.objects.for_user(active_user).exists())
+
+    def test_dry_run_changes_nothing(self):
+        call_command('archive_inactive_users', dry_run=True,
+                     stdout=StringIO())
+
+        self.assertEqual(self.stored_swipes(), self.swipes)
+
+    def test_archiving_again_merges_with_the_archive(self):
+        archive.archive_user(self.user.pk)
+        UserDog.objects.create(user=self.user, dog=Dog.objects.first(),
+                               status='d')
+
+        archive.archive_user(self.user.pk)
+
+        archived = ArchivedSwipes.objects.get(user=self.user)
+        self.assertEqual(archived.count, len(self.swipes))
+        self.assertIn((Dog.objects.first().pk, 'd', False, False),
+                      archive.unpack(archived.data))
+
+    def test_login_restores_swipes(self):
+        archive.archive_user(self.user.pk)
+
+        self.get_token(username='some_test_user',
+                       password='some_test_password')
+
+        self.assertEqual(self.stored_swipes(), self.swipes)
+        self.assertFalse(ArchivedSwipes.objects.exists())
+
+    def test_token_authentication_restores_swipes(self):
+        archive.archive_user(self.user.pk)
+
+        response = self.authenticate_user().get('/api/dog/random/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_swipes(), self.swipes)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login,
+                           timezone.now() - timedelta(minutes=1))
+
+    def test_swipes_for_deleted_dogs_are_not_restored(self):
+        archive.archive_user(self.user.pk)
+        deleted_pk = self.swipes[0][0]
+        Dog.objects.filter(pk=deleted_pk).delete()
+
+        archive.restore_user(self.user.pk)
+
+        self.assertEqual(self.stored_swipes(), self.swipes[1:])
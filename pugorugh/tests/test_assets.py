@@ -0,0 +1,107 @@
+import gzip
+import os
+import tempfile
+import unittest
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from pugorugh import assets
+
+
+class AssetTests(TestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.assets_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(ASSETS_DIR=self.assets_dir.name)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.assets_dir.cleanup()
+
+    def build(self):
+        call_command('build_assets', stdout=StringIO())
+        return assets.url('js/pugorugh.js')
+
+    # Tests
+    # -----
+    def test_index_refers_to_source_files_until_built(self):
+        response = self.client.get(reverse('index'))
+
+        self.assertContains(response, '/static/js/dog.js')
+        self.assertContains(response, '/static/css/global.css')
+
+    def test_index_refers_to_fingerprinted_bundle_once_built(self):
+        url = self.build()
+
+        response = self.client.get(reverse('index'))
+
+        self.assertRegex(url, r'^/assets/js/pugorugh\.[0-9a-f]{12}\.js$')
+        self.assertContains(response, url)
+        self.assertNotContains(response, '/static/js/dog.js')
+        self.assertNotContains(response, '/static/css/')
+
+    def test_fingerprint_changes_with_content(self):
+        self.assertNotEqual(assets.fingerprint('a.js', b'1'),
+                            assets.fingerprint('a.js', b'2'))
+
+    def test_gzip_variant_is_served_with_far_future_caching(self):
+        url = self.build()
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(b'React.createClass',
+                      gzip.decompress(b''.join(response.streaming_content)))
+
+    @unittest.skipIf(assets.brotli is None, "brotli isn't installed")
+    def test_brotli_variant_is_preferred(self):
+        url = self.build()
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn(b'React.createClass', assets.brotli.decompress(
+            b''.join(response.streaming_content)
+        ))
+
+    def test_original_is_served_without_accepted_encoding(self):
+        url = self.build()
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+
+    def test_earlier_builds_are_still_served(self):
+        old_name = assets.fingerprint('js/pugorugh.js', b'old build')
+        assets.write(os.path.join(self.assets_dir.name, old_name), b'old')
+        self.build()
+
+        response = self.client.get(reverse('asset', args=[old_name]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'old')
+
+    def test_only_built_assets_are_served(self):
+        self.build()
+        outside = assets.fingerprint('../settings.py', b'')
+        outside_path = os.path.normpath(
+            os.path.join(self.assets_dir.name, outside)
+        )
+        assets.write(outside_path, b'')
+        self.addCleanup(os.remove, outside_path)
+
+        for name in ['manifest.json', '../settings.py', 'js/pugorugh.js',
+                     outside, assets.fingerprint('js/missing.js', b'')]:
+            with self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get(reverse('asset', args=[name]))
+            self.assertEqual(response.status_code, 404)
+        self.assertTrue(os.path.isfile(assets.manifest_path()))
@@ -0,0 +1,29 @@
+import unittest
+
+from pugorugh.benchmarks import percentile, summarize
+
+
+class PercentileTests(unittest.TestCase):
+
+    def test_percentile_uses_nearest_rank(self):
+        samples = list(range(1, 101))
+
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile(samples, 100), 100)
+
+    def test_percentile_of_no_samples_is_none(self):
+        self.assertIsNone(percentile([], 50))
+
+
+class SummarizeTests(unittest.TestCase):
+
+    def test_summarize_reports_throughput_and_latency_in_ms(self):
+        summary = summarize([0.002, 0.001, 0.003, 0.004], elapsed=0.5,
+                            errors=1)
+
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['throughput_rps'], 8)
+        self.assertEqual(summary['p50_ms'], 2)
+        self.assertEqual(summary['max_ms'], 4)
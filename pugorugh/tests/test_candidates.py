@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from pugorugh import candidates
+from pugorugh.models import Dog, UserDog, UserPref
+
+from .base import (VALID_USER_DATA, VALID_DOG_DATA, VALID_STATUS_LIST,
+                   PugOrUghTestCase)
+
+
+User = get_user_model()
+
+
+class PrefSignatureTests(PugOrUghTestCase):
+
+    def test_signature_ignores_preference_order(self):
+        first = UserPref(age='y,b', gender='f,m', size='xl,s')
+        second = UserPref(age='b,y', gender='m,f', size='s,xl')
+
+        self.assertEqual(
+            candidates.pref_signature(first),
+            candidates.pref_signature(second)
+        )
+
+    def test_signature_distinguishes_different_preferences(self):
+        first = UserPref(age='b', gender='f', size='s')
+        second = UserPref(age='b', gender='m', size='s')
+
+        self.assertNotEqual(
+            candidates.pref_signature(first),
+            candidates.pref_signature(second)
+        )
+
+
+class CandidateListTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.user = User.objects.create(**VALID_USER_DATA)
+        self.create_valid_userprefs(
+            self.user, age='y,a,s', gender='m,f', size='s,l'
+        )
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.create_some_userdogs(self.user, VALID_STATUS_LIST)
+
+    # Tests
+    # -----
+    def test_candidate_ids_match_with_prefs(self):
+        expected_ids = list(
+            Dog.objects.with_prefs(self.user).values_list('pk', flat=True)
+        )
+
+        self.assertEqual(list(candidates.candidate_ids(self.user)),
+                         expected_ids)
+
+    def test_candidate_ids_shared_between_users_with_same_prefs(self):
+        candidates.candidate_ids(self.user)  # warm the cache
+
+        other_user = User.objects.create(username='other_user')
+        self.create_valid_userprefs(
+            other_user, age='s,a,y', gender='f,m', size='l,s'
+        )
+
+        # the candidate list comes straight from the cache (after reading
+        # the catalog version)
+        with self.assertNumQueries(1):
+            ids = candidates.candidate_ids(other_user)
+
+        self.assertEqual(ids, candidates.candidate_ids(self.user))
+
+    def test_saving_a_dog_invalidates_candidate_ids(self):
+        before = candidates.candidate_ids(self.user)
+
+        dog = self.create_valid_dog(**VALID_DOG_DATA[0])
+
+        self.assertEqual(
+            list(candidates.candidate_ids(self.user)),
+            list(before) + [dog.pk]
+        )
+
+    def test_updating_dogs_invalidates_candidate_ids(self):
+        candidates.candidate_ids(self.user)
+
+        Dog.objects.update(size='xl')
+
+        self.assertEqual(list(candidates.candidate_ids(self.user)), [])
+
+    def test_catalog_version_is_never_reused(self):
+        before = candidates.catalog_version()
+
+        candidates.bump_catalog_version()
+
+        self.assertGreater(candidates.catalog_version(), before)
+
+    def test_next_undecided_id_skips_rated_dogs_and_wraps_around(self):
+        rated = set(
+            UserDog.objects.for_user(self.user).values_list('dog_id',
+                                                            flat=True)
+        )
+        expected_ids = [
+            pk for pk in candidates.candidate_ids(self.user)
+            if pk not in rated
+        ]
+
+        # (also one candidate per page, so every page is a query, and
+        # with no pages, so that the anti-join query finds them)
+        for page_size, max_pages in [(candidates.CANDIDATES_PAGE_SIZE, 3),
+                                     (1, 10 ** 6), (1, 0)]:
+            with mock.patch.object(candidates, 'CANDIDATES_PAGE_SIZE',
+                                   page_size), \
+                    mock.patch.object(candidates, 'CANDIDATES_MAX_PAGES',
+                                      max_pages):
+                self.assertEqual(
+                    candidates.next_undecided_id(self.user),
+                    expected_ids[0]
+                )
+                self.assertEqual(
+                    candidates.next_undecided_id(self.user,
+                                                 expected_ids[-1]),
+                    expected_ids[0]
+                )
+
+    def test_next_undecided_id_queries_are_bounded(self):
+        candidates.candidate_ids(self.user)  # (cached)
+
+        with mock.patch.object(candidates, 'CANDIDATES_PAGE_SIZE', 1), \
+                mock.patch.object(candidates, 'CANDIDATES_MAX_PAGES', 2):
+            for dog_id in candidates.candidate_ids(self.user):
+                with CaptureQueriesContext(connection) as queries:
+                    candidates.next_undecided_id(self.user, dog_id)
+                # the catalog version, the pages, then the anti-join (and
+                # its wraparound)
+                self.assertLessEqual(len(queries), 1 + 2 + 2)
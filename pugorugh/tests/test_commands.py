@@ -0,0 +1,218 @@
+import json
+import os
+import tempfile
+import time
+from io import StringIO
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from pugorugh.management.commands import collect_orphan_images
+from pugorugh.models import Dog, UserDog, UserPref
+
+from .base import TEST_DIRECTORY, VALID_DOG_DATA, PugOrUghTestCase
+
+
+User = get_user_model()
+
+
+class GenerateDatasetCommandTests(PugOrUghTestCase):
+
+    def test_command_creates_requested_dogs_users_and_prefs(self):
+        call_command('generate_dataset', dogs=30, users=5, userdogs=50,
+                     batch_size=7, stdout=StringIO())
+
+        self.assertEqual(Dog.objects.count(), 30)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(UserPref.objects.count(), 5)
+        self.assertGreater(UserDog.objects.count(), 0)
+
+
+class BenchmarkCommandTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        call_command('generate_dataset', dogs=10, users=2, userdogs=5,
+                     stdout=StringIO())
+        self.output_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+
+    # Tests
+    # -----
+    def test_command_writes_json_report_for_each_route(self):
+        output = os.path.join(self.output_dir.name, 'report.json')
+
+        # (WSGI mode closes the connection at the end of each request,
+        # which would end the test case's transaction)
+        call_command('benchmark', requests=3, warmup=0, mode='client',
+                     output=output)
+
+        with open(output, 'r') as file:
+            report = json.load(file)
+
+        self.assertEqual(report['meta']['dogs'], 10)
+        for route in ['next-dog', 'set-status', 'random-dog',
+                      'needs-love-dog', 'set-preferences']:
+            self.assertEqual(report['results'][route]['client']['requests'],
+                             3)
+            self.assertEqual(report['results'][route]['client']['errors'],
+                             0)
+
+
+class ReplayTrafficCommandTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        call_command('generate_dataset', dogs=10, users=1, userdogs=0,
+                     stdout=StringIO())
+        user = User.objects.get()
+        dog = Dog.objects.first()
+        self.records = [
+            {'ts': 100.0, 'method': 'POST', 'path': '/api/user/login/',
+             'route': 'login-user', 'body': {'username': 'x'},
+             'user_id': None},
+            {'ts': 100.5, 'method': 'PUT', 'path': f'/api/dog/{dog.pk}/liked/',
+             'route': 'set-status', 'body': None, 'user_id': user.pk},
+            {'ts': 101.0, 'method': 'GET', 'path': '/api/dog/random/',
+             'route': 'random-dog', 'body': None, 'user_id': user.pk},
+        ]
+        self.capture_dir = tempfile.TemporaryDirectory()
+        self.capture_file = os.path.join(self.capture_dir.name,
+                                         'traffic.jsonl')
+        with open(self.capture_file, 'w') as file:
+            for record in self.records:
+                file.write(json.dumps(record) + '\n')
+
+    def tearDown(self):
+        self.capture_dir.cleanup()
+
+    # Tests
+    # -----
+    def test_command_replays_captured_requests_and_reports_latency(self):
+        output = os.path.join(self.capture_dir.name, 'report.json')
+
+        call_command('replay_traffic', self.capture_file, client=True,
+                     concurrency=1, speedup=0, output=output)
+
+        with open(output, 'r') as file:
+            results = json.load(file)['results']
+
+        # the login can't be replayed without its password
+        self.assertEqual(results['all']['requests'], 2)
+        self.assertEqual(results['all']['errors'], 0)
+        self.assertEqual(results['set-status']['requests'], 1)
+        self.assertTrue(
+            UserDog.objects.filter(status='l', dog=Dog.objects.first())
+        )
+
+
+class BenchmarkSerializationCommandTests(PugOrUghTestCase):
+
+    def test_command_reports_each_case(self):
+        self.create_some_dogs(VALID_DOG_DATA)
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = os.path.join(output_dir, 'report.json')
+            call_command('benchmark_serialization', calls=5, warmup=0,
+                         lists=2, encodes=2, output=output)
+            with open(output, 'r') as file:
+                report = json.load(file)
+
+        self.assertEqual(report['meta']['dogs'], len(VALID_DOG_DATA))
+        for case in ['serializer', 'cached']:
+            self.assertEqual(report['results']['dog'][case]['requests'], 5)
+        for case in ['list-serializer', 'list-fastpath']:
+            self.assertGreater(
+                report['results']['dog-list'][case]['peak_kib'], 0
+            )
+        self.assertEqual(report['results']['encode-batch']['json']['bytes'],
+                         report['results']['encode-batch']['fast-json']
+                         ['bytes'])
+
+
+class CollectOrphanImagesCommandTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.paths = []
+        for name in ['test_image_01.jpg', 'orphan.jpg', 'new_upload.jpg']:
+            path = os.path.join(TEST_DIRECTORY, name)
+            with open(path, 'wb') as file:
+                file.write(b'image')
+            self.paths.append(path)
+        # (only the new upload is within the grace period)
+        an_hour_ago = time.time() - 2 * 60 * 60
+        for path in self.paths[:2]:
+            os.utime(path, (an_hour_ago, an_hour_ago))
+
+    def tearDown(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Tests
+    # -----
+    def test_command_deletes_old_unreferenced_images(self):
+        call_command('collect_orphan_images', chunk_size=1, workers=2,
+                     stdout=StringIO())
+
+        self.assertEqual([os.path.exists(path) for path in self.paths],
+                         [True, False, True])
+
+    def test_each_chunk_is_deleted_before_the_next_is_scanned(self):
+        events = []
+        scan = collect_orphan_images.scan
+
+        def recording_scan(*args):
+            for chunk in scan(*args):
+                events.append('scan')
+                yield chunk
+
+        def recording_delete(command, directory, name):
+            events.append('delete')
+            return True
+
+        for name in ['orphan_2.jpg', 'orphan_3.jpg']:
+            path = os.path.join(TEST_DIRECTORY, name)
+            with open(path, 'wb') as file:
+                file.write(b'image')
+            os.utime(path, (0, 0))
+            self.paths.append(path)
+
+        with mock.patch.object(collect_orphan_images, 'scan',
+                               recording_scan), \
+                mock.patch.object(collect_orphan_images.Command, 'delete',
+                                  recording_delete):
+            call_command('collect_orphan_images', chunk_size=1, workers=2,
+                         stdout=StringIO())
+
+        self.assertEqual(events.count('delete'), 3)
+        # (each orphan is deleted before the next file is read)
+        self.assertTrue(all(events[i - 1] == 'scan'
+                            for i, event in enumerate(events)
+                            if event == 'delete'))
+
+    def test_dry_run_deletes_nothing(self):
+        output = StringIO()
+
+        call_command('collect_orphan_images', dry_run=True, stdout=output)
+
+        self.assertIn("Would delete orphan.jpg", output.getvalue())
+        self.assertTrue(all(os.path.exists(path) for path in self.paths))
+
+    def test_command_reports_missing_images(self):
+        output = StringIO()
+
+        call_command('collect_orphan_images', dry_run=True, missing=True,
+                     stdout=output)
+
+        self.assertNotIn("'test_image_01.jpg' is missing", output.getvalue())
+        self.assertIn("'test_image_02.jpg' is missing", output.getvalue())
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from pugorugh import db
+
+
+class SQLiteTuningTests(TestCase):
+
+    # Tests
+    # -----
+    def test_new_connections_get_pragmas(self):
+        values = {}
+        with connection.cursor() as cursor:
+            for name in ['synchronous', 'busy_timeout', 'temp_store']:
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+
+        self.assertEqual(values, {
+            'synchronous': 1,  # NORMAL
+            'busy_timeout': 5000,
+            'temp_store': 2,  # MEMORY
+        })
+
+    def test_optimize_db_command(self):
+        output = StringIO()
+
+        call_command('optimize_db', analyze=True, stdout=output)
+
+        self.assertIn('ANALYZE', output.getvalue())
+        self.assertIn('PRAGMA optimize', output.getvalue())
+        self.assertIn('journal_mode=', output.getvalue())
+
+    def test_object_sizes_include_the_tables_indexes(self):
+        sizes = db.object_sizes(connection, 'pugorugh_userdog')
+
+        self.assertIn('pugorugh_userdog', sizes)
+        self.assertTrue(any('dog_id' in name for name in sizes))
+
+
+class SQLiteTransactionModeTests(TransactionTestCase):
+
+    # Helpers
+    # -------
+    def begin_statements(self):
+        # (as on a new connection; the test database stays open)
+        connection.ensure_connection()
+        db.configure_sqlite(connection)
+        self.addCleanup(db.configure_sqlite, connection)
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                with transaction.atomic():  # (a savepoint)
+                    pass
+        return [query['sql'] for query in queries
+                if query['sql'].startswith('BEGIN')]
+
+    # Tests
+    # -----
+    def test_transactions_begin_immediate(self):
+        self.assertEqual(self.begin_statements(), ['BEGIN IMMEDIATE'])
+
+    @override_settings(SQLITE_TRANSACTION_MODE=None)
+    def test_transactions_can_begin_deferred(self):
+        self.assertEqual(self.begin_statements(), ['BEGIN DEFERRED'])
+
+    def test_replicas_begin_deferred(self):
+        with override_settings(DATABASE_REPLICAS=['default']):
+            self.assertEqual(self.begin_statements(), ['BEGIN DEFERRED'])
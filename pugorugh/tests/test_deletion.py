@@ -0,0 +1,121 @@
+import os
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from pugorugh import deletion
+from pugorugh.models import DeletionTask, Dog, UserDog, UserPref
+from .base import (TEST_DIRECTORY, VALID_DOG_DATA, VALID_STATUS_LIST,
+                   PugOrUghTestCase)
+
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=False, DELETION_BATCH_SIZE=2,
+                   DELETION_BATCH_PAUSE=0)
+class DeletionTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.dog = Dog.objects.first()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', password='pw')
+            for i in range(5)
+        ]
+        for user in self.users:
+            self.create_some_userdogs(user, VALID_STATUS_LIST)
+
+        self.image_path = os.path.join(TEST_DIRECTORY,
+                                       self.dog.image_filename)
+        with open(self.image_path, 'wb') as file:
+            file.write(b'image')
+
+    def tearDown(self):
+        if os.path.exists(self.image_path):
+            os.remove(self.image_path)
+
+    # Tests
+    # -----
+    def test_deleted_dog_is_hidden_at_once(self):
+        task = deletion.delete_dog(self.dog)
+
+        self.assertEqual(task.status, DeletionTask.PENDING)
+        self.assertEqual(task.total, len(self.users))
+        self.assertFalse(Dog.objects.filter(pk=self.dog.pk).exists())
+        self.assertNotIn(
+            self.dog, Dog.objects.with_status(self.users[0], 'l')
+        )
+        self.assertTrue(Dog.all_objects.filter(pk=self.dog.pk).exists())
+
+    def test_task_deletes_userdogs_image_and_dog(self):
+        task = deletion.delete_dog(self.dog)
+
+        deletion.run(task)
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, DeletionTask.DONE)
+        self.assertEqual(task.deleted, len(self.users))
+        self.assertEqual(task.progress, 100)
+        self.assertFalse(UserDog.objects.filter(dog_id=self.dog.pk).exists())
+        self.assertFalse(Dog.all_objects.filter(pk=self.dog.pk).exists())
+        self.assertFalse(os.path.exists(self.image_path))
+
+    def test_shared_image_is_kept(self):
+        Dog.objects.create(**dict(VALID_DOG_DATA[0], name='twin'))
+        task = deletion.delete_dog(self.dog)
+
+        deletion.run(task)
+
+        self.assertTrue(os.path.exists(self.image_path))
+
+    def test_resume_command_runs_unfinished_tasks(self):
+        deletion.delete_dog(self.dog)
+
+        call_command('resume_deletions', stdout=StringIO())
+
+        self.assertFalse(Dog.all_objects.filter(pk=self.dog.pk).exists())
+
+    def test_deleted_users_rows_are_deleted(self):
+        user = self.users[0]
+        user.delete()
+
+        task = DeletionTask.objects.get(kind=DeletionTask.USER)
+        self.assertEqual(task.total, 4)
+        deletion.run(task)
+
+        self.assertFalse(UserDog.objects.for_user(task.object_id).exists())
+        self.assertFalse(
+            UserPref.objects.filter(user_id=task.object_id).exists()
+        )
+        self.assertTrue(UserDog.objects.for_user(self.users[1]).exists())
+
+    def test_task_for_an_existing_user_fails(self):
+        task = DeletionTask.objects.create(kind=DeletionTask.USER,
+                                           object_id=self.users[0].pk)
+
+        with self.assertLogs('pugorugh.deletion', 'ERROR'):
+            deletion.run(task)
+
+        self.assertEqual(task.status, DeletionTask.FAILED)
+        self.assertTrue(UserDog.objects.for_user(self.users[0]).exists())
+
+    def test_admin_deletes_in_the_background(self):
+        admin_user = User.objects.create_superuser('admin', '', 'pw')
+        self.client.force_login(admin_user)
+
+        response = self.client.post(
+            reverse('admin:pugorugh_dog_delete', args=[self.dog.pk]),
+            {'post': 'yes'}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Dog.objects.filter(pk=self.dog.pk).exists())
+        self.assertTrue(
+            DeletionTask.objects.filter(object_id=self.dog.pk).exists()
+        )
@@ -0,0 +1,86 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+
+from pugorugh import dog_json
+from pugorugh.models import Dog
+from pugorugh.serializers import DogSerializer
+from .base import VALID_DOG_DATA, VALID_STATUS_LIST, PugOrUghTestCase
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+class DogJSONTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.dog = Dog.objects.create(**VALID_DOG_DATA[0])
+
+    # Tests
+    # -----
+    def test_cached_json_matches_the_serializer(self):
+        content = dog_json.get(self.dog).content
+
+        self.assertEqual(json.loads(content), DogSerializer(self.dog).data)
+
+    def test_serializer_only_runs_once(self):
+        with mock.patch('pugorugh.dog_json.render',
+                        wraps=dog_json.render) as render:
+            dog_json.get(self.dog)
+            dog_json.get(Dog.objects.get(pk=self.dog.pk))
+
+        self.assertEqual(render.call_count, 1)
+
+    def test_saved_dog_gets_new_json(self):
+        dog_json.get(self.dog)
+        version = self.dog.row_version
+
+        self.dog.name = 'renamed'
+        self.dog.save()
+
+        self.assertGreater(self.dog.row_version, version)
+        self.assertEqual(dog_json.get(self.dog)['name'], 'renamed')
+
+    def test_updated_dog_gets_new_json(self):
+        dog_json.get(self.dog)
+
+        Dog.objects.filter(pk=self.dog.pk).update(name='renamed')
+        dog = Dog.objects.get(pk=self.dog.pk)
+
+        self.assertGreater(dog.row_version, self.dog.row_version)
+        self.assertEqual(dog_json.get(dog)['name'], 'renamed')
+
+    def test_deleted_dog_is_dropped_from_the_cache(self):
+        dog_json.get(self.dog)
+        dog_key = dog_json.key(self.dog)
+
+        self.dog.delete()
+
+        self.assertIsNone(cache.get(dog_key))
+
+
+class CachedDogViewTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.create_some_userdogs(self.user, VALID_STATUS_LIST)
+        self.client = self.authenticate_user()
+
+    # Tests
+    # -----
+    def test_view_sends_the_cached_json(self):
+        response = self.client.get('/api/dog/-1/liked/next/')
+
+        dog = Dog.objects.get(pk=response.data['id'])
+        self.assertEqual(response.content, dog_json.get(dog).content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_indented_json_is_rendered_again(self):
+        response = self.client.get('/api/dog/-1/liked/next/',
+                                   HTTP_ACCEPT='application/json; indent=2')
+
+        self.assertIn(b'\n  "id"', response.content)
@@ -0,0 +1,147 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import serializers
+
+from pugorugh import fastpath
+from pugorugh.models import Dog
+from pugorugh.serializers import DogSerializer
+from .base import VALID_DOG_DATA, PugOrUghTestCase
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+class FieldMapperTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.create_some_dogs(VALID_DOG_DATA)
+
+    # Tests
+    # -----
+    def test_dicts_match_the_serializer(self):
+        dogs = Dog.objects.all()
+
+        self.assertEqual(fastpath.dogs(dogs),
+                         DogSerializer(dogs, many=True).data)
+        self.assertEqual(list(fastpath.dogs(dogs)[0]),
+                         list(DogSerializer(dogs[0]).data))
+
+    def test_unsupported_fields_are_refused(self):
+        class NestedSerializer(serializers.ModelSerializer):
+            userdog_set = serializers.PrimaryKeyRelatedField(many=True,
+                                                             read_only=True)
+
+            class Meta:
+                model = Dog
+                fields = ('id', 'userdog_set')
+
+        with self.assertRaises(ImproperlyConfigured):
+            fastpath.FieldMapper(NestedSerializer)
+
+    def test_sparse_fieldset_only_fetches_its_columns(self):
+        mapper = fastpath.FieldMapper(DogSerializer, ('name', 'image_url'))
+        dogs = Dog.objects.all()
+
+        self.assertEqual(mapper.columns, ('name', 'image_filename'))
+        self.assertEqual(
+            mapper.to_dicts(dogs),
+            [{'name': dog['name'], 'image_url': dog['image_url']}
+             for dog in DogSerializer(dogs, many=True).data]
+        )
+
+    def test_dog_fields_are_validated(self):
+        self.assertEqual(fastpath.dog_fields('name, id,name'), ('id', 'name'))
+        for names in ['', 'id,owner']:
+            with self.assertRaises(ValueError):
+                fastpath.dog_fields(names)
+
+    def test_export_is_one_json_array(self):
+        content = b''.join(fastpath.export_json(Dog.objects.all(),
+                                                chunk_size=4))
+
+        self.assertEqual(json.loads(content),
+                         fastpath.dogs(Dog.objects.all()))
+
+
+class ManyDogsViewTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+        self.ids = list(Dog.objects.values_list('pk', flat=True))
+
+    # Tests
+    # -----
+    def test_list_is_paginated_by_pk(self):
+        response = self.client.get(reverse('dog-list'), {'limit': 4})
+        second = self.client.get(reverse('dog-list'),
+                                 {'limit': 4, 'after': response.data['next']})
+
+        self.assertEqual([dog['id'] for dog in response.data['results']],
+                         self.ids[:4])
+        self.assertEqual([dog['id'] for dog in second.data['results']],
+                         self.ids[4:])
+        self.assertIsNone(second.data['next'])
+
+    def test_invalid_limit_is_refused(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('dog-list'), {'limit': 0})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_sends_only_the_fields_asked_for(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dog-list'),
+                                       {'limit': 4, 'fields': 'name'})
+
+        self.assertEqual(response.data['results'],
+                         [{'name': name} for name in Dog.objects.order_by(
+                             'pk').values_list('name', flat=True)[:4]])
+        self.assertEqual(response.data['next'], self.ids[3])
+        dog_query = [query['sql'] for query in queries.captured_queries
+                     if 'pugorugh_dog' in query['sql']][-1]
+        self.assertNotIn('"breed"', dog_query)
+
+    def test_unknown_fields_are_refused(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('dog-batch'),
+                                       {'ids': self.ids[0], 'fields': 'owner'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('owner', response.data['fields'])
+
+    def test_single_dog_sends_only_the_fields_asked_for(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/dog/-1/undecided/next/',
+                                       {'fields': 'id,image_url'})
+
+        dog = Dog.objects.get(pk=response.data['id'])
+        self.assertEqual(response.data,
+                         {'id': dog.pk,
+                          'image_url': DogSerializer(dog).data['image_url']})
+        dog_query = [query['sql'] for query in queries.captured_queries
+                     if 'FROM "pugorugh_dog"' in query['sql']][-1]
+        self.assertNotIn('"breed"', dog_query)
+
+    def test_batch_keeps_the_requested_order(self):
+        ids = [self.ids[2], 999999, self.ids[0]]
+
+        response = self.client.get(reverse('dog-batch'),
+                                   {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual([dog['id'] for dog in response.data],
+                         [self.ids[2], self.ids[0]])
+
+    def test_export_streams_every_dog(self):
+        response = self.client.get(reverse('dog-export'))
+
+        dogs = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([dog['id'] for dog in dogs], self.ids)
@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+
+from pugorugh import benchmarks
+from pugorugh.handlers import PathDispatchHandler
+
+
+class PathDispatchHandlerTests(SimpleTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.application = PathDispatchHandler()
+
+    def get_headers(self, path):
+        status_code, headers, _ = benchmarks.wsgi_request(
+            self.application, 'GET', path,
+            headers={'HTTP_HOST': 'testserver'}
+        )
+        return status_code, dict(headers)
+
+    # Tests
+    # -----
+    def test_api_paths_use_the_api_chain(self):
+        self.assertIs(self.application.handler_for('/api/dog/random/'),
+                      self.application.api_handler)
+        self.assertIs(self.application.handler_for('/admin/'),
+                      self.application.full_handler)
+        self.assertIs(self.application.handler_for('/'),
+                      self.application.full_handler)
+
+    def test_api_chain_skips_the_html_middleware(self):
+        status_code, headers = self.get_headers('/api/dog/random/')
+
+        self.assertEqual(status_code, 401)
+        self.assertNotIn('X-Frame-Options', headers)
+        # (the instrumentation middleware still runs)
+        self.assertIn('Server-Timing', headers)
+
+    def test_html_views_keep_the_full_chain(self):
+        status_code, headers = self.get_headers('/')
+
+        self.assertEqual(status_code, 200)
+        self.assertIn('X-Frame-Options', headers)
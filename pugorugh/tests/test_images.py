@@ -0,0 +1,102 @@
+import os
+from unittest import mock
+
+from pugorugh import images
+from pugorugh.models import Dog
+from pugorugh.serializers import DogSerializer
+from .base import TEST_DIRECTORY, VALID_DOG_DATA, PugOrUghTestCase
+
+
+class DogImageTests(PugOrUghTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.dog = Dog.objects.create(**VALID_DOG_DATA[0])
+        self.path = os.path.join(TEST_DIRECTORY, self.dog.image_filename)
+        self.write_image(b'first image')
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write_image(self, content):
+        with open(self.path, 'wb') as file:
+            file.write(content)
+        images.forget(self.dog.image_filename)  # (as an upload does)
+
+    # Tests
+    # -----
+    def test_serializer_includes_versioned_url(self):
+        data = DogSerializer(self.dog).data
+
+        self.assertRegex(
+            data['image_url'],
+            r'^/images/dogs/[0-9a-f]+-[0-9a-f]+/test_image_01\.jpg$'
+        )
+
+    def test_url_changes_with_the_image(self):
+        first_url = images.url(self.dog.image_filename)
+        self.write_image(b'a different image')
+
+        self.assertNotEqual(images.url(self.dog.image_filename), first_url)
+
+    def test_url_version_is_remembered_until_forgotten(self):
+        first_url = images.url(self.dog.image_filename)
+        with open(self.path, 'wb') as file:  # (as another process would)
+            file.write(b'a different image')
+
+        with mock.patch('os.stat') as stat:
+            self.assertEqual(images.url(self.dog.image_filename), first_url)
+        stat.assert_not_called()
+
+        images.forget(self.dog.image_filename)
+        self.assertNotEqual(images.url(self.dog.image_filename), first_url)
+
+    def test_missing_image_has_no_url(self):
+        os.remove(self.path)
+        images.forget(self.dog.image_filename)
+
+        self.assertIsNone(DogSerializer(self.dog).data['image_url'])
+
+    def test_image_is_served_with_immutable_caching(self):
+        response = self.client.get(images.url(self.dog.image_filename))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'first image')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            response['ETag'], f'"{images.version(self.dog.image_filename)}"'
+        )
+
+    def test_matching_if_none_match_is_not_modified(self):
+        url = images.url(self.dog.image_filename)
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_version_redirects_to_current_one(self):
+        stale_url = images.url(self.dog.image_filename)
+        self.write_image(b'a different image')
+
+        response = self.client.get(stale_url)
+
+        self.assertRedirects(response, images.url(self.dog.image_filename),
+                             fetch_redirect_response=False)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_front_proxy_sends_the_file(self):
+        url = images.url(self.dog.image_filename)
+
+        with self.settings(DOG_IMAGE_SENDFILE='x-accel-redirect'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/dogs/test_image_01.jpg')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(DOG_IMAGE_SENDFILE='x-sendfile'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Sendfile'], self.path)
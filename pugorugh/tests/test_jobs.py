@@ -0,0 +1,160 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from pugorugh import jobs
+from pugorugh.models import Job
+
+
+calls = []
+
+
+@jobs.job()
+def record_call(value):
+    calls.append(value)
+
+
+@jobs.job(priority=10)
+def urgent_call(value):
+    calls.append(value)
+
+
+@jobs.job(max_attempts=2)
+def failing_call():
+    raise ValueError("failed on purpose")
+
+
+@override_settings(JOBS_EAGER=False)
+class JobTests(TestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        calls.clear()
+
+    # Tests
+    # -----
+    def test_eager_jobs_run_when_enqueued(self):
+        with self.settings(JOBS_EAGER=True):
+            job = jobs.enqueue(record_call, 'now')
+
+        self.assertEqual(calls, ['now'])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_only_registered_functions_can_be_enqueued(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue(print, 'hello')
+
+    def test_highest_priority_job_is_claimed_first(self):
+        jobs.enqueue(record_call, 'later')
+        jobs.enqueue(urgent_call, 'first')
+
+        job = jobs.claim('worker')
+        jobs.execute(job, 'worker')
+
+        self.assertEqual(calls, ['first'])
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_jobs_that_are_not_due_are_not_claimed(self):
+        jobs.enqueue(record_call, 'later', delay=60)
+
+        self.assertIsNone(jobs.claim('worker'))
+
+    def test_failed_job_is_retried_with_backoff(self):
+        jobs.enqueue(failing_call)
+
+        with self.assertLogs('pugorugh.jobs', 'WARNING'):
+            jobs.execute(jobs.claim('worker'), 'worker')
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("failed on purpose", job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_job_fails_after_max_attempts(self):
+        jobs.enqueue(failing_call)
+        Job.objects.update(attempts=1)
+
+        with self.assertLogs('pugorugh.jobs', 'ERROR'):
+            jobs.execute(jobs.claim('worker'), 'worker')
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_expired_lease_is_claimed_again(self):
+        jobs.enqueue(record_call, 'value')
+        first = jobs.claim('first')
+        Job.objects.update(lease_until=timezone.now() - timedelta(seconds=1))
+
+        second = jobs.claim('second')
+        jobs.execute(second, 'second')
+        jobs.execute(first, 'first')  # (too late: not recorded)
+
+        job = Job.objects.get()
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(calls, ['value', 'value'])
+
+    def test_purge_deletes_old_finished_jobs(self):
+        jobs.enqueue(record_call, 'old')
+        jobs.enqueue(record_call, 'queued')
+        Job.objects.filter(pk=Job.objects.order_by('pk').first().pk).update(
+            status=Job.DONE,
+            finished_at=timezone.now() - timedelta(days=30)
+        )
+
+        self.assertEqual(jobs.purge(7), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+@override_settings(JOBS_EAGER=False)
+class WorkerTests(TransactionTestCase):
+    # (the worker threads use their own connections, so the jobs must be
+    # committed)
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        calls.clear()
+
+    # Tests
+    # -----
+    def test_worker_runs_every_job(self):
+        for value in range(6):
+            jobs.enqueue(record_call, value)
+
+        jobs.Worker(threads=2, poll_interval=0).run(once=True)
+
+        self.assertEqual(sorted(calls), list(range(6)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 6)
+
+    def test_worker_retries_a_failed_claim(self):
+        jobs.enqueue(record_call, 'value')
+        claim = jobs.claim
+        failures = [OperationalError('database is locked')] * 2
+
+        def flaky_claim(worker_id):
+            if failures:
+                raise failures.pop()
+            return claim(worker_id)
+
+        with mock.patch('pugorugh.jobs.claim', flaky_claim), \
+                self.assertLogs('pugorugh.jobs', 'ERROR'):
+            jobs.Worker(poll_interval=0).run(once=True)
+
+        self.assertEqual(calls, ['value'])
+
+    def test_runworker_command(self):
+        jobs.enqueue(record_call, 'value')
+
+        call_command('runworker', once=True, stdout=StringIO())
+
+        self.assertEqual(calls, ['value'])
@@ -0,0 +1,136 @@
+import json
+import logging
+import sys
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from pugorugh.log_handlers import (JSONFormatter, QueueListenerHandler,
+                                   SamplingFilter)
+
+
+class ListHandler(logging.Handler):
+    """Collects the records it handles"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class BlockingHandler(ListHandler):
+    """Holds up the listener on its first record until `go_on` is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.go_on = threading.Event()
+
+    def emit(self, record):
+        self.entered.set()
+        self.go_on.wait(5)
+        super().emit(record)
+
+
+def make_record(message='message %s', args=('arg',), **extra):
+    record = logging.LogRecord('pugorugh.test', logging.INFO, __file__, 1,
+                               message, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class LogHandlerTests(SimpleTestCase):
+
+    # Tests
+    # -----
+    def test_json_formatter_includes_message_and_extra_fields(self):
+        record = make_record(event='swipe', dog_id=3)
+
+        entry = json.loads(JSONFormatter().format(record))
+
+        self.assertEqual(entry['message'], 'message arg')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'pugorugh.test')
+        self.assertEqual(entry['event'], 'swipe')
+        self.assertEqual(entry['dog_id'], 3)
+        self.assertNotIn('args', entry)
+
+    def test_sampling_filter_only_samples_listed_events(self):
+        sampling_filter = SamplingFilter(rates={'swipe': 0, 'upload': 1})
+
+        self.assertFalse(sampling_filter.filter(make_record(event='swipe')))
+        self.assertTrue(sampling_filter.filter(make_record(event='upload')))
+        self.assertTrue(sampling_filter.filter(make_record(event='other')))
+        self.assertTrue(sampling_filter.filter(make_record()))
+
+    def test_queue_handler_passes_records_on_in_background(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target])
+
+        handler.handle(make_record())
+        handler.close()  # (waits for the queue to drain)
+
+        self.assertEqual(len(target.records), 1)
+        self.assertEqual(target.records[0].getMessage(), 'message arg')
+
+    def test_queue_handler_keeps_the_exception_apart_from_the_message(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target])
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = make_record(exc_info=sys.exc_info())
+
+        handler.handle(record)
+        handler.close()
+        entry = json.loads(JSONFormatter().format(target.records[0]))
+
+        self.assertEqual(entry['message'], 'message arg')
+        self.assertIn('ValueError: boom', entry['exception'])
+        self.assertIn('Traceback', entry['exception'])
+
+    def test_queue_listener_starts_with_the_first_record(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target])
+        self.addCleanup(handler.close)
+
+        self.assertIsNone(handler.listener)
+
+        handler.handle(make_record())
+
+        self.assertIsNotNone(handler.listener._thread)
+
+    def test_queue_listener_is_restarted_in_a_forked_process(self):
+        target = ListHandler()
+        handler = QueueListenerHandler([target])
+        handler.handle(make_record())
+        parent = handler.listener
+
+        with mock.patch('os.getpid', return_value=-1):
+            handler.handle(make_record())
+            child = handler.listener
+            handler.close()
+        parent.stop()
+
+        self.assertIsNot(child, parent)
+        self.assertEqual(len(target.records), 2)
+
+    def test_full_queue_drops_records(self):
+        target = BlockingHandler()
+        handler = QueueListenerHandler([target], queue_size=1)
+
+        handler.handle(make_record())
+        target.entered.wait(5)  # (the listener holds the first record)
+        with mock.patch('sys.stderr') as stderr:
+            for _ in range(3):
+                handler.handle(make_record())
+        target.go_on.set()
+        handler.close()
+
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(len(target.records), 2)
+        stderr.write.assert_called_once()
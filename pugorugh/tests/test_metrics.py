@@ -0,0 +1,153 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+
+from pugorugh import metrics
+
+from .base import VALID_DOG_DATA
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+class RegistryTests(TestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.registry = metrics.Registry()
+
+    def tearDown(self):
+        self.metrics_dir.cleanup()
+
+    # Tests
+    # -----
+    def test_observe_counts_value_in_first_matching_bucket(self):
+        name = 'pugorugh_upload_duration_seconds'
+        self.registry.observe(name, 0.02)
+        self.registry.observe(name, 100)
+
+        series = self.registry.histograms[(name, ())]
+        buckets = metrics.METRICS[name][2]
+
+        self.assertEqual(series[buckets.index(0.025)], 1)
+        self.assertEqual(series[len(buckets)], 1)  # +Inf
+        self.assertEqual(series[-2], 100.02)  # sum
+        self.assertEqual(series[-1], 2)  # count
+
+    def test_collect_sums_every_process(self):
+        name = 'pugorugh_swipes_total'
+        other_process = {
+            'counters': [[name, {'status': 'l'}, 5]],
+            'histograms': [],
+        }
+        with open(os.path.join(self.metrics_dir.name, 'metrics-1.json'),
+                  'w') as file:
+            json.dump(other_process, file)
+
+        with override_settings(METRICS_DIR=self.metrics_dir.name):
+            before = metrics.collect()['counters'].get(
+                (name, (('status', 'l'),)), 0
+            )
+            metrics.inc(name, {'status': 'l'}, 2)
+            after = metrics.collect()['counters'][(name, (('status', 'l'),))]
+
+        self.assertGreaterEqual(before, 5)
+        self.assertEqual(after, before + 2)
+
+    def test_dead_processes_are_retired_once(self):
+        name = 'pugorugh_swipes_total'
+        key = (name, (('status', 'd'),))
+        dead_pid = subprocess.run([sys.executable, '-c',
+                                   'import os; print(os.getpid())'],
+                                  capture_output=True).stdout.strip()
+        path = os.path.join(self.metrics_dir.name,
+                            f'metrics-{int(dead_pid)}-abcd.json')
+        with open(path, 'w') as file:
+            json.dump({'counters': [[name, {'status': 'd'}, 3]],
+                       'histograms': []}, file)
+
+        with override_settings(METRICS_DIR=self.metrics_dir.name):
+            first = metrics.collect()['counters'][key]
+            second = metrics.collect()['counters'][key]
+
+        self.assertEqual(first, second)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.metrics_dir.name, metrics.RETIRED_NAME)
+        ))
+
+    def test_module_imports_without_fcntl(self):
+        # (as on Windows; loaded as a copy, not to reset the registry)
+        spec = importlib.util.find_spec('pugorugh.metrics')
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(sys.modules, {'fcntl': None,
+                                           'msvcrt': mock.Mock()}), \
+                mock.patch('atexit.register'):
+            spec.loader.exec_module(module)
+
+        self.assertIsNone(module.fcntl)
+
+    def test_reused_pid_gets_its_own_file(self):
+        with override_settings(METRICS_DIR=self.metrics_dir.name):
+            path = self.registry.path()
+            self.registry._reset()  # (as in a new process with the pid)
+
+            self.assertNotEqual(self.registry.path(), path)
+
+
+class MetricsViewTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+
+    # Tests
+    # -----
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_are_exported_in_text_format(self):
+        self.client.put('/api/dog/1/liked/')
+        self.client.get('/api/dog/random/')
+
+        response = Client().get('/metrics',
+                                HTTP_AUTHORIZATION='Bearer scrape-token')
+        content = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('# TYPE pugorugh_swipes_total counter', content)
+        self.assertIn('pugorugh_swipes_total{status="l"}', content)
+        self.assertIn(
+            'pugorugh_http_request_duration_seconds_bucket'
+            '{url_name="random-dog",le="+Inf"}',
+            content
+        )
+        self.assertIn(
+            'pugorugh_http_responses_total'
+            '{status="200",url_name="set-status"}',
+            content
+        )
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_need_the_token_or_a_staff_user(self):
+        client = Client()
+        with self.assertLogs('django.request', 'WARNING'):
+            anonymous = client.get('/metrics')
+            wrong_token = client.get('/metrics',
+                                     HTTP_AUTHORIZATION='Bearer nope')
+        self.user.is_staff = True
+        self.user.save()
+        client.force_login(self.user)
+        staff = client.get('/metrics')
+
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(wrong_token.status_code, 403)
+        self.assertEqual(staff.status_code, 200)
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+
+from django.db import connections
+from django.test import override_settings
+
+from pugorugh import instrumentation
+from .base import VALID_DOG_DATA
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+class QueryInstrumentationMiddlewareTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+
+    # Tests
+    # -----
+    def test_response_has_server_timing_header(self):
+        response = self.client.get('/api/dog/random/')
+
+        server_timing = response['Server-Timing']
+        for metric in ['db;', 'view;', 'serializer;', 'total;']:
+            self.assertIn(metric, server_timing)
+
+    @override_settings(QUERY_BUDGETS={'random-dog': 0})
+    def test_request_over_budget_is_logged(self):
+        with self.assertLogs(level='WARNING') as logs:
+            self.client.get('/api/dog/random/')
+
+        self.assertIn('Query budget exceeded for random-dog', logs.output[0])
+
+    def test_every_database_is_instrumented(self):
+        metrics = instrumentation.RequestMetrics()
+
+        with instrumentation.wrap_connections(metrics):
+            for connection in connections.all():
+                self.assertIn(metrics, connection.execute_wrappers)
+                connection.cursor().execute('SELECT 1')
+
+        self.assertEqual(metrics.query_count, len(connections.all()))
+        for connection in connections.all():
+            self.assertNotIn(metrics, connection.execute_wrappers)
+
+    def test_slow_query_explains_are_not_counted(self):
+        uri = '/api/dog/-1/undecided/next/'
+        self.client.get(uri)  # (warms the candidate list)
+        expected = self.client.get(uri)['Server-Timing'].split(';')[1]
+
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0):
+            with self.assertLogs(level='WARNING'):
+                response = self.client.get(uri)
+
+        self.assertEqual(response['Server-Timing'].split(';')[1], expected)
+
+
+class TrafficCaptureMiddlewareTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.capture_dir = tempfile.TemporaryDirectory()
+        self.capture_file = os.path.join(self.capture_dir.name,
+                                         'traffic.jsonl')
+
+    def tearDown(self):
+        self.capture_dir.cleanup()
+
+    # Helper Methods
+    # --------------
+    def captured(self):
+        with open(self.capture_file, 'r') as file:
+            return [json.loads(line) for line in file]
+
+    # Tests
+    # -----
+    def test_api_requests_are_captured_without_secrets(self):
+        with self.settings(TRAFFIC_CAPTURE_FILE=self.capture_file,
+                           TRAFFIC_CAPTURE_SAMPLE_RATE=1.0):
+            self.get_token(username='some_test_user',
+                           password='some_test_password')
+            client = self.authenticate_user()
+            client.put('/api/dog/1/liked/')
+
+        login, swipe = self.captured()
+
+        self.assertEqual(login['route'], 'login-user')
+        self.assertNotIn('password', login['body'])
+        self.assertEqual(swipe['route'], 'set-status')
+        self.assertEqual(swipe['kwargs'], {'pk': '1', 'status': 'liked'})
+        self.assertEqual(swipe['user_id'], self.user.pk)
+        self.assertEqual(swipe['status'], 200)
+
+    def test_requests_are_not_captured_by_default(self):
+        client = self.authenticate_user()
+        client.put('/api/dog/1/liked/')
+
+        self.assertFalse(os.path.exists(self.capture_file))
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.db.utils import IntegrityError
 
 from pugorugh.models import Dog, UserDog, UserPref
@@ -8,7 +8,10 @@ from pugorugh.models import Dog, UserDog, UserPref
 User = get_user_model()
 
 
+@override_settings(JOBS_EAGER=True)
 class ModelTestCase(TestCase):
+    # (the users may be in a separate 'auth' database; see routers.py)
+    databases = '__all__'
 
     def setUp(self):
         self.abstract = True
@@ -119,6 +122,58 @@ class UserDogModelTests(ModelTestCase):
         with self.assertRaises(IntegrityError):
             UserDog.objects.create(**second_userdog_data)
 
+    def test_saving_a_duplicate_raises_IntegrityError(self):
+        duplicate = UserDog(user=self.test_user, dog=self.test_dog,
+                            status='d')
+
+        with self.assertRaises(IntegrityError):
+            duplicate.save()
+
+    def test_primary_key_is_derived_from_user_and_dog(self):
+        self.assertEqual(
+            self.test_userdog.pk,
+            UserDog.make_key(self.test_user.pk, self.test_dog.pk)
+        )
+
+    def test_make_key_rejects_dog_ids_that_overflow_the_key(self):
+        UserDog.make_key(self.test_user.pk, UserDog.KEY_MASK)
+
+        with self.assertRaises(ValueError):
+            UserDog.make_key(self.test_user.pk, UserDog.KEY_MASK + 1)
+
+    def test_changing_user_or_dog_raises_ValueError(self):
+        other_dog = Dog.objects.create(**dict(self.test_dog_data,
+                                              name='rosie'))
+        self.test_userdog.dog = other_dog
+
+        with self.assertRaises(ValueError):
+            self.test_userdog.save()
+
+    def test_for_user_and_bulk_create(self):
+        other_user = User.objects.create_user(username='other',
+                                              password='password')
+        other_dog = Dog.objects.create(**dict(self.test_dog_data,
+                                              name='rosie'))
+        UserDog.objects.bulk_create([
+            UserDog(user=other_user, dog=self.test_dog, status='d'),
+            UserDog(user=other_user, dog=other_dog, status='l'),
+        ])
+
+        self.assertEqual(
+            sorted(UserDog.objects.for_user(other_user).values_list(
+                'dog_id', flat=True
+            )),
+            [self.test_dog.pk, other_dog.pk]
+        )
+        self.assertEqual(UserDog.objects.for_user(self.test_user).count(), 1)
+
+    def test_deleting_user_deletes_userdogs_and_userpref(self):
+        self.test_user.delete()
+
+        self.assertFalse(UserDog.objects.exists())
+        self.assertFalse(UserPref.objects.exists())
+        self.assertTrue(Dog.objects.exists())
+
 
 class UserPrefModelTests(ModelTestCase):
 
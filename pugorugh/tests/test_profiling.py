@@ -0,0 +1,97 @@
+import os
+import shutil
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+
+from pugorugh import profiling
+
+from .base import VALID_DOG_DATA, TEST_PROFILE_DIRECTORY
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(TEST_PROFILE_DIRECTORY, ignore_errors=True)
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+
+    def tearDown(self):
+        shutil.rmtree(TEST_PROFILE_DIRECTORY, ignore_errors=True)
+        super().tearDown()
+
+    # Helper Methods
+    # --------------
+    def staff_client(self):
+        User.objects.create_user(username='staff', password='staff_password',
+                                 is_staff=True)
+        client = Client()
+        client.login(username='staff', password='staff_password')
+        return client
+
+    # Tests
+    # -----
+    def test_requests_are_not_profiled_by_default(self):
+        response = self.client.get('/api/dog/random/')
+
+        self.assertNotIn('X-Profile-Name', response)
+        self.assertEqual(profiling.profile_names(), [])
+
+    def test_signed_header_profiles_request(self):
+        response = self.client.get('/api/dog/random/',
+                                   HTTP_X_PROFILE=profiling.make_token())
+
+        name = response['X-Profile-Name']
+        self.assertEqual(profiling.profile_names(), [name])
+        self.assertIn('random-dog', name)
+        # the app's own code is visible in the profile
+        path = profiling.profile_path(name)
+        labels = [row[0] for row in profiling.top_functions(
+            path, limit=50, project_only=True
+        )]
+        self.assertTrue(any('views.py' in label for label in labels))
+
+    def test_forged_header_is_ignored(self):
+        response = self.client.get('/api/dog/random/',
+                                   HTTP_X_PROFILE='profile:forged:token')
+
+        self.assertNotIn('X-Profile-Name', response)
+
+    def test_staff_user_can_profile_with_query_parameter(self):
+        client = self.staff_client()
+
+        response = client.get('/admin/?_profile=1')
+
+        self.assertIn('X-Profile-Name', response)
+
+    def test_admin_page_lists_profiles(self):
+        client = self.staff_client()
+        self.client.get('/api/dog/random/',
+                        HTTP_X_PROFILE=profiling.make_token())
+        name = profiling.profile_names()[0]
+
+        list_response = client.get('/admin/tools/profiles/')
+        detail_response = client.get(f'/admin/tools/profiles/{name}/')
+
+        self.assertContains(list_response, name)
+        self.assertContains(detail_response, 'cumulative')
+
+    def test_admin_page_requires_staff(self):
+        response = self.client.get('/admin/tools/profiles/')
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_old_profiles_are_pruned(self):
+        with self.settings(PROFILE_KEEP=2):
+            for _ in range(3):
+                self.client.get('/api/dog/random/',
+                                HTTP_X_PROFILE=profiling.make_token())
+
+        self.assertEqual(len(os.listdir(TEST_PROFILE_DIRECTORY)), 2)
@@ -0,0 +1,76 @@
+import json
+import os
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from pugorugh.models import Dog
+from .base import VALID_DOG_DATA, VALID_STATUS_LIST
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+with open(BUDGET_FILE, 'r', encoding='utf-8') as file:
+    QUERY_BUDGETS = json.load(file)
+
+
+class QueryBudgetTests(ViewsWithUserTestCase):
+    """Fails if any of the API routes issues more queries than allowed by
+    `query_budgets.json`, or if the number of queries grows with the number
+    of dogs (i.e., an N+1 regression)
+    """
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.create_some_userdogs(self.user, VALID_STATUS_LIST)
+
+        self.client = self.authenticate_user()
+
+        first_pk = Dog.objects.first().pk
+        self.requests = {
+            'next-dog': ('get', {'pk': first_pk, 'status': 'undecided'}),
+            'set-status': ('put', {'pk': first_pk, 'status': 'liked'}),
+            'random-dog': ('get', {}),
+            'needs-love-dog': ('get', {}),
+            'set-preferences': ('get', {}),
+            'dog-list': ('get', {}),
+        }
+
+    # Helper Methods
+    # --------------
+    def count_queries(self, url_name):
+        method, kwargs = self.requests[url_name]
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(
+                reverse(url_name, kwargs=kwargs)
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    # Tests
+    # -----
+    def test_routes_stay_within_query_budget(self):
+        for url_name, budget in QUERY_BUDGETS.items():
+            with self.subTest(url_name=url_name):
+                self.assertLessEqual(self.count_queries(url_name), budget)
+
+    def test_query_count_does_not_grow_with_number_of_dogs(self):
+        before = {
+            url_name: self.count_queries(url_name)
+            for url_name in QUERY_BUDGETS
+        }
+
+        last_pk = Dog.objects.last().pk
+        self.create_some_dogs(VALID_DOG_DATA)
+        for dog in Dog.objects.filter(pk__gt=last_pk):
+            self.create_valid_userdog(self.user, dog, 'l')
+
+        for url_name in QUERY_BUDGETS:
+            with self.subTest(url_name=url_name):
+                self.assertEqual(self.count_queries(url_name),
+                                 before[url_name])
@@ -0,0 +1,101 @@
+import unittest
+
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer as DRFJSONRenderer
+
+from pugorugh import renderers
+from pugorugh.models import Dog, UserPref
+from pugorugh.serializers import DogSerializer
+from .base import VALID_DOG_DATA, PugOrUghTestCase
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+class FastJSONTests(PugOrUghTestCase):
+
+    # Tests
+    # -----
+    def test_fast_json_is_drf_json(self):
+        dog = Dog.objects.create(**VALID_DOG_DATA[0])
+        data = {'dogs': [DogSerializer(dog).data], 'note': 'a b é',
+                1: None}
+
+        self.assertEqual(renderers.FastJSONRenderer().render(data),
+                         DRFJSONRenderer().render(data))
+
+
+class BinaryFormatTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+        self.ids = list(Dog.objects.values_list('pk', flat=True))
+
+    # Helpers
+    # -------
+    def assert_round_trip(self, media_type, loads, dumps):
+        batch = reverse('dog-batch')
+        ids = ','.join(map(str, self.ids))
+        expected = self.client.get(batch, {'ids': ids}).data
+
+        response = self.client.get(batch, {'ids': ids}, HTTP_ACCEPT=media_type)
+        suffixed = self.client.get(
+            batch.rstrip('/') + '.' + response.accepted_renderer.format,
+            {'ids': ids}
+        )
+
+        self.assertEqual(response['Content-Type'], media_type)
+        self.assertEqual(loads(response.content), expected)
+        self.assertEqual(suffixed.content, response.content)
+
+        response = self.client.put('/api/user/preferences/',
+                                   dumps({'age': 'y', 'gender': 'm',
+                                          'size': 's'}),
+                                   content_type=media_type)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserPref.objects.get(user=self.user).size, 's')
+
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.put('/api/user/preferences/', b'\xc1',
+                                       content_type=media_type)
+
+        self.assertEqual(response.status_code, 400)
+
+    # Tests
+    # -----
+    @unittest.skipIf(renderers.msgpack is None, "msgpack isn't installed")
+    def test_messagepack(self):
+        self.assert_round_trip(
+            'application/msgpack',
+            lambda content: renderers.msgpack.unpackb(content, raw=False),
+            renderers.msgpack.packb
+        )
+
+    @unittest.skipIf(renderers.cbor2 is None, "cbor2 isn't installed")
+    def test_cbor(self):
+        self.assert_round_trip('application/cbor', renderers.cbor2.loads,
+                               renderers.cbor2.dumps)
+
+    @unittest.skipIf(renderers.msgpack is None, "msgpack isn't installed")
+    def test_prerendered_dog_is_converted(self):
+        dog = self.client.get('/api/dog/-1/undecided/next/').data
+
+        response = self.client.get('/api/dog/-1/undecided/next/',
+                                   HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content, raw=False), dict(dog)
+        )
+
+    def test_uninstalled_formats_are_not_acceptable(self):
+        accept = ('application/msgpack' if renderers.msgpack is None else
+                  'application/x-unknown')
+
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('dog-batch'),
+                                       HTTP_ACCEPT=accept)
+
+        self.assertEqual(response.status_code, 406)
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from pugorugh import routers
+from pugorugh.middleware import ReplicaRoutingMiddleware
+from pugorugh.models import Dog, ReplicaPin, UserDog
+from users.models import PugUghUser
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        routers.forget_pins()
+        self.factory = RequestFactory()
+        self.read_aliases = []
+
+        def get_response(request):
+            # (what the view would see)
+            self.read_aliases.append(routers.current_read_alias())
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    # Helper Methods
+    # --------------
+    def send(self, method, path, **extra):
+        request = getattr(self.factory, method)(path, **extra)
+        request.resolver_match = resolve(path)
+        self.middleware.process_view(request, None, (), {})
+        response = self.middleware(request)
+        return response
+
+    # Tests
+    # -----
+    def test_router_reads_from_selected_replica(self):
+        router = routers.ReplicaRouter()
+
+        self.assertEqual(router.db_for_read(Dog), 'default')
+        with routers.read_from('replica'):
+            self.assertEqual(router.db_for_read(Dog), 'replica')
+            self.assertEqual(router.db_for_write(Dog), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'pugorugh'))
+
+    def test_get_on_replica_route_reads_from_replica(self):
+        self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token a')
+
+        self.assertEqual(self.read_aliases, ['replica'])
+        self.assertIsNone(routers.current_read_alias())  # (reset after)
+
+    def test_other_routes_read_from_primary(self):
+        self.send('get', '/api/dog/1/liked/next/')  # (next-dog is routed)
+        self.send('get', '/metrics')
+
+        self.assertEqual(self.read_aliases, ['replica', None])
+
+    def test_client_reads_own_writes_after_a_write(self):
+        response = self.send('put', '/api/dog/1/liked/',
+                             HTTP_AUTHORIZATION='Token b')
+        self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token b')
+        self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token c')
+
+        # the PUT itself, the writer's GET, another client's GET
+        self.assertEqual(self.read_aliases, [None, None, 'replica'])
+
+    def test_pins_are_shared_by_every_process(self):
+        self.send('put', '/api/dog/1/liked/', HTTP_AUTHORIZATION='Token b')
+
+        # (in the database, not in this process's memory)
+        self.assertTrue(ReplicaPin.objects.filter(
+            client=routers.credential_key('Token b')
+        ).exists())
+
+    def test_fresh_pins_are_neither_rewritten_nor_queried(self):
+        self.send('put', '/api/dog/1/liked/', HTTP_AUTHORIZATION='Token b')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.send('put', '/api/dog/1/liked/',
+                      HTTP_AUTHORIZATION='Token b')
+            self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token b')
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.read_aliases, [None, None, None])
+        # (still pinned for REPLICA_PIN_SECONDS after the last write)
+        self.assertGreater(ReplicaPin.objects.get().until, timezone.now() +
+                           timedelta(seconds=settings.REPLICA_PIN_SECONDS))
+
+    def test_pins_from_other_processes_are_remembered(self):
+        ReplicaPin.objects.create(
+            client=routers.credential_key('Token b'),
+            until=timezone.now() + timedelta(seconds=10)
+        )
+        self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token b')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token b')
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.read_aliases, [None, None])
+
+    def test_expired_pins_read_from_replica(self):
+        ReplicaPin.objects.create(
+            client=routers.credential_key('Token b'),
+            until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.send('get', '/api/dog/random/', HTTP_AUTHORIZATION='Token b')
+
+        self.assertEqual(self.read_aliases, ['replica'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class LoginPinTests(ViewsWithUserTestCase):
+
+    # Tests
+    # -----
+    def test_login_pins_the_new_token(self):
+        token = self.get_token(username='some_test_user',
+                               password='some_test_password')
+        request = RequestFactory().get(
+            '/api/dog/random/', HTTP_AUTHORIZATION=f'Token {token}'
+        )
+
+        self.assertTrue(routers.is_pinned(request))
+
+
+class AuthRouterTests(SimpleTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        self.router = routers.AuthRouter()
+        self.router.is_split = lambda: True
+
+    # Tests
+    # -----
+    def test_auth_apps_use_auth_database(self):
+        self.assertEqual(self.router.db_for_read(PugUghUser), 'auth')
+        self.assertEqual(self.router.db_for_write(PugUghUser), 'auth')
+        self.assertIsNone(self.router.db_for_read(UserDog))
+
+    def test_migrations_are_split(self):
+        self.assertTrue(self.router.allow_migrate('auth', 'users'))
+        self.assertTrue(self.router.allow_migrate('auth', 'authtoken'))
+        self.assertFalse(self.router.allow_migrate('default', 'users'))
+        self.assertFalse(self.router.allow_migrate('auth', 'pugorugh'))
+        self.assertIsNone(self.router.allow_migrate('default', 'pugorugh'))
+
+    def test_router_does_nothing_without_auth_database(self):
+        router = routers.AuthRouter()
+        router.is_split = lambda: False
+
+        self.assertIsNone(router.db_for_read(PugUghUser))
+        self.assertIsNone(router.allow_migrate('default', 'users'))
+
+
+class SnapshotReplicaCommandTests(SimpleTestCase):
+
+    # Tests
+    # -----
+    def test_snapshot_copies_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            connection = sqlite3.connect(source)
+            connection.execute('CREATE TABLE dog (name TEXT)')
+            connection.execute("INSERT INTO dog VALUES ('lucy')")
+            connection.commit()
+            connection.close()
+
+            call_command('snapshot_replica', source=source, target=target,
+                         stdout=StringIO())
+
+            connection = sqlite3.connect(target)
+            rows = connection.execute('SELECT name FROM dog').fetchall()
+            connection.close()
+        self.assertEqual(rows, [('lucy',)])
+
+    @override_settings(REPLICA_PIN_SECONDS=5)
+    def test_interval_must_be_shorter_than_the_pin(self):
+        with self.assertRaises(CommandError):
+            call_command('snapshot_replica', source='primary.sqlite3',
+                         target='replica.sqlite3', interval=5)
@@ -0,0 +1,169 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, override_settings
+
+from pugorugh import slow_queries
+from pugorugh.models import Dog
+
+from .base import VALID_DOG_DATA
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+User = get_user_model()
+
+
+class FingerprintTests(ViewsWithUserTestCase):
+
+    # Tests
+    # -----
+    def test_fingerprint_collapses_literals_and_parameter_lists(self):
+        first = slow_queries.fingerprint(
+            "SELECT * FROM dog WHERE age > 10 AND id IN (%s, %s, %s)"
+        )
+        second = slow_queries.fingerprint(
+            "SELECT *  FROM dog\nWHERE age > 20 AND id IN (%s)"
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(first,
+                         "SELECT * FROM dog WHERE age > ? AND id IN (...)")
+
+
+class SlowQueryLogTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+        slow_queries.log.entries.clear()
+        slow_queries.log.plans.clear()
+
+    # Helper Methods
+    # --------------
+    @contextmanager
+    def log_everything(self):
+        """Logs every query in the block (and captures the warnings)"""
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0):
+            with self.assertLogs(level='WARNING'):
+                yield
+
+    # Tests
+    # -----
+    def test_slow_query_is_logged_with_call_site_and_plan(self):
+        with self.log_everything():
+            self.client.get('/api/dog/-1/undecided/next/')
+
+        entries, plans = slow_queries.collect()
+        candidate_queries = [
+            entry for entry in entries
+            if entry['call_site'] and
+            entry['call_site'].endswith('candidate_ids')
+        ]
+        self.assertTrue(candidate_queries)
+        entry = candidate_queries[0]
+        self.assertIn('views.py', entry['call_site'])
+        # (the with_prefs subqueries)
+        self.assertIn('LIST SUBQUERY', plans[entry['fingerprint']].upper())
+
+    def test_each_fingerprint_is_explained_once(self):
+        with self.log_everything():
+            self.client.get('/api/dog/-1/undecided/next/')
+            self.client.get('/api/dog/-1/undecided/next/')
+
+        entries, plans = slow_queries.collect()
+        self.assertEqual(len(plans),
+                         len({entry['fingerprint'] for entry in entries}))
+
+    def test_writes_are_not_explained(self):
+        with self.log_everything():
+            Dog.objects.create(**VALID_DOG_DATA[0])
+
+        entries, plans = slow_queries.collect()
+        insert = [entry for entry in entries
+                  if entry['sql'].startswith('INSERT')][0]
+        self.assertIsNone(plans[insert['fingerprint']])
+
+    def test_report_and_admin_page(self):
+        with self.log_everything():
+            self.client.get('/api/dog/-1/undecided/next/')
+            User.objects.create_user(username='staff',
+                                     password='staff_password',
+                                     is_staff=True)
+            admin_client = Client()
+            admin_client.login(username='staff', password='staff_password')
+            response = admin_client.get('/admin/tools/slow-queries/')
+        output = StringIO()
+
+        call_command('slow_query_report', stdout=output)
+
+        self.assertContains(response, 'candidates.py')
+        self.assertIn('candidates.py', output.getvalue())
+
+
+class RetirementTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    # Helper Methods
+    # --------------
+    def write_dead_log(self, token, timestamps):
+        dead_pid = subprocess.run([sys.executable, '-c',
+                                   'import os; print(os.getpid())'],
+                                  capture_output=True).stdout.strip()
+        path = os.path.join(self.directory.name,
+                            f'slow-queries-{int(dead_pid)}-{token}.json')
+        with open(path, 'w') as file:
+            json.dump({
+                'entries': [{'ts': ts, 'duration_ms': 1.0,
+                             'sql': f'SELECT {ts}', 'fingerprint': 'SELECT ?',
+                             'call_site': None} for ts in timestamps],
+                'plans': {'SELECT ?': 'SCAN'},
+            }, file)
+        return path
+
+    # Tests
+    # -----
+    def test_reused_pid_gets_its_own_file(self):
+        with override_settings(SLOW_QUERY_DIR=self.directory.name):
+            log = slow_queries.SlowQueryLog()
+            path = log.path()
+            log._reset()  # (as in a new process with the pid)
+
+            self.assertNotEqual(log.path(), path)
+
+    def test_dead_processes_are_retired_once_and_bounded(self):
+        first = self.write_dead_log('abcd', [1, 2, 3])
+        second = self.write_dead_log('ef01', [4, 5])
+
+        with override_settings(SLOW_QUERY_DIR=self.directory.name,
+                               SLOW_QUERY_LOG_SIZE=4):
+            entries, plans = slow_queries.collect()
+            again, _ = slow_queries.collect()
+
+        dead = [entry['ts'] for entry in entries if entry['ts'] < 10]
+        self.assertEqual(dead, [5, 4, 3, 2])
+        self.assertEqual(plans['SELECT ?'], 'SCAN')
+        self.assertEqual(again, entries)
+        self.assertFalse(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory.name, slow_queries.RETIRED_NAME)
+        ))
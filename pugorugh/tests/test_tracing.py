@@ -0,0 +1,104 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from pugorugh import metrics
+from pugorugh import tracing
+
+from .base import VALID_DOG_DATA
+from .test_views_with_user import ViewsWithUserTestCase
+
+
+def span_count(name):
+    series = metrics.registry.histograms.get(
+        (tracing.METRIC, (('span', name),))
+    )
+    return series[-1] if series else 0
+
+
+class SpanTests(TestCase):
+
+    # Tests
+    # -----
+    def test_context_manager_records_duration(self):
+        before = span_count('test.block')
+
+        with tracing.span('test.block'):
+            pass
+
+        self.assertEqual(span_count('test.block'), before + 1)
+
+    def test_decorator_records_every_call_even_on_error(self):
+        @tracing.span('test.function')
+        def function(fail):
+            if fail:
+                raise ValueError
+            return 'result'
+        before = span_count('test.function')
+
+        self.assertEqual(function(False), 'result')
+        with self.assertRaises(ValueError):
+            function(True)
+
+        self.assertEqual(span_count('test.function'), before + 2)
+
+    def test_bucket_percentile(self):
+        buckets = (0.1, 0.2, 0.3)
+        # bucket counts, +Inf, sum, count
+        series = [5, 4, 1, 0, 2.0, 10]
+
+        self.assertEqual(tracing.bucket_percentile(buckets, series, 50), 0.1)
+        self.assertEqual(tracing.bucket_percentile(buckets, series, 90), 0.2)
+        self.assertEqual(tracing.bucket_percentile(buckets, series, 99), 0.3)
+
+
+class TracedRequestTests(ViewsWithUserTestCase):
+
+    # Setup and Teardown
+    # ------------------
+    def setUp(self):
+        super().setUp()
+        self.create_some_dogs(VALID_DOG_DATA)
+        self.client = self.authenticate_user()
+
+    # Tests
+    # -----
+    def test_next_dog_request_records_spans(self):
+        names = [
+            'auth.token',
+            'views.DogRetrieveUpdate.get_object',
+            'serializers.Dog.to_representation',
+        ]
+        before = {name: span_count(name) for name in names}
+
+        self.client.get('/api/dog/-1/undecided/next/')
+
+        for name in names:
+            self.assertEqual(span_count(name), before[name] + 1, name)
+
+    def test_queryset_span_times_the_query(self):
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(0.01)
+            return execute(sql, params, many, context)
+
+        self.client.put('/api/dog/1/liked/')
+        with mock.patch.object(tracing, 'record') as record:
+            with connection.execute_wrapper(slow_query):
+                self.client.get('/api/dog/-1/liked/next/')
+
+        durations = [args[1] for args, _ in record.call_args_list
+                     if args[0] == 'dogs.with_status']
+        self.assertEqual(len(durations), 1)
+        self.assertGreaterEqual(durations[0], 0.01)
+
+    def test_slowest_spans_command_lists_spans(self):
+        self.client.get('/api/dog/-1/undecided/next/')
+        output = StringIO()
+
+        call_command('slowest_spans', stdout=output)
+
+        self.assertIn('views.DogRetrieveUpdate.get_object', output.getvalue())
@@ -0,0 +1,118 @@
+"""Lightweight, always-on timing of named code paths ("spans").
+
+`span` works as a decorator or as a context manager:
+
+```python
+from . import tracing
+
+@tracing.span('fastpath.dogs')
+def dogs(queryset):
+    ...
+
+with tracing.span('candidates.query'):
+    ids = list(queryset)
+```
+
+Querysets are lazy, so a span times the SQL only if it is around where the
+queryset is evaluated (e.g., `list()` or `.first()`); around a method that
+just builds one (e.g., `Dog.objects.with_prefs`) it would time nothing.
+
+Each span's durations go into the `pugorugh_span_duration_seconds`
+histogram (labelled with the span name) in the process's metrics registry,
+which is flushed periodically to `settings.METRICS_DIR` as JSON (see
+`metrics.py`). So the spans are exported at `/metrics` along with
+everything else, and the `slowest_spans` management command summarises
+them.
+
+Recording a span costs one histogram update (a few microseconds), so spans
+belong around methods that run a handful of times per request, not in
+tight loops.
+"""
+import functools
+import time
+
+from . import metrics
+
+
+METRIC = 'pugorugh_span_duration_seconds'
+
+
+def record(name, duration):
+    """Records a span duration (seconds)"""
+    metrics.observe(METRIC, duration, {'span': name})
+
+
+class Span:
+    """Times a block or (when used as a decorator) every call of a function.
+
+    A `Span` instance used as a context manager must not be re-entered;
+    create a new one for each block (as `span(name)` does).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.perf_counter() - self._start)
+
+    def __call__(self, func):
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+
+
+def span(name):
+    return Span(name)
+
+
+# Reporting
+# ---------
+def bucket_percentile(buckets, series, pct):
+    """Returns the upper bound of the bucket containing the `pct`th
+    percentile of a histogram series (None if it is in the +Inf bucket)
+    """
+    count = series[-1]
+    if not count:
+        return None
+    rank = pct / 100 * count
+    cumulative = 0
+    for bound, bucket_count in zip(buckets, series):
+        cumulative += bucket_count
+        if cumulative >= rank:
+            return bound
+    return None
+
+
+def span_stats():
+    """Returns a list of dicts (name, count, mean, p50, p95, p99 and total,
+    all in seconds; the percentiles are histogram bucket upper bounds) for
+    every span recorded by any process
+    """
+    buckets = metrics.METRICS[METRIC][2]
+    stats = []
+    for (name, labels), series in metrics.collect()['histograms'].items():
+        if name != METRIC:
+            continue
+        count = series[-1]
+        stats.append({
+            'name': dict(labels)['span'],
+            'count': count,
+            'total': series[-2],
+            'mean': series[-2] / count if count else None,
+            'p50': bucket_percentile(buckets, series, 50),
+            'p95': bucket_percentile(buckets, series, 95),
+            'p99': bucket_percentile(buckets, series, 99),
+        })
+    return stats
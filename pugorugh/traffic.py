@@ -0,0 +1,156 @@
+"""Capture and replay of real API traffic.
+
+`TrafficCaptureMiddleware` (see `middleware.py`) appends a sample of the
+API requests it sees to `settings.TRAFFIC_CAPTURE_FILE` as JSON lines:
+
+```json
+{"ts": 1579132800.25, "method": "PUT", "path": "/api/dog/3/liked/",
+ "route": "set-status", "kwargs": {"pk": "3", "status": "liked"},
+ "query": {}, "body": null, "user_id": 7, "status": 200,
+ "duration_ms": 6.1}
+```
+
+Passwords, tokens and the `Authorization` header are never recorded.
+
+The `replay_traffic` management command re-issues a captured stream (see
+`Replayer`).
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from . import benchmarks
+
+
+SECRET_FIELDS = {'password', 'token', 'key', 'secret', 'csrfmiddlewaretoken'}
+
+# Requests to these routes can't be replayed without the secrets we don't
+# record
+UNREPLAYABLE_ROUTES = {'login-user', 'register-user'}
+
+
+def scrub(params):
+    """Returns a copy of a dict of request parameters without any secrets"""
+    if not isinstance(params, dict):
+        return None
+    return {
+        key: value for key, value in params.items()
+        if key.lower() not in SECRET_FIELDS
+    }
+
+
+# Capture
+# -------
+class TrafficRecorder:
+    """Appends records to a JSONL file (safe to share between threads)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line + '\n')
+
+
+def load(path):
+    """Returns the replayable records in a capture file, in time order"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get('route') in UNREPLAYABLE_ROUTES:
+                continue
+            records.append(entry)
+    records.sort(key=lambda entry: entry['ts'])
+    return records
+
+
+# Replay
+# ------
+class Replayer:
+    """Re-issues captured requests, preserving their relative timing
+    (divided by `speedup`; a speedup of 0 sends them as fast as possible)
+    from `concurrency` worker threads.
+
+    `send(entry)` must issue the request described by a record and return
+    its status code.
+    """
+
+    def __init__(self, send, concurrency=1, speedup=1.0):
+        self.send = send
+        self.concurrency = concurrency
+        self.speedup = speedup
+
+    def run(self, records):
+        """Replays the records and returns a report of the latencies, for
+        all requests and by route
+        """
+        if not records:
+            return {'all': benchmarks.summarize([], 0)}
+
+        work = queue.Queue()
+        for entry in records:
+            work.put(entry)
+
+        lock = threading.Lock()
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        first_ts = records[0]['ts']
+        start = time.perf_counter()
+
+        def worker():
+            while True:
+                try:
+                    entry = work.get_nowait()
+                except queue.Empty:
+                    return
+                if self.speedup:
+                    due = (entry['ts'] - first_ts) / self.speedup
+                    delay = due - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                request_start = time.perf_counter()
+                try:
+                    status_code = self.send(entry)
+                except Exception:
+                    status_code = 599
+                duration = time.perf_counter() - request_start
+
+                route = entry.get('route') or 'unmatched'
+                with lock:
+                    samples[route].append(duration)
+                    if status_code >= 500:
+                        errors[route] += 1
+
+        if self.concurrency <= 1:
+            worker()  # (in this thread, i.e., on this DB connection)
+        else:
+            threads = [
+                threading.Thread(target=worker, daemon=True)
+                for _ in range(self.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+
+        all_samples = [sample for route in samples.values()
+                       for sample in route]
+        result = {
+            'all': benchmarks.summarize(all_samples, elapsed,
+                                        sum(errors.values())),
+        }
+        for route, route_samples in sorted(samples.items()):
+            result[route] = benchmarks.summarize(route_samples, elapsed,
+                                                 errors[route])
+        return result
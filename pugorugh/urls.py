@@ -4,7 +4,6 @@ from django.views.generic.base import RedirectView
 
 from rest_framework import routers
 from rest_framework.urlpatterns import format_suffix_patterns
-from rest_framework.authtoken.views import obtain_auth_token
 
 from . import views
 
@@ -24,13 +23,20 @@ from . import views
 # /api/dog/<pk>/disliked/
 # /api/dog/<pk>/undecided/
 #
+# Dog list/batch/export GET:
+# /api/dog/?after=<pk>&limit=<n>
+# /api/dog/batch/?ids=<pk>,<pk>,...
+# /api/dog/export/
+#
 # UserPref POST?/PUT (and GET):
 # /api/user/preferences/
 
 urlpatterns = [
     # Rest Framework Auth
     #   This route seems to be a clone of the route in the base urls.py
-    re_path(r'^api/user/login/$', obtain_auth_token, name="login-user"),
+    re_path(r'^api/user/login/$',
+            views.UserLoginView.as_view(),
+            name="login-user"),
     #   Register user (available as a web view)
     re_path(r'^api/user/$',
             views.UserRegisterView.as_view(),
@@ -55,6 +61,16 @@ urlpatterns = [
             views.UserPrefRetrieveAPIView.as_view(),
             name="set-preferences"),
 
+    re_path(r'^api/dog/$',
+            views.DogListAPIView.as_view(),
+            name="dog-list"),
+    re_path(r'^api/dog/batch/$',
+            views.DogBatchAPIView.as_view(),
+            name="dog-batch"),
+    re_path(r'^api/dog/export/$',
+            views.DogExportAPIView.as_view(),
+            name="dog-export"),
+
     re_path(r'^api/dog/random/$',
             views.RandomDogRetrieveAPIView.as_view(),
             name="random-dog"),
@@ -62,6 +78,10 @@ urlpatterns = [
             views.NeedMoreLoveDogRetrieveAPIView.as_view(),
             name="needs-love-dog"),
 
+    # Monitoring
+    #   Prometheus scrape target (staff users, or settings.METRICS_TOKEN)
+    re_path(r'^metrics$', views.metrics_view, name='metrics'),
+
     # Additional App Views
     re_path(r'dog/add/$', views.add_dog, name='add_dog'),
     re_path(r'dog/delete/$', views.delete_list, name='delete_list'),
@@ -1,22 +1,45 @@
+import hmac
 import logging
+import mimetypes
 import random
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.core.exceptions import PermissionDenied
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.db.models import Prefetch
 
 from rest_framework import permissions
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.generics import CreateAPIView, RetrieveAPIView
 from rest_framework.mixins import CreateModelMixin, UpdateModelMixin
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-
+from rest_framework.views import APIView
+
+from . import assets
+from . import candidates
+from . import deletion
+from . import dog_json
+from . import fastpath
+from . import images
+from . import metrics
+from . import routers
 from . import serializers
+from . import tracing
 from . import models
+from . import renderers
 from .forms import AddDogForm
 
 
+logger = logging.getLogger(__name__)
+
+
 # DRF provides `Request` objects (extensions of Django's HttpRequest).
 # One benefit is we can use request.data, which is like request.POST but
 # can handle arbitrary data (instead of just form data) and PUT/PATCH in
@@ -34,18 +57,84 @@ class UserRegisterView(CreateAPIView):
     serializer_class = serializers.UserSerializer
 
 
-class RandomDogRetrieveAPIView(RetrieveAPIView):
+class UserLoginView(ObtainAuthToken):
+    """DRF's token login, which also counts as a Django login: it updates
+    the user's `last_login` and restores any archived swipes (see
+    archive.py)
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data,
+                                           context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, _ = Token.objects.get_or_create(user=user)
+        user_logged_in.send(sender=user.__class__, request=request,
+                            user=user)
+        # (logging in writes too: the client's first reads with its token
+        # mustn't go to a replica that hasn't seen them)
+        routers.pin(routers.credential_key(f'Token {token.key}'))
+        return Response({'token': token.key})
+
+
+def dog_fields_parameter(request):
+    """Returns the tuple of dog fields the `fields` query parameter asks for
+    (e.g., `?fields=id,name`), or None for all of them (raising
+    ValidationError if any isn't a `DogSerializer` field)
+    """
+    names = request.query_params.get('fields')
+    if names is None:
+        return None
+    try:
+        return fastpath.dog_fields(names)
+    except ValueError as error:
+        raise ValidationError({'fields': str(error)})
+
+
+class CachedDogRetrieveMixin:
+    """Sends the dog's cached JSON (see dog_json.py) rather than running
+    the serializer. With a `fields` parameter it sends just those fields,
+    straight from the dog (fetching only the columns they need, when the
+    dog comes from `get_queryset`).
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # (checked before an update changes anything)
+        self.dog_fields = dog_fields_parameter(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.dog_response(self.get_object())
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = getattr(self, 'dog_fields', None)
+        if fields is not None:
+            queryset = queryset.only(*fastpath.dog_mapper(fields).columns)
+        return queryset
+
+    def dog_response(self, dog):
+        if self.dog_fields is not None:
+            # (cheaper than parsing the cached JSON to pick the fields)
+            mapper = fastpath.dog_mapper(self.dog_fields)
+            return Response(mapper.instance_to_dict(dog))
+        return Response(dog_json.get(dog))
+
+
+class RandomDogRetrieveAPIView(CachedDogRetrieveMixin, RetrieveAPIView):
     """View for getting a random dog"""
 
     serializer_class = serializers.DogSerializer
 
+    @tracing.span('views.RandomDog.get_object')
     def get_object(self):
         dogs = models.Dog.objects.all()
         dog = random.choice(dogs)
         return dog
 
 
-class NeedMoreLoveDogRetrieveAPIView(RetrieveAPIView):
+class NeedMoreLoveDogRetrieveAPIView(CachedDogRetrieveMixin,
+                                     RetrieveAPIView):
     """View for getting a dog that needs more love
 
     Specifically, we are going to return a random dog from the pool
@@ -57,6 +146,7 @@ class NeedMoreLoveDogRetrieveAPIView(RetrieveAPIView):
 
     serializer_class = serializers.DogSerializer
 
+    @tracing.span('views.NeedMoreLoveDog.get_object')
     def get_object(self):
         # We want to get all the dogs and the count of their likes in
         # UserDog.
@@ -74,10 +164,12 @@ class NeedMoreLoveDogRetrieveAPIView(RetrieveAPIView):
 
         # We can now get the number of likes each dog has by accessing
         # the fdog.userdog_set.count() method
-        dog_and_likes_count = [
-            (dog.name, dog.userdog_set.count()) for dog in fdogs
-        ]
-        logging.debug(f"Dogs and Likes Count:\n{dog_and_likes_count}")
+        # (only build the list if it's going to be logged)
+        if logger.isEnabledFor(logging.DEBUG):
+            dog_and_likes_count = [
+                (dog.name, dog.userdog_set.count()) for dog in fdogs
+            ]
+            logger.debug("Dogs and Likes Count:\n%s", dog_and_likes_count)
 
         # note that, e.g., Rosie who has 2 likes returns 2 and Muffin,
         # who has no likes but a dislike returns 0
@@ -98,6 +190,7 @@ class NeedMoreLoveDogRetrieveAPIView(RetrieveAPIView):
 
 
 class DogRetrieveUpdateAPIView(
+    CachedDogRetrieveMixin,
     UpdateModelMixin,
     RetrieveAPIView
 ):
@@ -117,22 +210,35 @@ class DogRetrieveUpdateAPIView(
         status = self.kwargs.get('status')[0]
         current_user = self.request.user
 
-        status_dogs = self.get_queryset().with_status(current_user, status)
-
         if status == 'u':
             # We want to filter on userprefs to ensure user only sees dogs
             # they might like
-            pref_dogs = status_dogs.with_prefs(current_user)
-        else:  # 'l' or 'd'
-            # Note, we're ignoring userprefs because the user has explicitly
-            # expressed a like/dislike for this particular dog. General
-            # preferences shouldn't override this expressed status
-            pref_dogs = status_dogs
+            return self.get_undecided_dog(current_user, -1)
+
+        # 'l' or 'd'
+        # Note, we're ignoring userprefs because the user has explicitly
+        # expressed a like/dislike for this particular dog. General
+        # preferences shouldn't override this expressed status
+        pref_dogs = self.get_queryset().with_status(current_user, status)
 
-        first_dog_with_status = pref_dogs.first()
+        with tracing.span('dogs.with_status'):
+            first_dog_with_status = pref_dogs.first()
 
         return first_dog_with_status
 
+    def get_undecided_dog(self, user, after_pk):
+        """returns the next undecided dog (pk order, wraparound) that matches
+        the user's preferences (None if there are none)
+
+        Rather than running the `with_prefs` subqueries, this uses the
+        candidate list shared by every user with the same preferences (see
+        `candidates.py`) and only subtracts the user's own rated dogs.
+        """
+        dog_id = candidates.next_undecided_id(user, after_pk)
+        if dog_id is None:
+            return None
+        return self.get_queryset().filter(pk=dog_id).first()
+
     def get_next_dog_with_status(self):
         """returns the next dog (pk order, wraparound) with the corresponding
         status (empty queryset if none)
@@ -141,33 +247,34 @@ class DogRetrieveUpdateAPIView(
         current_user = self.request.user
         current_dog_pk = int(self.kwargs.get('pk'))
 
-        status_dogs = self.get_queryset().with_status(current_user, status)
-
         if status == 'u':
             # first dog is the next pk with no corresponding userdog
             # We want to filter on userprefs to ensure user only sees dogs
             # they might like
-            pref_dogs = status_dogs.with_prefs(current_user)
-        else:  # 'l' or 'd'
-            # first dog is next in pk with same userdog status
-            #
-            # Note, we're ignoring userprefs because the user has explicitly
-            # expressed a like/dislike for this particular dog. General
-            # preferences shouldn't override this expressed status
-            pref_dogs = status_dogs
-
-        next_pref_dog = pref_dogs.filter(
-            id__gt=current_dog_pk
-        ).first()
-
-        # if there are no higher pks with status, wraparound to first
-        if next_pref_dog is None:
-            next_pref_dog = pref_dogs.first()
+            return self.get_undecided_dog(current_user, current_dog_pk)
+
+        # 'l' or 'd'
+        # first dog is next in pk with same userdog status
+        #
+        # Note, we're ignoring userprefs because the user has explicitly
+        # expressed a like/dislike for this particular dog. General
+        # preferences shouldn't override this expressed status
+        pref_dogs = self.get_queryset().with_status(current_user, status)
+
+        with tracing.span('dogs.with_status'):
+            next_pref_dog = pref_dogs.filter(
+                id__gt=current_dog_pk
+            ).first()
+
+            # if there are no higher pks with status, wraparound to first
+            if next_pref_dog is None:
+                next_pref_dog = pref_dogs.first()
 
         return next_pref_dog
 
     # APIView Methods
     # ---------------
+    @tracing.span('views.DogRetrieveUpdate.get_object')
     def get_object(self):
         current_dog_id = int(self.kwargs.get('pk'))
 
@@ -199,7 +306,9 @@ class DogRetrieveUpdateAPIView(
         if status in ['l', 'd']:
 
             # try to get the specified userdog
-            userdog = dog.userdog_set.filter(user=user).first()
+            userdog = models.UserDog.objects.filter(
+                pk=models.UserDog.make_key(user.pk, dog.pk)
+            ).first()
 
             if userdog:
                 # update the userdog
@@ -214,17 +323,94 @@ class DogRetrieveUpdateAPIView(
                 )
 
         if status == 'u':
-            userdog = dog.userdog_set.filter(user=user).first()
+            userdog = models.UserDog.objects.filter(
+                pk=models.UserDog.make_key(user.pk, dog.pk)
+            ).first()
             if userdog:
                 userdog.delete()
 
-        serializer = self.get_serializer(dog)
-        return Response(serializer.data)
+        metrics.inc('pugorugh_swipes_total', {'status': status})
+        logger.info("User %s set dog %s to %s", user.pk, dog.pk, status,
+                    extra={'event': 'swipe', 'user_id': user.pk,
+                           'dog_id': dog.pk, 'status': status})
+
+        # (a swipe doesn't change the dog: its cached JSON still holds)
+        return self.dog_response(dog)
 
     def put(self, request, *args, **kwargs):
         return self.update(request, *args, **kwargs)
 
 
+def int_parameter(request, name, default, minimum, maximum):
+    """Returns the query parameter as an int (raising ValidationError if it
+    isn't one, or is out of range)
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer"})
+    if not minimum <= value <= maximum:
+        raise ValidationError(
+            {name: f"Must be between {minimum} and {maximum}"}
+        )
+    return value
+
+
+# Many Dogs
+# ---------
+# (these send the rows through the read-only fast path; see fastpath.py)
+class DogListAPIView(APIView):
+    """Lists the dogs in pk order, `limit` at a time, from the dog after
+    `after` (send the response's `next` as the next request's `after`)
+    """
+
+    @tracing.span('views.DogList.get')
+    def get(self, request, *args, **kwargs):
+        after = int_parameter(request, 'after', 0, 0, 2 ** 63 - 1)
+        limit = int_parameter(request, 'limit', settings.DOG_LIST_LIMIT, 1,
+                              settings.DOG_LIST_MAX_LIMIT)
+        dogs = fastpath.dogs_by_pk(
+            models.Dog.objects.filter(pk__gt=after).order_by('pk')[:limit],
+            dog_fields_parameter(request)
+        )
+        next_after = list(dogs)[-1] if len(dogs) == limit else None
+        return Response({'results': list(dogs.values()), 'next': next_after})
+
+
+class DogBatchAPIView(APIView):
+    """Returns the dogs with the given ids (`?ids=1,2,3`), in that order"""
+
+    @tracing.span('views.DogBatch.get')
+    def get(self, request, *args, **kwargs):
+        try:
+            ids = [int(pk) for pk in
+                   request.query_params.get('ids', '').split(',') if pk]
+        except ValueError:
+            raise ValidationError({'ids': "Must be comma-separated integers"})
+        if len(ids) > settings.DOG_BATCH_MAX_IDS:
+            raise ValidationError(
+                {'ids': f"At most {settings.DOG_BATCH_MAX_IDS} ids"}
+            )
+        return Response(fastpath.dogs_by_id(models.Dog.objects.all(), ids,
+                                            dog_fields_parameter(request)))
+
+
+class DogExportAPIView(APIView):
+    """Streams every dog as one JSON array"""
+    # (the export is always JSON)
+    renderer_classes = [renderers.FastJSONRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return StreamingHttpResponse(
+            fastpath.export_json(models.Dog.objects.all(),
+                                 fields=dog_fields_parameter(request)),
+            content_type='application/json'
+        )
+
+
 class UserPrefRetrieveAPIView(
     UpdateModelMixin,
     CreateModelMixin,
@@ -238,6 +424,7 @@ class UserPrefRetrieveAPIView(
 
     # Override Retrieve Methods
     # -------------------------
+    @tracing.span('views.UserPref.get_object')
     def get_object(self):
         user = self.request.user
         userpref = self.get_queryset().filter(user=user).first()
@@ -269,6 +456,53 @@ class UserPrefRetrieveAPIView(
         return self.create(request, *args, **kwargs)
 
 
+def metrics_view(request):
+    """Exports the application metrics in the Prometheus text format, to
+    staff users and to scrapers sending `settings.METRICS_TOKEN` as a bearer
+    token
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    scraper = bool(token) and hmac.compare_digest(
+        authorization.encode(), f'Bearer {token}'.encode()
+    )
+    if not (scraper or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def asset_view(request, name):
+    """Serves a fingerprinted asset (see `pugorugh.assets`), precompressed
+    if the client accepts it, for browsers to cache for a year
+    """
+    if not assets.is_fingerprinted(name):
+        raise Http404("No such asset")
+    path, encoding = assets.variant(
+        name, request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    content_type, _ = mimetypes.guess_type(name)
+    try:
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream'
+        )
+    except FileNotFoundError:
+        raise Http404("No such asset")
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def dog_image_view(request, version, filename):
+    """Serves a dog's image at its versioned URL (see `pugorugh.images`)"""
+    return images.serve(request, version, filename)
+
+
 def add_dog(request):
     if request.method == "POST":
         # submit dog
@@ -301,9 +535,13 @@ def delete_dog(request, pk):
     if request.method == "POST":
 
         if 'confirm' in request.POST:  # delete the dog
-            logging.debug(f"deleting {dog.name} ({dog.pk})...")
-            dog.delete()
-            logging.debug(f"Deleted. Remaining: {models.Dog.objects.all()}")
+            logger.debug("deleting %s (%s)...", dog.name, dog.pk)
+            # (hidden now; the rows and image are deleted in the background)
+            deletion.delete_dog(dog)
+            # (listing the remaining dogs costs a query)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Deleted. Remaining: %s",
+                             models.Dog.objects.all())
             return redirect(reverse('index'))
 
         else:  # do not delete the dog, go back to previous screen